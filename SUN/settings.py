@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import tempfile
 from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -178,6 +179,145 @@ EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', default=False, cast=bool)
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='info@extracsol.com')
 
+# PubChem
+# Number of full compound records each worker keeps in memory.
+PUBCHEM_RECORD_CACHE_SIZE = config('PUBCHEM_RECORD_CACHE_SIZE', default=32, cast=int)
+
+# Shared PubChem response cache (app1.PubChemCacheEntry), used by every worker.
+PUBCHEM_CACHE_MAX_BYTES = config('PUBCHEM_CACHE_MAX_BYTES', default=256 * 1024 * 1024, cast=int)
+PUBCHEM_CACHE_DEFAULT_TTL = config('PUBCHEM_CACHE_DEFAULT_TTL', default=30 * 24 * 3600, cast=int)
+# Per-endpoint TTLs in seconds; endpoints not listed use PUBCHEM_CACHE_DEFAULT_TTL.
+PUBCHEM_CACHE_TTLS = {
+    'record': config('PUBCHEM_CACHE_RECORD_TTL', default=14 * 24 * 3600, cast=int),
+    'heading': config('PUBCHEM_CACHE_HEADING_TTL', default=14 * 24 * 3600, cast=int),
+    'toc': config('PUBCHEM_CACHE_TOC_TTL', default=14 * 24 * 3600, cast=int),
+}
+# How long "this compound has no such heading" answers are kept, in seconds.
+PUBCHEM_HEADING_ABSENT_TTL = config('PUBCHEM_HEADING_ABSENT_TTL', default=7 * 24 * 3600, cast=int)
+# Expired entries are kept this many more seconds, to be served while PubChem is down.
+PUBCHEM_CACHE_STALE_TTL = config('PUBCHEM_CACHE_STALE_TTL', default=30 * 24 * 3600, cast=int)
+# Each process trims the cache (see app1.pubchem.cache.evict) once every this many writes.
+PUBCHEM_CACHE_EVICT_EVERY = config('PUBCHEM_CACHE_EVICT_EVERY', default=100, cast=int)
+# Minimum number of seconds between two last-access updates of the same entry.
+PUBCHEM_CACHE_TOUCH_INTERVAL = config('PUBCHEM_CACHE_TOUCH_INTERVAL', default=60, cast=int)
+
+# CAS number -> CID resolution (app1.CasLookup): found and not-found answers expire separately.
+PUBCHEM_CAS_TTL = config('PUBCHEM_CAS_TTL', default=90 * 24 * 3600, cast=int)
+PUBCHEM_CAS_NEGATIVE_TTL = config('PUBCHEM_CAS_NEGATIVE_TTL', default=24 * 3600, cast=int)
+
+# Identical concurrent PubChem lookups are coalesced; workers on one host share these lock files.
+PUBCHEM_LOCK_DIR = config('PUBCHEM_LOCK_DIR', default=os.path.join(tempfile.gettempdir(), 'app1-pubchem-locks'))
+PUBCHEM_SINGLEFLIGHT_TIMEOUT = config('PUBCHEM_SINGLEFLIGHT_TIMEOUT', default=60, cast=int)
+
+# Shared HTTP client (app1.pubchem.client): keep-alive pool, timeouts in seconds, backoff on 503.
+PUBCHEM_HTTP_POOL_SIZE = config('PUBCHEM_HTTP_POOL_SIZE', default=10, cast=int)
+PUBCHEM_CONNECT_TIMEOUT = config('PUBCHEM_CONNECT_TIMEOUT', default=5, cast=float)
+PUBCHEM_READ_TIMEOUT = config('PUBCHEM_READ_TIMEOUT', default=30, cast=float)
+PUBCHEM_RECORD_READ_TIMEOUT = config('PUBCHEM_RECORD_READ_TIMEOUT', default=60, cast=float)
+PUBCHEM_MAX_RETRIES = config('PUBCHEM_MAX_RETRIES', default=3, cast=int)
+PUBCHEM_BACKOFF_BASE = config('PUBCHEM_BACKOFF_BASE', default=0.5, cast=float)
+PUBCHEM_BACKOFF_MAX = config('PUBCHEM_BACKOFF_MAX', default=8, cast=float)
+# After PUBCHEM_BREAKER_FAILURES failed requests in a row, PubChem is not called for
+# PUBCHEM_BREAKER_COOLDOWN seconds and expired cache entries are served instead;
+# traffic then comes back one probe at a time until PUBCHEM_BREAKER_PROBES succeed.
+PUBCHEM_BREAKER_FAILURES = config('PUBCHEM_BREAKER_FAILURES', default=5, cast=int)
+PUBCHEM_BREAKER_COOLDOWN = config('PUBCHEM_BREAKER_COOLDOWN', default=60, cast=float)
+PUBCHEM_BREAKER_PROBES = config('PUBCHEM_BREAKER_PROBES', default=3, cast=int)
+
+# Host-wide token bucket following PubChem's usage policy (5 requests/second, 400/minute).
+PUBCHEM_RATE_PER_SECOND = config('PUBCHEM_RATE_PER_SECOND', default=5, cast=float)
+PUBCHEM_RATE_PER_MINUTE = config('PUBCHEM_RATE_PER_MINUTE', default=400, cast=float)
+PUBCHEM_RATE_STATE_FILE = config('PUBCHEM_RATE_STATE_FILE', default=os.path.join(PUBCHEM_LOCK_DIR, 'ratelimit.json'))
+# Seconds a Yellow/Red X-Throttling-Control status keeps the rate scaled down.
+PUBCHEM_THROTTLE_COOLDOWN = config('PUBCHEM_THROTTLE_COOLDOWN', default=10, cast=float)
+
+# 'live' talks to PubChem; 'record' also saves every response under PUBCHEM_FIXTURE_DIR;
+# 'replay' serves the saved responses offline, after PUBCHEM_REPLAY_LATENCY seconds
+# (or 'recorded' for the time the live request took) times PUBCHEM_REPLAY_LATENCY_SCALE.
+PUBCHEM_TRANSPORT = config('PUBCHEM_TRANSPORT', default='live')
+PUBCHEM_FIXTURE_DIR = config('PUBCHEM_FIXTURE_DIR', default=os.path.join(BASE_DIR, 'pubchem_fixtures'))
+PUBCHEM_REPLAY_LATENCY = config('PUBCHEM_REPLAY_LATENCY', default='0')
+PUBCHEM_REPLAY_LATENCY_SCALE = config('PUBCHEM_REPLAY_LATENCY_SCALE', default=1.0, cast=float)
+
+# Compounds (app1.Compound) are rebuilt from the PubChem cache after this many seconds.
+PUBCHEM_COMPOUND_TTL = config('PUBCHEM_COMPOUND_TTL', default=14 * 24 * 3600, cast=int)
+
+# Threads used to fetch a wizard section's headings concurrently.
+PUBCHEM_PREFILL_WORKERS = config('PUBCHEM_PREFILL_WORKERS', default=8, cast=int)
+# Sections 2-14 are prefilled in the background once section 1 is submitted.
+PUBCHEM_PREFETCH_WORKERS = config('PUBCHEM_PREFETCH_WORKERS', default=4, cast=int)
+# Seconds a wizard request waits for PubChem in total. A section not ready by
+# then renders with the fields fetched so far; the page polls for the rest.
+PUBCHEM_REQUEST_BUDGET = config('PUBCHEM_REQUEST_BUDGET', default=8, cast=float)
+# Seconds a poll for the rest of a step waits when it reaches a worker that was not
+# prefilling the step, and starts it there from the shared PubChem cache.
+PUBCHEM_PREFILL_POLL_WAIT = config('PUBCHEM_PREFILL_POLL_WAIT', default=2, cast=float)
+# Background prefills no request or poll has asked about for this many seconds
+# are cancelled, so abandoned wizards stop using the PubChem rate budget.
+PUBCHEM_PREFILL_IDLE_TIMEOUT = config('PUBCHEM_PREFILL_IDLE_TIMEOUT', default=300, cast=float)
+
+# Step data of MSDS wizards (app1.WizardData) nobody has touched for this many seconds is purged.
+WIZARD_DATA_TTL = config('WIZARD_DATA_TTL', default=2 * 24 * 3600, cast=int)
+
+# Render the PDF of an MSDS (app1.pdf_cache) as a background job whenever it is saved,
+# so the first download is served from the cache. Inline when JOBS_ASYNC is off.
+PDF_PRERENDER_ON_SAVE = config('PDF_PRERENDER_ON_SAVE', default=False, cast=bool)
+
+# Storage of rendered PDFs (app1.pdf_cache): 'local' keeps them under PDF_STORAGE_DIR,
+# 's3' in the PDF_S3_BUCKET bucket (PDF_S3_REGION) through django-storages.
+# PDF_S3_ENDPOINT_URL points it at any S3-compatible service, e.g. a local MinIO.
+PDF_STORAGE = config('PDF_STORAGE', default='local')
+PDF_STORAGE_DIR = config('PDF_STORAGE_DIR', default=str(BASE_DIR / 'pdfs'))
+PDF_S3_OPTIONS = {
+    'bucket_name': config('PDF_S3_BUCKET', default=''),
+    'region_name': config('PDF_S3_REGION', default=None),
+    'endpoint_url': config('PDF_S3_ENDPOINT_URL', default=None),
+    'access_key': config('PDF_S3_ACCESS_KEY', default=None),
+    'secret_key': config('PDF_S3_SECRET_KEY', default=None),
+    'default_acl': 'private',
+    'file_overwrite': True,
+}
+
+if PDF_STORAGE == 's3':
+    PDF_STORAGE_BACKEND = {'BACKEND': 'storages.backends.s3.S3Storage', 'OPTIONS': PDF_S3_OPTIONS}
+else:
+    PDF_STORAGE_BACKEND = {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': PDF_STORAGE_DIR},
+    }
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+    'pdfs': PDF_STORAGE_BACKEND,
+}
+
+# How stored PDFs are sent. 'python' streams them from the worker, with Range support.
+# 'x-accel-redirect' hands them to nginx: PDF_ACCEL_REDIRECT_PREFIX + file name must map
+# to an internal location serving the storage. 'x-sendfile' hands the local file path to
+# Apache/lighttpd, and falls back to 'python' for storages without local paths.
+PDF_SERVE = config('PDF_SERVE', default='python')
+PDF_ACCEL_REDIRECT_PREFIX = config('PDF_ACCEL_REDIRECT_PREFIX', default='/protected/pdfs/')
+
+# Generated PDFs are kept in memory up to this many bytes, then spooled to a temporary file.
+PDF_SPOOL_MAX_SIZE = config('PDF_SPOOL_MAX_SIZE', default=1024 * 1024, cast=int)
+
+# Load the PDF styles and images (app1.pdf_resources) at startup instead of on the first render.
+PDF_PRELOAD_RESOURCES = config('PDF_PRELOAD_RESOURCES', default=False, cast=bool)
+
+# Background jobs (app1.Job), run by `manage.py jobs_worker`. With JOBS_ASYNC off,
+# jobs run inline when they are queued, so no worker process is needed.
+JOBS_ASYNC = config('JOBS_ASYNC', default=False, cast=bool)
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=3, cast=int)
+# Seconds a worker may hold a job before another worker can take it over.
+JOBS_VISIBILITY_TIMEOUT = config('JOBS_VISIBILITY_TIMEOUT', default=300, cast=int)
+# First retry delay in seconds, doubled on every further attempt.
+JOBS_RETRY_DELAY = config('JOBS_RETRY_DELAY', default=10, cast=int)
+# Seconds finished jobs and their results are kept.
+JOBS_RESULT_TTL = config('JOBS_RESULT_TTL', default=24 * 3600, cast=int)
+JOBS_WORKER_CONCURRENCY = config('JOBS_WORKER_CONCURRENCY', default=2, cast=int)
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1, cast=float)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -6,4 +6,15 @@ admin.site.register(MSDS)
 
 admin.site.register(ChemTable)
 
-admin.site.register(Chemical)
\ No newline at end of file
+admin.site.register(Chemical)
+
+admin.site.register(PubChemCacheEntry)
+
+admin.site.register(CasLookup)
+
+admin.site.register(Job)
+
+admin.site.register(Compound)
+admin.site.register(WizardData)
+admin.site.register(MSDSPdf)
+admin.site.register(ChemTablePdf)
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class App1Config(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app1'
+
+    def ready(self):
+        # Register the background job tasks and the signal handlers.
+        from . import pdf_cache, tasks  # noqa: F401
+
+        if settings.PDF_PRELOAD_RESOURCES:
+            from .pdf_resources import pdf_resources
+            pdf_resources()
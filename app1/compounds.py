@@ -0,0 +1,62 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Compound
+from .utils import *
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever what is derived from PubChem changes, so existing Compound rows are rebuilt.
+VERSION = 1
+
+
+def chemtable_fields(cas_number, cid):
+    """The ChemTable columns of a compound, from PubChem."""
+    synonyms = get_synonyms_from_cas(cas_number)
+    data = {
+        'chemical_name': synonyms[0] if synonyms else '',
+        'molecular_formula': get_mol_for(cid),
+        'boiling_point': get_boil(cid),
+        't_change': get_melt(cid),  # Melting point is used for t_change
+        'phys': get_phys(cid),
+        'solubility': get_solu(cid),
+        'acute_toxicity_estimates': get_immi_eff(cid),
+    }
+    logger.debug(f"Toxicidad enviada: {data['acute_toxicity_estimates']}")
+    return data
+
+
+def get_compound(cid=None, cas_number=None):
+    """
+    The up-to-date Compound for a CID, or for a CAS number when the CID is
+    not known.
+
+    Returns:
+        Compound or None if the compound has not been built yet, or was
+        built by an older VERSION or before PUBCHEM_COMPOUND_TTL.
+    """
+    if cid is not None:
+        compounds = Compound.objects.filter(cid=cid)
+    elif cas_number:
+        compounds = Compound.objects.filter(cas_number=normalize_cas(cas_number) or cas_number)
+    else:
+        return None
+
+    built_after = timezone.now() - timedelta(seconds=settings.PUBCHEM_COMPOUND_TTL)
+    return compounds.filter(version=VERSION, built__gt=built_after).first()
+
+
+def save_compound(cid, cas_number, sections, chemtable):
+    """Store the derived data of a compound, replacing what was built before."""
+    compound, _ = Compound.objects.update_or_create(cid=cid, defaults={
+        'cas_number': normalize_cas(cas_number) or cas_number,
+        'version': VERSION,
+        'sections': sections,
+        'chemtable': chemtable,
+        'built': timezone.now(),
+    })
+    logger.debug(f"Built compound {compound}")
+    return compound
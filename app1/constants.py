@@ -1,5 +1,7 @@
 # constants.py
 
+import re
+
 PICTOGRAMS = {
     "Irritant": "https://pubchem.ncbi.nlm.nih.gov/images/ghs/GHS07.svg",
     "Flammable": "https://pubchem.ncbi.nlm.nih.gov/images/ghs/GHS02.svg",
@@ -205,6 +207,153 @@ PRECAUTIONARY_STATEMENTS = {
     },
 }
 
+# Category of PRECAUTIONARY_STATEMENTS -> key used by get_p_codes and the wizard forms
+P_CODE_CATEGORIES = {
+    "General Precautionary Statements": 'general',
+    "Prevention Precautionary Statements": 'prevention',
+    "Response Precautionary Statements": 'response',
+    "Storage Precautionary Statements": 'storage',
+    "Disposal Precautionary Statements": 'disposal',
+}
+
+# Flat P-code -> (category key, text) index over PRECAUTIONARY_STATEMENTS,
+# combined codes included ('P305+P351+P338').
+P_CODE_INDEX = {
+    code: (P_CODE_CATEGORIES[category], text)
+    for category, statements in PRECAUTIONARY_STATEMENTS.items()
+    for code, text in statements.items()
+}
+
+# One P-code, possibly combined with others: 'P301 + P310', 'P370+P380+P375[+P378]'
+P_CODE_PATTERN = re.compile(r'P\d{3}(?:\s*\[?\s*\+\s*P\d{3}\s*\]?)*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def tokenize_p_codes(text):
+    """P-codes in a PubChem 'Precautionary Statement Codes' string, in order, without spaces."""
+    return [_WHITESPACE.sub('', match.group()) for match in P_CODE_PATTERN.finditer(text or '')]
+
+
+def lookup_p_code(code):
+    """
+    Category key and text of a P-code. A combined code missing from the
+    index is built from its parts, in the category of the first one.
+
+    Returns:
+        tuple: (category, text), or None if the code or one of its parts is unknown.
+    """
+    entry = P_CODE_INDEX.get(code)
+    if entry is not None or '+' not in code:
+        return entry
+
+    parts = [P_CODE_INDEX.get(part) for part in code.replace('[', '').replace(']', '').split('+')]
+    if None in parts:
+        return None
+    return parts[0][0], ' '.join(text for _, text in parts)
+
+
+# GHS label elements fixed by each hazard statement: (pictograms, signal word).
+# Pictograms are PICTOGRAMS keys. Where the signal word depends on the category
+# (H228, H242, H261, ...) the stricter one is used.
+H_CODE_RULES = {
+    # Physical hazards
+    'H200': (('Explosives',), 'Danger'),
+    'H201': (('Explosives',), 'Danger'),
+    'H202': (('Explosives',), 'Danger'),
+    'H203': (('Explosives',), 'Danger'),
+    'H204': (('Explosives',), 'Warning'),
+    'H205': ((), 'Danger'),
+    'H206': (('Flammable',), 'Danger'),
+    'H207': (('Flammable',), 'Danger'),
+    'H208': (('Flammable',), 'Warning'),
+    'H220': (('Flammable',), 'Danger'),
+    'H221': ((), 'Warning'),
+    'H222': (('Flammable',), 'Danger'),
+    'H223': (('Flammable',), 'Warning'),
+    'H224': (('Flammable',), 'Danger'),
+    'H225': (('Flammable',), 'Danger'),
+    'H226': (('Flammable',), 'Warning'),
+    'H227': ((), 'Warning'),
+    'H228': (('Flammable',), 'Danger'),
+    'H229': ((), 'Warning'),
+    'H230': ((), None),
+    'H231': ((), None),
+    'H232': (('Flammable',), 'Danger'),
+    'H240': (('Explosives',), 'Danger'),
+    'H241': (('Explosives', 'Flammable'), 'Danger'),
+    'H242': (('Flammable',), 'Danger'),
+    'H250': (('Flammable',), 'Danger'),
+    'H251': (('Flammable',), 'Danger'),
+    'H252': (('Flammable',), 'Warning'),
+    'H260': (('Flammable',), 'Danger'),
+    'H261': (('Flammable',), 'Danger'),
+    'H270': (('Oxidizer',), 'Danger'),
+    'H271': (('Oxidizer',), 'Danger'),
+    'H272': (('Oxidizer',), 'Danger'),
+    'H280': (('Compressed Gas',), 'Warning'),
+    'H281': (('Compressed Gas',), 'Warning'),
+    'H290': (('Corrosive',), 'Warning'),
+    # Health hazards
+    'H300': (('Acute Toxic',), 'Danger'),
+    'H301': (('Acute Toxic',), 'Danger'),
+    'H302': (('Irritant',), 'Warning'),
+    'H303': ((), 'Warning'),
+    'H304': (('Health Hazard',), 'Danger'),
+    'H305': ((), 'Warning'),
+    'H310': (('Acute Toxic',), 'Danger'),
+    'H311': (('Acute Toxic',), 'Danger'),
+    'H312': (('Irritant',), 'Warning'),
+    'H313': ((), 'Warning'),
+    'H314': (('Corrosive',), 'Danger'),
+    'H315': (('Irritant',), 'Warning'),
+    'H316': ((), 'Warning'),
+    'H317': (('Irritant',), 'Warning'),
+    'H318': (('Corrosive',), 'Danger'),
+    'H319': (('Irritant',), 'Warning'),
+    'H320': ((), 'Warning'),
+    'H330': (('Acute Toxic',), 'Danger'),
+    'H331': (('Acute Toxic',), 'Danger'),
+    'H332': (('Irritant',), 'Warning'),
+    'H333': ((), 'Warning'),
+    'H334': (('Health Hazard',), 'Danger'),
+    'H335': (('Irritant',), 'Warning'),
+    'H336': (('Irritant',), 'Warning'),
+    'H340': (('Health Hazard',), 'Danger'),
+    'H341': (('Health Hazard',), 'Warning'),
+    'H350': (('Health Hazard',), 'Danger'),
+    'H351': (('Health Hazard',), 'Warning'),
+    'H360': (('Health Hazard',), 'Danger'),
+    'H361': (('Health Hazard',), 'Warning'),
+    'H362': ((), None),
+    'H370': (('Health Hazard',), 'Danger'),
+    'H371': (('Health Hazard',), 'Warning'),
+    'H372': (('Health Hazard',), 'Danger'),
+    'H373': (('Health Hazard',), 'Warning'),
+    # Environmental hazards
+    'H400': (('Environmental Hazard',), 'Warning'),
+    'H401': ((), None),
+    'H402': ((), None),
+    'H410': (('Environmental Hazard',), 'Warning'),
+    'H411': (('Environmental Hazard',), None),
+    'H412': ((), None),
+    'H413': ((), None),
+    'H420': (('Irritant',), 'Warning'),
+}
+
+# GHS precedence rules (GHS 1.4.10.5.3.1):
+#   (pictogram, H-codes it must be shown for or None for any,
+#    pictogram it supersedes, H-codes the superseded one is dropped for or None for all)
+_IRRITATION = frozenset({'H315', 'H316', 'H319', 'H320'})
+PICTOGRAM_PRECEDENCE = (
+    ('Acute Toxic', None, 'Irritant', None),
+    ('Corrosive', None, 'Irritant', _IRRITATION),
+    ('Health Hazard', frozenset({'H334'}), 'Irritant', _IRRITATION | {'H317'}),
+)
+
+# An H-code with its optional suffix ('H360FD', 'H350i'); the rules go by the three digits.
+H_CODE_PATTERN = re.compile(r'\b(H\d{3})[A-Za-z]*')
+
+
 # Update the values in the dictionary to reflect the converted PNG paths
 
 DESC_TO_IMAGE_UN = {
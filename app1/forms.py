@@ -2,6 +2,7 @@ from django import forms
 from django.utils.translation import gettext_lazy as _
 from .models import *
 from .constants import *
+from .utils import label_from_h_codes
 from django.forms import modelformset_factory, inlineformset_factory
 
 class MSDSSection1Form(forms.ModelForm):
@@ -139,6 +140,17 @@ class MSDSSection2Form(forms.ModelForm):
             'classification': forms.Textarea(attrs={'style': 'width: auto;', 'placeholder': _("Clasificación del producto")})
         }
 
+    def clean(self):
+        cleaned_data = super().clean()
+        # Hazard statements typed by hand still get their pictograms and signal word.
+        if cleaned_data.get('hazard_statements'):
+            label = label_from_h_codes(cleaned_data['hazard_statements'])
+            if not cleaned_data.get('label_elements'):
+                cleaned_data['label_elements'] = label['label_elements']
+            if label['signal_word'] and 'signal_word' not in self.changed_data:
+                cleaned_data['signal_word'] = label['signal_word']
+        return cleaned_data
+
 class MSDSSection3Form(forms.ModelForm):
     class Meta:
         model = MSDS
@@ -0,0 +1,160 @@
+import logging
+import os
+import socket
+import threading
+import traceback
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+# Returned by a task to hand back a file (e.g. a PDF) instead of a JSON result.
+JobFile = namedtuple('JobFile', ['name', 'content_type', 'data'])
+
+# Task name -> function, filled by the @task decorator (see app1/tasks.py).
+TASKS = {}
+
+
+def task(name=None):
+    """Register a function as a job task, under its own name by default."""
+    def register(fn):
+        TASKS[name or fn.__name__] = fn
+        return fn
+    return register
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+def enqueue(task_name, *args, priority=0, max_attempts=None, timeout=None, **kwargs):
+    """
+    Queue a job running TASKS[task_name](*args, **kwargs). Arguments must be
+    JSON-serialisable. Higher priorities run first.
+
+    With JOBS_ASYNC off the job is run right away in the calling thread,
+    once, so the app keeps working without a worker process.
+
+    Returns:
+        Job: the queued (or already finished) job.
+    """
+    if task_name not in TASKS:
+        raise KeyError(f"Unknown job task {task_name}")
+
+    job = Job.objects.create(
+        task=task_name,
+        args=list(args),
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        timeout=timeout or settings.JOBS_VISIBILITY_TIMEOUT,
+    )
+
+    if not settings.JOBS_ASYNC:
+        worker = worker_name()
+        claimed = claim(worker, pk=job.pk)
+        if claimed is not None:
+            run(claimed, worker, retry=False)
+        job.refresh_from_db()
+
+    return job
+
+
+def claim(worker, pk=None):
+    """
+    Take the next runnable job for worker: the highest-priority queued job
+    whose run_after has passed, or a running job whose visibility timeout
+    expired. The claim is a conditional UPDATE, so two workers never get
+    the same job.
+
+    Returns:
+        Job: the claimed job, or None if there is nothing to run.
+    """
+    now = timezone.now()
+
+    # Jobs whose worker vanished during their last attempt are not retried.
+    Job.objects.filter(
+        status=Job.RUNNING, locked_until__lt=now, attempts__gte=F('max_attempts')
+    ).update(status=Job.FAILED, error="Visibility timeout expired", finished=now)
+
+    available = Q(status=Job.QUEUED, run_after__lte=now) | Q(status=Job.RUNNING, locked_until__lt=now)
+    candidates = Job.objects.filter(available)
+    if pk is not None:
+        candidates = candidates.filter(pk=pk)
+
+    for job_pk, timeout in candidates.order_by('-priority', 'created').values_list('pk', 'timeout')[:10]:
+        claimed = Job.objects.filter(available, pk=job_pk).update(
+            status=Job.RUNNING,
+            locked_by=worker,
+            locked_until=now + timedelta(seconds=timeout),
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_pk)
+    return None
+
+
+def run(job, worker, retry=True):
+    """
+    Run a claimed job and record its result. A failed job is queued again
+    with exponential backoff until it has used max_attempts.
+    """
+    fn = TASKS.get(job.task)
+    try:
+        if fn is None:
+            raise LookupError(f"Unknown job task {job.task}")
+        value = fn(*job.args, **job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        if retry and job.attempts < job.max_attempts:
+            delay = settings.JOBS_RETRY_DELAY * 2 ** (job.attempts - 1)
+            logger.warning(f"Job {job.pk} ({job.task}) failed, retrying in {delay}s:\n{error}")
+            fields = {'status': Job.QUEUED, 'run_after': timezone.now() + timedelta(seconds=delay)}
+        else:
+            logger.error(f"Job {job.pk} ({job.task}) failed after {job.attempts} attempts:\n{error}")
+            fields = {'status': Job.FAILED, 'finished': timezone.now()}
+        fields.update(error=error, locked_by='', locked_until=None)
+    else:
+        fields = {'status': Job.DONE, 'finished': timezone.now(), 'error': '', 'locked_by': '', 'locked_until': None}
+        if isinstance(value, JobFile):
+            fields.update(output=value.data, output_name=value.name, output_type=value.content_type)
+        else:
+            fields['result'] = value
+
+    # Only record the outcome if no other worker took the job over in the meantime.
+    updated = Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=worker).update(**fields)
+    if not updated:
+        logger.warning(f"Job {job.pk} ({job.task}) was taken over by another worker, result dropped")
+
+
+def run_next(worker):
+    """
+    Claim and run one job.
+
+    Returns:
+        Job: the job that was run, or None if the queue was empty.
+    """
+    job = claim(worker)
+    if job is not None:
+        run(job, worker)
+    return job
+
+
+def purge(older_than=None):
+    """
+    Delete finished jobs older than older_than seconds (JOBS_RESULT_TTL by default).
+
+    Returns:
+        int: the number of jobs deleted.
+    """
+    if older_than is None:
+        older_than = settings.JOBS_RESULT_TTL
+    cutoff = timezone.now() - timedelta(seconds=older_than)
+    deleted, _ = Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,75 @@
+import signal
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from app1 import jobs
+from app1.pubchem import cache
+from app1.wizard_storage import purge_wizard_data
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs (PubChem lookups, PDFs, mail). Start as many "
+        "worker processes as the host has room for; each runs --concurrency jobs at once."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=settings.JOBS_WORKER_CONCURRENCY,
+                            help="Jobs run at the same time by this process.")
+        parser.add_argument('--poll', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Seconds to wait before looking again when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+        parser.add_argument('--purge', action='store_true',
+                            help="Delete old finished jobs and abandoned wizard data, trim the PubChem cache, and exit.")
+
+    def handle(self, *args, **options):
+        if options['purge']:
+            self.stdout.write(f"Deleted {jobs.purge()} finished jobs.")
+            self.stdout.write(f"Deleted {purge_wizard_data()} rows of abandoned wizards.")
+            cache.evict()
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+        threads = [
+            threading.Thread(target=self.work, args=(stop, options['poll'], options['once']), name=f'jobs-worker-{i}')
+            for i in range(options['concurrency'])
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Job worker started with {len(threads)} threads.")
+
+        last_purge = time.monotonic()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1)
+                if time.monotonic() - last_purge > 3600:
+                    jobs.purge()
+                    purge_wizard_data()
+                    cache.evict()
+                    last_purge = time.monotonic()
+        except KeyboardInterrupt:
+            stop.set()
+
+        # Let running jobs finish before exiting.
+        for thread in threads:
+            thread.join()
+        self.stdout.write("Job worker stopped.")
+
+    def work(self, stop, poll, once):
+        worker = jobs.worker_name()
+        while not stop.is_set():
+            close_old_connections()
+            job = jobs.run_next(worker)
+            if job is not None:
+                continue
+            if once:
+                break
+            stop.wait(poll)
+        close_old_connections()
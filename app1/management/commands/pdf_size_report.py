@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app1.models import ChemTable, MSDS
+from app1.pdf_cache import read_pdf
+from app1.pdf_output import stored_pdf
+from app1.pdf_report import pdf_size_report
+from app1.views.chemtable_pdf_view import write_chemtable_pdf
+from app1.views.sds_pdf_view import write_msds_pdf
+
+
+class Command(BaseCommand):
+    help = "Show what the PDF of an SDS or table of constants is made of: bytes per page content, image, form and font."
+
+    def add_arguments(self, parser):
+        target = parser.add_mutually_exclusive_group(required=True)
+        target.add_argument('--msds', type=int, help="ID of the SDS.")
+        target.add_argument('--chemtable', type=int, help="ID of the table of constants.")
+
+    def handle(self, *args, **options):
+        if options['msds'] is not None:
+            model, pk, write = MSDS, options['msds'], write_msds_pdf
+        else:
+            model, pk, write = ChemTable, options['chemtable'], write_chemtable_pdf
+        try:
+            owner = model.objects.get(pk=pk)
+        except model.DoesNotExist:
+            raise CommandError(f"No {model._meta.verbose_name} with ID {pk}.")
+
+        report = pdf_size_report(read_pdf(stored_pdf(owner, write)))
+        self.stdout.write(f"{model._meta.verbose_name} {pk}: {report.total} bytes, {report.pages} pages")
+        for kind, size in sorted(report.by_kind.items(), key=lambda item: -item[1]):
+            self.stdout.write(f"  {kind}: {size} bytes")
+        for name, kind, size in report.resources:
+            self.stdout.write(f"  {kind} {name}: {size} bytes")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum
+
+from app1.models import PubChemCacheEntry
+from app1.pubchem import cache
+from app1.pubchem.cas import forget_cas
+from app1.pubchem.record import forget_compound_record
+
+
+class Command(BaseCommand):
+    help = "Inspect, invalidate or trim the shared PubChem response cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help="Delete every cache entry.")
+        parser.add_argument('--endpoint', help="Only delete entries for this endpoint (record, heading, cids, ...).")
+        parser.add_argument('--cid', type=int, help="Only delete entries for this CID.")
+        parser.add_argument('--cas', help="Forget the CID this CAS number resolved to, so it is looked up again.")
+        parser.add_argument('--evict', action='store_true', help="Drop expired entries and enforce the byte budget.")
+
+    def handle(self, *args, **options):
+        if options['cas']:
+            deleted = forget_cas(options['cas'])
+            self.stdout.write(f"Deleted {deleted} CAS lookups for {options['cas']}.")
+        if options['cid'] is not None:
+            deleted = forget_compound_record(options['cid'])
+            self.stdout.write(f"Deleted {deleted} entries for CID {options['cid']}.")
+        elif options['endpoint']:
+            deleted = cache.invalidate(endpoint=options['endpoint'])
+            self.stdout.write(f"Deleted {deleted} '{options['endpoint']}' entries.")
+        elif options['clear']:
+            deleted = cache.invalidate()
+            self.stdout.write(f"Deleted {deleted} entries.")
+
+        if options['evict']:
+            cache.evict()
+
+        stats = PubChemCacheEntry.objects.values('endpoint').annotate(entries=Count('id'), size=Sum('size'))
+        for row in stats.order_by('endpoint'):
+            self.stdout.write(f"{row['endpoint']}: {row['entries']} entries, {row['size']} bytes")
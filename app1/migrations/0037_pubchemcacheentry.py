@@ -0,0 +1,27 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0036_remove_chemtable_name'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PubChemCacheEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True)),
+                ('endpoint', models.CharField(db_index=True, max_length=50, verbose_name='Endpoint')),
+                ('params', models.JSONField(default=dict, verbose_name='Parámetros')),
+                ('payload', models.BinaryField()),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Tamaño (bytes)')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira')),
+                ('last_accessed', models.DateTimeField(db_index=True, verbose_name='Último acceso')),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0037_pubchemcacheentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CasLookup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cas_number', models.CharField(max_length=20, unique=True, verbose_name='Número CAS')),
+                ('cid', models.PositiveIntegerField(blank=True, null=True, verbose_name='CID de PubChem')),
+                ('checked', models.DateTimeField(auto_now=True, verbose_name='Consultado')),
+                ('expires_at', models.DateTimeField(db_index=True, verbose_name='Expira')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:34
+
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0038_caslookup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('task', models.CharField(max_length=100, verbose_name='Tarea')),
+                ('args', models.JSONField(blank=True, default=list, verbose_name='Argumentos')),
+                ('kwargs', models.JSONField(blank=True, default=dict, verbose_name='Argumentos con nombre')),
+                ('priority', models.IntegerField(default=0, verbose_name='Prioridad')),
+                ('status', models.CharField(choices=[('queued', 'En cola'), ('running', 'En curso'), ('done', 'Terminado'), ('failed', 'Fallido')], default='queued', max_length=10, verbose_name='Estado')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Intentos')),
+                ('max_attempts', models.PositiveIntegerField(default=3, verbose_name='Intentos máximos')),
+                ('timeout', models.PositiveIntegerField(default=300, verbose_name='Tiempo de visibilidad (s)')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Ejecutar después de')),
+                ('locked_by', models.CharField(blank=True, max_length=100, verbose_name='Trabajador')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Bloqueado hasta')),
+                ('result', models.JSONField(blank=True, null=True, verbose_name='Resultado')),
+                ('output', models.BinaryField(blank=True, null=True)),
+                ('output_name', models.CharField(blank=True, max_length=255, verbose_name='Nombre del archivo')),
+                ('output_type', models.CharField(blank=True, max_length=100, verbose_name='Tipo de contenido')),
+                ('error', models.TextField(blank=True, verbose_name='Error')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='Terminado')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', '-priority', 'created'], name='app1_job_status_3f5904_idx')],
+            },
+        ),
+    ]
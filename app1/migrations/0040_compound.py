@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0039_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Compound',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cid', models.PositiveIntegerField(unique=True, verbose_name='CID de PubChem')),
+                ('cas_number', models.CharField(db_index=True, max_length=20, verbose_name='Número CAS')),
+                ('version', models.PositiveIntegerField(default=0, verbose_name='Versión')),
+                ('sections', models.JSONField(blank=True, default=dict, verbose_name='Secciones')),
+                ('chemtable', models.JSONField(blank=True, default=dict, verbose_name='Cuadro de constantes')),
+                ('built', models.DateTimeField(verbose_name='Construido')),
+            ],
+        ),
+    ]
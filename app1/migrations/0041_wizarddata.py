@@ -0,0 +1,26 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0040_compound'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WizardData',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instance', models.UUIDField(db_index=True, verbose_name='Asistente')),
+                ('key', models.CharField(max_length=100, verbose_name='Clave')),
+                ('data', models.JSONField(verbose_name='Datos')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Actualizado')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('instance', 'key'), name='unique_wizard_data_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.3 on 2026-10-18 15:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0041_wizarddata'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MSDSPdf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('data', models.BinaryField()),
+                ('size', models.PositiveIntegerField(verbose_name='Tamaño')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('msds', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdfs', to='app1.msds', verbose_name='Hoja de seguridad')),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.3 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def drop_cached_pdfs(apps, schema_editor):
+    # The PDFs cached in the database are not moved to the storage, they are rendered again.
+    apps.get_model('app1', 'MSDSPdf').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0042_msdspdf'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_cached_pdfs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='msdspdf',
+            name='data',
+        ),
+        migrations.AddField(
+            model_name='msdspdf',
+            name='name',
+            field=models.CharField(default='', max_length=255, verbose_name='Archivo'),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='ChemTablePdf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=64, unique=True, verbose_name='Clave')),
+                ('name', models.CharField(max_length=255, verbose_name='Archivo')),
+                ('size', models.PositiveIntegerField(verbose_name='Tamaño')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Creado')),
+                ('chemtable', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pdfs', to='app1.chemtable', verbose_name='Cuadro de constantes')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
@@ -1,4 +1,7 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class MSDS(models.Model):
@@ -457,4 +460,145 @@ class Chemical(models.Model):
     # Puedes agregar más campos aquí si lo deseas
 
     def __str__(self):
-        return f"{self.chemical_name} ({self.cas_number})"
\ No newline at end of file
+        return f"{self.chemical_name} ({self.cas_number})"
+
+class PubChemCacheEntry(models.Model):
+    """
+    A PubChem response shared by every worker. Entries expire after their
+    own TTL and the least recently used ones are evicted once the table
+    grows past PUBCHEM_CACHE_MAX_BYTES.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    endpoint = models.CharField(max_length=50, db_index=True, verbose_name=_("Endpoint"))
+    params = models.JSONField(default=dict, verbose_name=_("Parámetros"))
+    payload = models.BinaryField()
+    size = models.PositiveIntegerField(default=0, verbose_name=_("Tamaño (bytes)"))
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_("Expira"))
+    last_accessed = models.DateTimeField(db_index=True, verbose_name=_("Último acceso"))
+
+    def __str__(self):
+        return f"{self.endpoint} {self.params}"
+
+
+class CasLookup(models.Model):
+    """
+    Resolved CAS number -> PubChem CID. A null cid records that PubChem has
+    no compound for the CAS number, so it is not asked again until expires_at.
+    """
+    cas_number = models.CharField(max_length=20, unique=True, verbose_name=_("Número CAS"))
+    cid = models.PositiveIntegerField(blank=True, null=True, verbose_name=_("CID de PubChem"))
+    checked = models.DateTimeField(auto_now=True, verbose_name=_("Consultado"))
+    expires_at = models.DateTimeField(db_index=True, verbose_name=_("Expira"))
+
+    def __str__(self):
+        return f"{self.cas_number} -> {self.cid}"
+
+
+class Compound(models.Model):
+    """
+    Everything the app derives from PubChem for one compound, built once and
+    shared: the initial data of each wizard section and the ChemTable
+    columns. Rows built by an older app1.compounds.VERSION, or before
+    PUBCHEM_COMPOUND_TTL, are rebuilt.
+    """
+    cid = models.PositiveIntegerField(unique=True, verbose_name=_("CID de PubChem"))
+    cas_number = models.CharField(max_length=20, db_index=True, verbose_name=_("Número CAS"))
+    version = models.PositiveIntegerField(default=0, verbose_name=_("Versión"))
+    sections = models.JSONField(default=dict, blank=True, verbose_name=_("Secciones"))
+    chemtable = models.JSONField(default=dict, blank=True, verbose_name=_("Cuadro de constantes"))
+    built = models.DateTimeField(verbose_name=_("Construido"))
+
+    def __str__(self):
+        return f"{self.cas_number} (CID {self.cid})"
+
+
+class WizardData(models.Model):
+    """
+    Step data and prefilled initial data of one form wizard in progress,
+    kept out of the session by app1.wizard_storage.WizardDataStorage. Rows
+    of wizards untouched for WIZARD_DATA_TTL are purged.
+    """
+    instance = models.UUIDField(db_index=True, verbose_name=_("Asistente"))
+    key = models.CharField(max_length=100, verbose_name=_("Clave"))
+    data = models.JSONField(verbose_name=_("Datos"))
+    updated = models.DateTimeField(auto_now=True, db_index=True, verbose_name=_("Actualizado"))
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['instance', 'key'], name='unique_wizard_data_key')]
+
+    def __str__(self):
+        return f"{self.instance} {self.key}"
+
+
+class RenderedPdf(models.Model):
+    """
+    A rendered PDF, keyed by a hash of what it shows and of the PDF template
+    version (see app1.pdf_cache). The document itself is the file name in
+    the 'pdfs' storage. Only the PDF of the current content of each owner
+    is kept.
+    """
+    key = models.CharField(max_length=64, unique=True, verbose_name=_("Clave"))
+    name = models.CharField(max_length=255, verbose_name=_("Archivo"))
+    size = models.PositiveIntegerField(verbose_name=_("Tamaño"))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_("Creado"))
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.name
+
+
+class MSDSPdf(RenderedPdf):
+    msds = models.ForeignKey(MSDS, on_delete=models.CASCADE, related_name='pdfs', verbose_name=_("Hoja de seguridad"))
+
+
+class ChemTablePdf(RenderedPdf):
+    chemtable = models.ForeignKey(ChemTable, on_delete=models.CASCADE, related_name='pdfs',
+                                  verbose_name=_("Cuadro de constantes"))
+
+
+class Job(models.Model):
+    """
+    A unit of background work run by `manage.py jobs_worker`. Workers claim
+    the highest-priority queued job and hold it until locked_until; a job
+    whose worker died becomes claimable again once that visibility timeout
+    passes.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, _("En cola")),
+        (RUNNING, _("En curso")),
+        (DONE, _("Terminado")),
+        (FAILED, _("Fallido")),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.CharField(max_length=100, verbose_name=_("Tarea"))
+    args = models.JSONField(default=list, blank=True, verbose_name=_("Argumentos"))
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name=_("Argumentos con nombre"))
+    priority = models.IntegerField(default=0, verbose_name=_("Prioridad"))
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED, verbose_name=_("Estado"))
+    attempts = models.PositiveIntegerField(default=0, verbose_name=_("Intentos"))
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name=_("Intentos máximos"))
+    timeout = models.PositiveIntegerField(default=300, verbose_name=_("Tiempo de visibilidad (s)"))
+    run_after = models.DateTimeField(default=timezone.now, verbose_name=_("Ejecutar después de"))
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name=_("Trabajador"))
+    locked_until = models.DateTimeField(blank=True, null=True, verbose_name=_("Bloqueado hasta"))
+    result = models.JSONField(blank=True, null=True, verbose_name=_("Resultado"))
+    output = models.BinaryField(blank=True, null=True)
+    output_name = models.CharField(max_length=255, blank=True, verbose_name=_("Nombre del archivo"))
+    output_type = models.CharField(max_length=100, blank=True, verbose_name=_("Tipo de contenido"))
+    error = models.TextField(blank=True, verbose_name=_("Error"))
+    created = models.DateTimeField(auto_now_add=True, verbose_name=_("Creado"))
+    finished = models.DateTimeField(blank=True, null=True, verbose_name=_("Terminado"))
+
+    class Meta:
+        indexes = [models.Index(fields=['status', '-priority', 'created'])]
+
+    def __str__(self):
+        return f"{self.task} ({self.status})"
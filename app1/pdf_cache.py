@@ -0,0 +1,95 @@
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import IntegrityError, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .jobs import enqueue
+from .models import ChemTable, ChemTablePdf, MSDS, MSDSPdf
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever write_msds_pdf or write_chemtable_pdf change what they draw,
+# so cached PDFs are rendered again.
+TEMPLATE_VERSION = 2
+
+
+def pdf_storage():
+    """The storage holding rendered PDFs, STORAGES['pdfs']."""
+    return storages['pdfs']
+
+
+def _field_values(obj):
+    return {field.attname: field.value_from_object(obj) for field in obj._meta.concrete_fields}
+
+
+def pdf_key(owner):
+    """
+    Hash of everything the PDF of an MSDS or ChemTable shows, and of
+    TEMPLATE_VERSION: same key, same PDF.
+    """
+    values = [TEMPLATE_VERSION, owner._meta.label, _field_values(owner)]
+    if isinstance(owner, ChemTable):
+        values.append([_field_values(chemical) for chemical in owner.chemicals.all()])
+    content = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def cached_pdf(owner, key):
+    """
+    The stored PDF of an MSDS or ChemTable for a key.
+
+    Returns:
+        MSDSPdf, ChemTablePdf or None if it has not been rendered.
+    """
+    return owner.pdfs.filter(key=key).first()
+
+
+def store_pdf(owner, key, pdf):
+    """
+    Save a rendered PDF file to the storage, replacing older PDFs of the
+    same owner.
+
+    Returns:
+        MSDSPdf or ChemTablePdf
+    """
+    storage = pdf_storage()
+    content = File(pdf)
+    name = storage.save(f'{owner._meta.model_name}/{owner.pk}/{key}.pdf', content)
+    try:
+        with transaction.atomic():
+            entry = owner.pdfs.create(key=key, name=name, size=content.size)
+    except IntegrityError:
+        # Rendered concurrently by another request.
+        entry = owner.pdfs.get(key=key)
+        if entry.name != name:
+            storage.delete(name)
+        return entry
+    owner.pdfs.exclude(key=key).delete()
+    logger.debug(f"Stored {name} ({entry.size} bytes)")
+    return entry
+
+
+def read_pdf(entry):
+    """The bytes of a stored PDF."""
+    with pdf_storage().open(entry.name, 'rb') as f:
+        return f.read()
+
+
+@receiver(post_delete, sender=MSDSPdf, dispatch_uid='app1.pdf_cache.delete_msds_pdf')
+@receiver(post_delete, sender=ChemTablePdf, dispatch_uid='app1.pdf_cache.delete_chemtable_pdf')
+def delete_pdf_file(sender, instance, **kwargs):
+    """Delete the file of a stored PDF with its row, once the transaction commits."""
+    transaction.on_commit(lambda: pdf_storage().delete(instance.name))
+
+
+@receiver(post_save, sender=MSDS, dispatch_uid='app1.pdf_cache.prerender')
+def prerender_saved_msds(sender, instance, raw=False, **kwargs):
+    """With PDF_PRERENDER_ON_SAVE, queue the rendering of every saved MSDS."""
+    if settings.PDF_PRERENDER_ON_SAVE and not raw:
+        transaction.on_commit(lambda: enqueue('msds_pdf_prerender', instance.pk))
@@ -0,0 +1,188 @@
+import logging
+import re
+import tempfile
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from .pdf_cache import cached_pdf, pdf_key, pdf_storage, store_pdf
+
+logger = logging.getLogger(__name__)
+
+# Bytes sent to the client per chunk.
+CHUNK_SIZE = 64 * 1024
+
+PDF_SERVE_MODES = ('python', 'x-accel-redirect', 'x-sendfile')
+
+_RANGE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def spooled_pdf(write, *args):
+    """
+    Run write(*args, out) with out a SpooledTemporaryFile, which stays in
+    memory up to PDF_SPOOL_MAX_SIZE bytes and moves to disk beyond.
+
+    Returns:
+        The file, positioned at its start.
+    """
+    out = tempfile.SpooledTemporaryFile(max_size=settings.PDF_SPOOL_MAX_SIZE)
+    try:
+        write(*args, out)
+    except BaseException:
+        out.close()
+        raise
+    out.seek(0)
+    return out
+
+
+def stored_pdf(owner, write, key=None):
+    """
+    The stored PDF of an MSDS or ChemTable, rendered with write(owner, out)
+    and stored first if it changed since it was last rendered.
+
+    Returns:
+        MSDSPdf or ChemTablePdf
+    """
+    key = key or pdf_key(owner)
+    entry = cached_pdf(owner, key)
+    if entry is None:
+        with spooled_pdf(write, owner) as pdf:
+            entry = store_pdf(owner, key, pdf)
+    return entry
+
+
+def serve_pdf(request, owner, write, filename):
+    """
+    Download response for the PDF of an MSDS or ChemTable, served from the
+    PDF storage and rendered only when it changed. Conditional requests are
+    answered from its ETag (the pdf_key) and Last-Modified (when it was
+    rendered) without touching the file.
+    """
+    key = pdf_key(owner)
+    etag = quote_etag(key)
+
+    entry = cached_pdf(owner, key)
+    last_modified = int(entry.created.timestamp()) if entry else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        return _with_validators(response, etag, last_modified)
+
+    if entry is None:
+        entry = stored_pdf(owner, write, key)
+    response = stored_pdf_response(request, entry, filename, etag)
+    return _with_validators(response, etag, int(entry.created.timestamp()))
+
+
+def _with_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    # Browsers may keep the PDF but must check it is still current.
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def stored_pdf_response(request, entry, filename, etag=None):
+    """
+    Response sending a stored PDF as configured by PDF_SERVE: handed off to
+    the front proxy, or streamed from here with support for a single HTTP
+    Range.
+    """
+    mode = settings.PDF_SERVE
+    if mode not in PDF_SERVE_MODES:
+        raise ValueError(f"Unknown PDF_SERVE {mode!r}, expected one of {PDF_SERVE_MODES}")
+
+    storage = pdf_storage()
+    if mode == 'x-accel-redirect':
+        return _handoff(filename, 'X-Accel-Redirect', settings.PDF_ACCEL_REDIRECT_PREFIX + quote(entry.name))
+    if mode == 'x-sendfile' and isinstance(storage, FileSystemStorage):
+        return _handoff(filename, 'X-Sendfile', storage.path(entry.name))
+
+    byte_range = None
+    if _if_range_passes(request, etag, entry):
+        try:
+            byte_range = requested_range(request.headers.get('Range', ''), entry.size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{entry.size}'
+            return response
+
+    pdf = storage.open(entry.name, 'rb')
+    if byte_range is None:
+        response = pdf_response(pdf, filename)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(_read_range(pdf, start, end), status=206, content_type='application/pdf')
+        response['Content-Length'] = str(end - start + 1)
+        response['Content-Range'] = f'bytes {start}-{end}/{entry.size}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def _handoff(filename, header, location):
+    response = HttpResponse(content_type='application/pdf')
+    response[header] = location
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _if_range_passes(request, etag, entry):
+    """Whether a Range applies: without If-Range, or if it names the current PDF."""
+    if_range = request.headers.get('If-Range')
+    if not if_range:
+        return True
+    return if_range in (etag, http_date(int(entry.created.timestamp())))
+
+
+def requested_range(header, size):
+    """
+    The byte range asked for by a Range header, for a file of size bytes.
+    Headers asking for several ranges, or not for bytes, are ignored.
+
+    Returns:
+        (start, end) inclusive, or None to send the whole file.
+
+    Raises:
+        ValueError: the range is not satisfiable.
+    """
+    match = _RANGE.match(header.strip())
+    if not match or match.group(1) == match.group(2) == '':
+        return None
+    first, last = match.groups()
+    if first == '':
+        # Suffix range: the last bytes of the file.
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(pdf, start, end):
+    try:
+        pdf.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = pdf.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        pdf.close()
+
+
+def pdf_response(pdf, filename):
+    """Stream a PDF file object as a download, in CHUNK_SIZE chunks and with its Content-Length."""
+    response = FileResponse(pdf, as_attachment=True, filename=filename, content_type='application/pdf')
+    response.block_size = CHUNK_SIZE
+    return response
@@ -0,0 +1,88 @@
+import re
+from collections import Counter, namedtuple
+
+_OBJECT = re.compile(rb'(?m)^(\d+) 0 obj\b(.*?)\bendobj\b', re.S)
+_XOBJECTS = re.compile(rb'/XObject\s*<<(.*?)>>', re.S)
+_NAMED_REFERENCE = re.compile(rb'/([^\s/<>\[\]()]+)\s+(\d+) 0 R')
+_CONTENTS = re.compile(rb'/Contents\s+(\d+) 0 R')
+_SMASK = re.compile(rb'/SMask\s+(\d+) 0 R')
+_BASE_FONT = re.compile(rb'/BaseFont\s*/([^\s/<>\[\]()]+)')
+_SIZE = re.compile(rb'/(Width|Height)\s+(\d+)')
+
+# Size of a PDF, in bytes:
+#   total: the whole file
+#   pages: number of pages
+#   by_kind: 'image', 'form', 'font', 'content' (page drawing) and 'other' -> bytes
+#   resources: (name, kind, bytes) of every embedded image, form and font, largest first
+PdfSizeReport = namedtuple('PdfSizeReport', ['total', 'pages', 'by_kind', 'resources'])
+
+
+def _kind(head):
+    if b'/Subtype /Image' in head:
+        return 'image'
+    if b'/Subtype /Form' in head:
+        return 'form'
+    if b'/Type /Font' in head or b'/FontDescriptor' in head or b'/FontFile' in head:
+        return 'font'
+    return 'other'
+
+
+def _image_label(head):
+    size = dict(_SIZE.findall(head))
+    return f"image {int(size.get(b'Width', 0))}x{int(size.get(b'Height', 0))}"
+
+
+def pdf_size_report(pdf):
+    """
+    Break the size of a PDF written by ReportLab down by embedded resource.
+    Forms keep the name they were drawn under (see draw_form), images are
+    named after the form or page showing them.
+
+    Returns:
+        PdfSizeReport
+    """
+    objects = {}
+    for match in _OBJECT.finditer(pdf):
+        body = match.group(2)
+        head = body.split(b'stream', 1)[0]
+        objects[int(match.group(1))] = (match.end() - match.start(), head, _kind(head))
+
+    content = {int(number) for number in _CONTENTS.findall(pdf)}
+    pages = sum(1 for _, head, _ in objects.values() if re.search(rb'/Type /Page\b(?!s)', head))
+
+    # Who shows which XObject: (showing object, name, shown object)
+    shown = []
+    for number, (_, head, _) in objects.items():
+        for xobjects in _XOBJECTS.findall(head):
+            for name, target in _NAMED_REFERENCE.findall(xobjects):
+                shown.append((number, name.decode('latin-1').removeprefix('FormXob.'), int(target)))
+
+    names = {target: name for _, name, target in shown if objects.get(target, (0, b'', ''))[2] == 'form'}
+    for parent, _, target in shown:
+        if target in objects and objects[target][2] == 'image':
+            names.setdefault(target, f"{names.get(parent, 'page')} {_image_label(objects[target][1])}")
+    for number, (_, head, kind) in list(objects.items()):
+        if kind == 'image':
+            for mask in _SMASK.findall(head):
+                names[int(mask)] = f"{names.get(number, 'image')} mask"
+        elif kind == 'font':
+            base_font = _BASE_FONT.search(head)
+            names[number] = base_font.group(1).decode('latin-1') if base_font else 'font'
+
+    by_kind = Counter()
+    resources = Counter()
+    for number, (size, _, kind) in objects.items():
+        if kind == 'other' and number in content:
+            kind = 'content'
+        by_kind[kind] += size
+        if kind in ('image', 'form', 'font'):
+            resources[(names.get(number, kind), kind)] += size
+    # Header, cross-reference table and trailer.
+    by_kind['other'] += len(pdf) - sum(size for size, _, _ in objects.values())
+
+    return PdfSizeReport(
+        total=len(pdf),
+        pages=pages,
+        by_kind=dict(by_kind),
+        resources=[(name, kind, size) for (name, kind), size in resources.most_common()],
+    )
@@ -0,0 +1,169 @@
+import logging
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.contrib.staticfiles import finders
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import TableStyle
+
+from .constants import DESC_TO_IMAGE, DESC_TO_IMAGE_UN
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'images/watermark_logo.png'
+LOGO = 'images/ExtracSol.png'
+
+# What every PDF rendered by this process shares. Renders must not modify them.
+#   styles: paragraph style name (or alias) -> ParagraphStyle
+#   table_styles: name -> TableStyle, see TABLE_STYLES
+#   images: static path -> decoded ImageReader, or None if the file is not found
+PdfResources = namedtuple('PdfResources', ['styles', 'table_styles', 'images'])
+
+_PADDING = [
+    ('LEFTPADDING', (0, 0), (-1, -1), 4),
+    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+]
+_GRID = [
+    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),
+    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey),
+]
+_HEADER_ROW = ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey)
+_LABEL_COLUMN = ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey)
+_CENTERED = [
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+]
+
+TABLE_STYLES = {
+    # Label / value rows, values read top-down (sections 1 and 2).
+    'fields': _GRID + [_LABEL_COLUMN, ('VALIGN', (0, 0), (-1, -1), 'TOP')] + _PADDING,
+    'fields_centered_label': _GRID + [_LABEL_COLUMN, ('VALIGN', (0, 0), (-1, -1), 'TOP')] + _PADDING + [
+        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (0, -1), 'MIDDLE'),
+    ],
+    # Label / value rows, centered (sections 5, 6 and 14).
+    'label_column': _GRID + [_LABEL_COLUMN] + _CENTERED + _PADDING,
+    # Header row over centered columns (sections 3, 4, 7 and 8).
+    'header_row': _GRID + [_HEADER_ROW] + _CENTERED + _PADDING,
+    # Property / value tables with a header row (sections 9 to 12).
+    'header_row_label_column': _GRID + [_HEADER_ROW, _LABEL_COLUMN] + _CENTERED + _PADDING,
+    # Rows of GHS and UN pictograms.
+    'pictograms': _CENTERED + [
+        ('TOPPADDING', (0, 0), (-1, -1), 16),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 16),
+    ],
+    'chemtable': [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#FFC300")),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.whitesmoke, colors.lightgrey]),
+        ('WORDWRAP', (0, 0), (-1, -1), 'CJK'),
+    ],
+}
+
+_lock = threading.Lock()
+_resources = None
+
+
+def static_path(url):
+    """Path of a /static/ URL (or of a static path) for the staticfiles finders."""
+    return url.split('/static/')[-1].lstrip('/')
+
+
+def _styles():
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name="SectionHeading", fontName="Helvetica-Bold", fontSize=16, spaceAfter=12))
+    styles.add(ParagraphStyle(name="SubHeading", fontName="Helvetica-Bold", fontSize=13, spaceAfter=8))
+    styles.add(ParagraphStyle(name="FieldLabel", fontName="Helvetica-Bold", fontSize=10, textColor=colors.black))
+    styles.add(ParagraphStyle(name="FieldValue", fontName="Helvetica", fontSize=10))
+    styles.add(ParagraphStyle(name="Footer", alignment=2, fontSize=8, textColor=colors.grey))
+    # Cells of the table of constants, centered.
+    styles.add(ParagraphStyle(name="TableCell", fontSize=8, leading=10, alignment=1, spaceAfter=0, spaceBefore=0))
+    styles.add(ParagraphStyle(name="TableHeader", parent=styles["TableCell"],
+                              fontName="Helvetica-Bold", backColor="#FFC300"))
+    return MappingProxyType({**styles.byAlias, **styles.byName})
+
+
+def _load_image(path):
+    found = finders.find(path)
+    if not found:
+        logger.warning(f"PDF image not found in the static files: {path}")
+        return None
+    reader = ImageReader(found)
+    # Decode now, so that renders only ever read the pixels.
+    reader.getSize()
+    reader.getRGBData()
+    return reader
+
+
+def load_pdf_resources():
+    """
+    Build the PDF resources: styles, table styles and the watermark, logo,
+    GHS and UN pictogram images, decoded.
+
+    Returns:
+        PdfResources
+    """
+    paths = {WATERMARK, LOGO, *DESC_TO_IMAGE.values(), *(static_path(url) for url in DESC_TO_IMAGE_UN.values())}
+    return PdfResources(
+        styles=_styles(),
+        table_styles=MappingProxyType({name: TableStyle(commands) for name, commands in TABLE_STYLES.items()}),
+        images={path: _load_image(path) for path in sorted(paths)},
+    )
+
+
+def pdf_resources():
+    """The process-wide PdfResources, loaded on first use."""
+    global _resources
+    if _resources is None:
+        with _lock:
+            if _resources is None:
+                _resources = load_pdf_resources()
+    return _resources
+
+
+def pdf_image(path):
+    """
+    Decoded ImageReader of a static image (path or /static/ URL). Images not
+    loaded up front are looked up once, then remembered like the others.
+
+    Returns:
+        ImageReader or None if the file is not found.
+    """
+    path = static_path(path)
+    images = pdf_resources().images
+    if path not in images:
+        with _lock:
+            if path not in images:
+                images[path] = _load_image(path)
+    return images[path]
+
+
+def draw_form(canvas, name, draw, bbox=None):
+    """
+    Place the form XObject name on the canvas, drawing it with draw(canvas)
+    the first time: whatever several pages or flowables of a document share
+    is then written to the PDF once. bbox is (x0, y0, x1, y1) in the form's
+    coordinates, the page by default.
+    """
+    if not canvas.hasForm(name):
+        canvas.beginForm(name, *(bbox or ()))
+        draw(canvas)
+        canvas.endForm()
+    canvas.doForm(name)
+
+
+def reset_pdf_resources():
+    """Drop the loaded resources, e.g. after the static files changed."""
+    global _resources
+    with _lock:
+        _resources = None
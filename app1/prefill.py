@@ -0,0 +1,654 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed, wait
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .compounds import chemtable_fields, get_compound, save_compound
+from .constants import *
+from .pubchem.client import pubchem_available
+from .utils import *
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_section_executor = None
+_executor_lock = threading.Lock()
+
+# Background prefills started by start_prefill: CAS number -> _Prefill
+_prefills = OrderedDict()
+_prefills_lock = threading.Lock()
+MAX_PREFILLS = 64
+
+# The section being prefilled by the current background thread, for publish()
+_local = threading.local()
+
+# prefill_progress() statuses
+DONE = 'done'
+PENDING = 'pending'
+MISSING = 'missing'
+
+
+class PrefillCancelled(Exception):
+    """A background prefill was cancelled because nobody was waiting for it any more."""
+
+
+class _Prefill:
+    """Background prefill of the wizard sections for one CAS number."""
+
+    def __init__(self):
+        self.futures = {}  # step -> Future
+        self.partial = {}  # step -> fields published so far
+        self.lock = threading.Lock()
+        self.cancelled = threading.Event()
+        self.stored = False  # whether start_prefill will save the sections as a Compound
+        self.touch()
+
+    def touch(self):
+        self.last_seen = time.monotonic()
+
+    def publish(self, step, fields):
+        with self.lock:
+            self.partial.setdefault(step, {}).update(fields)
+
+    def published(self, step):
+        with self.lock:
+            return dict(self.partial.get(step, {}))
+
+    def cancel(self):
+        self.cancelled.set()
+        for future in self.futures.values():
+            future.cancel()
+
+
+def get_executor():
+    """Thread pool shared by every section prefill in this process."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.PUBCHEM_PREFILL_WORKERS,
+                    thread_name_prefix='pubchem-prefill',
+                )
+    return _executor
+
+
+def get_section_executor():
+    """
+    Thread pool running whole sections in the background. It is separate
+    from get_executor() because each section waits on helper calls there.
+    """
+    global _section_executor
+    if _section_executor is None:
+        with _executor_lock:
+            if _section_executor is None:
+                _section_executor = ThreadPoolExecutor(
+                    max_workers=settings.PUBCHEM_PREFETCH_WORKERS,
+                    thread_name_prefix='pubchem-prefetch',
+                )
+    return _section_executor
+
+
+def _run(fn, *args, cancelled=None):
+    if cancelled is not None and cancelled.is_set():
+        raise PrefillCancelled("Prefill cancelled")
+    try:
+        return fn(*args)
+    finally:
+        # Pool threads outlive the request, so they must release their DB connection themselves.
+        close_old_connections()
+
+
+def publish(fields):
+    """
+    Make fields of the section being prefilled in this thread visible to
+    prefill_progress() before the whole section is done. Does nothing
+    outside a background prefill.
+    """
+    prefill = getattr(_local, 'prefill', None)
+    if prefill is not None and fields:
+        prefill.publish(_local.step, fields)
+
+
+def fetch_concurrently(calls, return_exceptions=False, on_result=None):
+    """
+    Run helper calls at the same time on the prefill pool. PubChem requests
+    made by the helpers still go through the shared rate limiter. Inside a
+    background prefill that gets cancelled, calls that have not started yet
+    are skipped.
+
+    Parameters:
+        calls (dict): name -> (function, *args).
+        return_exceptions (bool): put exceptions in the results instead of raising.
+        on_result (callable): called with (name, result) as each call finishes.
+
+    Returns:
+        dict: name -> result. Unless return_exceptions is set, the first
+        exception is raised once all calls have finished.
+    """
+    prefill = getattr(_local, 'prefill', None)
+    cancelled = prefill.cancelled if prefill is not None else None
+
+    executor = get_executor()
+    futures = {
+        executor.submit(_run, fn, *args, cancelled=cancelled): name
+        for name, (fn, *args) in calls.items()
+    }
+
+    results = {}
+    error = None
+    for future in as_completed(futures):
+        name = futures[future]
+        try:
+            results[name] = future.result()
+            if on_result is not None:
+                on_result(name, results[name])
+        except Exception as e:
+            if return_exceptions:
+                results[name] = e
+            else:
+                error = error or e
+    if error is not None:
+        raise error
+    return {name: results[name] for name in calls if name in results}
+
+
+def _section2(cas, cid):
+    cached_data = {}
+    results = fetch_concurrently({
+        'classification': (get_classification_from_cid, cid),
+        'ghs': (get_ghs_label, cid),
+    })
+    ghs = results['ghs']
+
+    if results['classification']:
+        cached_data['classification'] = results['classification']
+
+    # Pictograms and signal word follow from the H-codes; PubChem's own are
+    # only used for compounds without any.
+    label = label_from_h_codes(ghs['h_codes'])
+    signal_word = label['signal_word'] or ghs['signal_word']
+    if signal_word:
+        cached_data['signal_word'] = signal_word
+    else:
+        logger.warning(f"No signal word found for CID {cid}")
+
+    if ghs['h_codes']:
+        cached_data['hazard_statements'] = '; '.join(ghs['h_codes'])
+
+    if ghs['p_codes']:
+        for category, codes_dict in ghs['p_codes'].items():
+            statements = [f"{code}: {desc}" for code, desc in codes_dict.items()]
+            cached_data[f'{category}_statements'] = '; '.join(statements)
+
+    svg_data = label['label_elements'] or ghs['pictograms']
+    if svg_data:
+        cached_data['label_elements'] = svg_data
+        existing_labels = [elem['description'] for elem in svg_data]
+        predefined_labels = PICTOGRAMS.keys()
+        cached_data['additional_pictograms'] = list(set(existing_labels) & set(predefined_labels))
+    else:
+        logger.warning(f"No SVG data found for CID {cid}")
+
+    return cached_data
+
+
+def _section3(cas, cid):
+    cached_data = {}
+    results = fetch_concurrently({
+        'iupac_name': (get_iupac, cas),
+        'synonyms': (get_synonyms_from_cas, cas),
+    }, return_exceptions=True)
+
+    iupac_name = results['iupac_name']
+    if isinstance(iupac_name, Exception):
+        logger.error(f"Error fetching IUPAC name for CAS {cas}: {iupac_name}")
+        cached_data['chemical_name'] = ''
+    elif iupac_name != '':
+        cached_data['chemical_name'] = iupac_name
+    else:
+        logger.warning(f"No IUPAC name found for CAS {cas}")
+        cached_data['chemical_name'] = ''
+
+    synonyms = results['synonyms']
+    if isinstance(synonyms, Exception):
+        logger.error(f"Error fetching synonyms for CAS {cas}: {synonyms}")
+        cached_data['synonyms'] = []
+    elif synonyms:
+        cached_data['synonyms'] = sorted(synonyms, key=lambda x: x.lower())
+
+    return cached_data
+
+
+def _section4(cas, cid):
+    cached_data = {}
+    try:
+        first_aid = get_first_aid(cid)
+
+        if first_aid != []:
+
+            cached_data['aid_inhal'] = first_aid[0]
+            cached_data['aid_inges'] = first_aid[3]
+            cached_data['aid_eye'] = first_aid[2]
+            cached_data['aid_skin'] = first_aid[1]
+
+    except Exception as e:
+        logger.error(f"Error fetching First Aid data for CAS {cas}: {e}")
+        cached_data['aid_inhal'] = ''
+        cached_data['aid_inges'] = ''
+        cached_data['aid_eye'] = ''
+        cached_data['aid_skin'] = ''
+
+    return cached_data
+
+
+def _section5(cas, cid):
+    cached_data = {}
+    try:
+        fire = get_fire(cid)
+
+        if fire != []:
+
+            cached_data['suitable_extinguishing_media'] = fire[0]
+            cached_data['special_protective_actions'] = fire[1]
+
+    except Exception as e:
+        logger.error(f"Error fetching Fire Protection data for CAS {cas}: {e}")
+        cached_data['suitable_extinguishing_media'] = ''
+        cached_data['special_protective_actions'] = ''
+
+    return cached_data
+
+
+def _section6(cas, cid):
+    cached_data = {}
+    try:
+        acci = get_acci(cid)
+        if acci != []:
+
+            cached_data['personal_precautions'] = str(acci)
+
+    except Exception as e:
+        logger.error(f"Error fetching Accidental Release Measures' data for CAS {cas}: {e}")
+        cached_data['personal_precautions'] = ''
+
+    return cached_data
+
+
+def _section7(cas, cid):
+    cached_data = {}
+    try:
+        results = fetch_concurrently({
+            'hand_stor': (get_hand_stor, cid),
+            'safe_stor': (get_safe_stor, cid),
+        })
+
+        if results['hand_stor'] != []:
+
+            cached_data['precautions_for_safe_handling'] = str(results['hand_stor'])
+
+        if results['safe_stor'] != '':
+
+            cached_data['conditions_for_safe_storage'] = results['safe_stor']
+
+    except Exception as e:
+        logger.error(f"Error fetching Handling and Storage data for CAS {cas}: {e}")
+        cached_data['precautions_for_safe_handling'] = ''
+        cached_data['conditions_for_safe_storage'] = ''
+
+    return cached_data
+
+
+def _section8(cas, cid):
+    cached_data = {}
+    try:
+        oel = get_oel(cid)
+
+        if oel != []:
+
+            cached_data['control_parameters'] = 'Occupational Exposure Limits (OEL)\n' + oel.replace(';', '\n')
+
+    except Exception as e:
+        logger.error(f"Error fetching OEL data for CAS {cas}: {e}")
+        cached_data['control_parameters'] = ''
+
+    return cached_data
+
+
+# Section 9 form field -> helper
+SECTION9_FIELDS = {
+    'phys': get_phys,
+    'odor': get_odor,
+    't_change': get_melt,
+    'boiling_point': get_boil,
+    'flammability_information': get_flame,
+    'flash_point': get_flash,
+    'auto_ignition_temperature': get_autoig,
+    'pH': get_pH,
+    'solubility': get_solu,
+    'vapor_pressure': get_vap_p,
+    'relative_vapour_density': get_vap_d,
+}
+
+
+def _section9(cas, cid):
+    cached_data = {}
+    try:
+        def keep(field, value):
+            if value != []:
+                cached_data[field] = str(value)
+                publish({field: cached_data[field]})
+
+        fetch_concurrently({field: (helper, cid) for field, helper in SECTION9_FIELDS.items()}, on_result=keep)
+
+    except Exception as e:
+        # Log the error with detailed context
+        logger.error(f"Error fetching section 9 data for CAS {cas}: {e}")
+        # Optionally add meaningful fallback data to indicate a failure
+        cached_data.update({field: 'Data not available' for field in SECTION9_FIELDS})
+
+    return cached_data
+
+
+def _fields_from_helpers(cas, cid, section, fields):
+    """Fetch helper results concurrently and keep the truthy ones as strings."""
+    cached_data = {}
+    try:
+        def keep(field, value):
+            if value:
+                cached_data[field] = str(value)
+                publish({field: cached_data[field]})
+
+        fetch_concurrently({field: (helper, cid) for field, helper in fields.items()}, on_result=keep)
+
+    except Exception as e:
+        # Log the error with detailed context
+        logger.error(f"Error fetching section {section} data for CAS {cas}: {e}")
+
+    return cached_data
+
+
+def _section10(cas, cid):
+    return _fields_from_helpers(cas, cid, 10, {
+        'reactivity': get_reac,
+        'possibility_of_hazardous_reactions': get_h_reac,
+        'hazardous_decomposition_products': get_h_decomp,
+    })
+
+
+def _section11(cas, cid):
+    return _fields_from_helpers(cas, cid, 11, {
+        'symptoms': irritants,
+        'acute_toxicity_estimates': get_tox_data,
+        'immediate_effects': get_immi_eff,
+        'chronic_effects': get_ch_eff,
+    })
+
+
+def _section12(cas, cid):
+    return _fields_from_helpers(cas, cid, 12, {
+        'ecotoxicity': get_eco_tox,
+        'other_adverse_effects': get_other_eco,
+        'bioaccumulative_potential': get_bio_accu,
+        'mobility_in_soil': get_mob_soil,
+        'persistence_and_degradability': get_degra,
+    })
+
+
+def _section14(cas, cid):
+    return _fields_from_helpers(cas, cid, 14, {
+        'UN_number': get_un,
+        'UN_proper_shipping_name': get_shipping_name,
+    })
+
+
+# Wizard step -> (builder, whether the step needs a CID)
+SECTION_PREFILLS = {
+    'section2': (_section2, True),
+    'section3': (_section3, False),
+    'section4': (_section4, True),
+    'section5': (_section5, True),
+    'section6': (_section6, True),
+    'section7': (_section7, True),
+    'section8': (_section8, True),
+    'section9': (_section9, True),
+    'section10': (_section10, True),
+    'section11': (_section11, True),
+    'section12': (_section12, True),
+    'section14': (_section14, True),
+}
+
+
+def prefill_section(step, cas_number):
+    """
+    Build the initial data of a wizard step from PubChem, or take it from
+    the compound's Compound row when it has been built already.
+
+    Returns:
+        dict: form field -> value, or None if the step has nothing to
+        prefill for this CAS number.
+    """
+    if step not in SECTION_PREFILLS or not cas_number:
+        return None
+
+    builder, needs_cid = SECTION_PREFILLS[step]
+    cid = get_cid_from_cas(cas_number) if needs_cid else None
+    if needs_cid and not cid:
+        return None
+
+    compound = get_compound(cid, cas_number)
+    if compound is not None and step in compound.sections:
+        return compound.sections[step]
+
+    return builder(cas_number, cid)
+
+
+def _prefill_in_background(prefill, step, cas_number):
+    if prefill.cancelled.is_set():
+        raise PrefillCancelled(f"Prefill of {step} for CAS {cas_number} cancelled")
+    _local.prefill, _local.step = prefill, step
+    try:
+        return _run(prefill_section, step, cas_number)
+    finally:
+        _local.prefill = _local.step = None
+
+
+def _sweep():
+    """Cancel the prefills nobody has asked about for PUBCHEM_PREFILL_IDLE_TIMEOUT seconds."""
+    idle_since = time.monotonic() - settings.PUBCHEM_PREFILL_IDLE_TIMEOUT
+    for cas_number in [cas for cas, prefill in _prefills.items() if prefill.last_seen < idle_since]:
+        logger.debug(f"Cancelling idle background prefill for CAS {cas_number}")
+        _prefills.pop(cas_number).cancel()
+
+
+def _submit(cas_number, steps, restart=False):
+    """Start the background prefill of steps that are not running yet. Holds _prefills_lock."""
+    _sweep()
+    prefill = _prefills.get(cas_number)
+    if prefill is None:
+        prefill = _prefills[cas_number] = _Prefill()
+    _prefills.move_to_end(cas_number)
+    prefill.touch()
+
+    executor = get_section_executor()
+    for step in steps:
+        if restart or step not in prefill.futures:
+            prefill.partial.pop(step, None)
+            prefill.futures[step] = executor.submit(_prefill_in_background, prefill, step, cas_number)
+
+    while len(_prefills) > MAX_PREFILLS:
+        _prefills.popitem(last=False)[1].cancel()
+    return prefill
+
+
+def _store_compound(cas_number, futures):
+    """Save the sections of a finished full prefill as the compound's Compound row."""
+    if any(future.cancelled() or future.exception() is not None for future in futures.values()):
+        return
+    if not pubchem_available():
+        # Sections built while PubChem was down are incomplete.
+        return
+
+    cid = get_cid_from_cas(cas_number)
+    if cid is None or get_compound(cid) is not None:
+        return
+
+    sections = {step: future.result() for step, future in futures.items() if future.result() is not None}
+    try:
+        chemtable = chemtable_fields(cas_number, cid)
+    except Exception as e:
+        logger.error(f"Error fetching ChemTable fields for CAS {cas_number}: {e}")
+        chemtable = {}
+    save_compound(cid, cas_number, sections, chemtable)
+
+
+def _store_compound_when_done(cas_number, futures):
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(future):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            get_section_executor().submit(_run, _store_compound, cas_number, futures)
+
+    for future in futures.values():
+        future.add_done_callback(done)
+
+
+def start_prefill(cas_number):
+    """
+    Start prefilling every wizard section for cas_number in the background.
+    Once all are done they are kept as the compound's Compound row, for the
+    next wizard or ChemTable that asks for it. Calling it again for a CAS
+    number already being prefilled does nothing.
+    """
+    if not cas_number:
+        return
+
+    with _prefills_lock:
+        prefill = _submit(cas_number, SECTION_PREFILLS)
+        if prefill.stored:
+            return
+        prefill.stored = True
+        futures = dict(prefill.futures)
+
+    _store_compound_when_done(cas_number, futures)
+    logger.debug(f"Started background prefill for CAS {cas_number}")
+
+
+def build_compound(cas_number):
+    """
+    Prefill every wizard section for cas_number in this thread and keep them
+    as the compound's Compound row, unless an up-to-date one exists. This is
+    what the sds_prefill job runs, so any worker process can build it.
+
+    Returns:
+        Compound or None if the CAS number is unknown or PubChem could not
+        be reached.
+    """
+    cid = get_cid_from_cas(cas_number)
+    if cid is None:
+        return None
+    compound = get_compound(cid)
+    if compound is not None:
+        return compound
+
+    sections = {}
+    for step in SECTION_PREFILLS:
+        data = prefill_section(step, cas_number)
+        if data is not None:
+            sections[step] = data
+    if not pubchem_available():
+        # Sections built while PubChem was down are incomplete.
+        return None
+    return save_compound(cid, cas_number, sections, chemtable_fields(cas_number, cid))
+
+
+def forget_prefill(cas_number):
+    """Drop the background prefill for cas_number, cancelling what has not run yet."""
+    with _prefills_lock:
+        prefill = _prefills.pop(cas_number, None)
+    if prefill is not None:
+        prefill.cancel()
+
+
+def _unusable(future):
+    return future.cancelled() or future.exception() is not None or future.result() is None
+
+
+def prefilled_section(step, cas_number, timeout=None):
+    """
+    Return the initial data of a wizard step from the background prefill
+    for cas_number, starting it if needed, waiting at most timeout seconds
+    (PUBCHEM_REQUEST_BUDGET by default). A background result that came
+    back empty or failed (e.g. PubChem was unreachable) is fetched again.
+
+    Returns:
+        tuple: (cached_data, complete). cached_data is a dict of form
+        field -> value, or None if the step has nothing to prefill for this
+        CAS number (see prefill_section). If the step is not done in time,
+        cached_data holds the fields fetched so far and complete is False;
+        the prefill carries on and prefill_progress() reports the rest.
+    """
+    if step not in SECTION_PREFILLS or not cas_number:
+        return None, True
+    if timeout is None:
+        timeout = settings.PUBCHEM_REQUEST_BUDGET
+
+    with _prefills_lock:
+        prefill = _submit(cas_number, [step])
+        future = prefill.futures[step]
+        if future.done() and _unusable(future):
+            future = _submit(cas_number, [step], restart=True).futures[step]
+
+    try:
+        return future.result(timeout=timeout), True
+    except TimeoutError:
+        logger.warning(f"Prefill of {step} for CAS {cas_number} not done after {timeout}s, continuing in the background")
+        return prefill.published(step), False
+    except Exception as e:
+        logger.error(f"Background prefill of {step} for CAS {cas_number} failed: {e}")
+        return None, True
+
+
+def prefill_progress(step, cas_number):
+    """
+    Where the background prefill of a wizard step stands, for clients
+    polling for the fields that missed the request budget.
+
+    A poll may reach another worker process than the one that rendered the
+    step. The step is then prefilled here too, mostly from what the first
+    worker already stored in the shared PubChem cache, waiting at most
+    PUBCHEM_PREFILL_POLL_WAIT seconds for it.
+
+    Returns:
+        tuple: (status, fields). DONE with the step's data (None if it has
+        nothing to prefill), PENDING with the fields fetched so far, or
+        MISSING if the step cannot be prefilled.
+    """
+    if step not in SECTION_PREFILLS or not cas_number:
+        return MISSING, None
+
+    started = False
+    with _prefills_lock:
+        prefill = _prefills.get(cas_number)
+        future = prefill.futures.get(step) if prefill is not None else None
+        if future is None:
+            prefill = _submit(cas_number, [step])
+            future = prefill.futures[step]
+            started = True
+        prefill.touch()
+
+    if started:
+        wait([future], timeout=settings.PUBCHEM_PREFILL_POLL_WAIT)
+    if not future.done():
+        return PENDING, prefill.published(step)
+    if future.cancelled() or future.exception() is not None:
+        return MISSING, None
+    return DONE, future.result()
@@ -0,0 +1,5 @@
+from .record import HEADINGS, CompoundRecord, load_compound_record, compound_values
+from .cas import normalize_cas, resolve_cid
+from .ghs import GHSClassification, ghs_classification
+
+__all__ = ["HEADINGS", "CompoundRecord", "load_compound_record", "compound_values", "normalize_cas", "resolve_cid", "GHSClassification", "ghs_classification"]
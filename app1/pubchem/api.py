@@ -0,0 +1,211 @@
+import logging
+from urllib.parse import quote
+
+import requests
+from django.conf import settings
+
+from . import cache, stream
+from .breaker import CircuitOpen
+from .client import get_client
+
+logger = logging.getLogger(__name__)
+
+PUG_REST_URL = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug'
+PUG_VIEW_URL = 'https://pubchem.ncbi.nlm.nih.gov/rest/pug_view'
+
+
+def _get(url, **kwargs):
+    """
+    GET a PubChem URL through the shared client.
+
+    Returns:
+        requests.Response or None if PubChem could not be reached.
+    """
+    try:
+        return get_client().get(url, **kwargs)
+    except CircuitOpen as e:
+        # Already reported when the circuit opened.
+        logger.debug(str(e))
+        return None
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error during PubChem request {url}: {e}")
+        return None
+
+
+def _quote(name):
+    return quote(str(name), safe='')
+
+
+def fetch_record(cid, headings=None):
+    """
+    Full PUG-View record for a CID, as parsed JSON. With headings, the
+    response is parsed as it streams in and only the sections under those
+    TOC headings are kept (see app1.pubchem.stream).
+    """
+    params = {'cid': cid}
+    if headings:
+        params['headings'] = stream.headings_key(headings)
+
+    def fetch():
+        response = _get(f'{PUG_VIEW_URL}/data/compound/{cid}/JSON',
+                        read_timeout=settings.PUBCHEM_RECORD_READ_TIMEOUT, stream=True)
+        if response is None or response.status_code != 200:
+            logger.warning(f"Failed to fetch PubChem record for CID {cid}. "
+                           f"Status code: {getattr(response, 'status_code', None)}")
+            if response is not None:
+                response.close()
+            return None
+
+        try:
+            if headings:
+                return stream.read_record(response, headings)
+            return response.json()
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.error(f"Error reading PubChem record for CID {cid}: {e}")
+            return None
+        finally:
+            response.close()
+
+    return cache.cached('record', params, fetch)
+
+
+def fetch_heading(cid, heading):
+    """
+    PUG-View record for a CID restricted to one TOC heading, as parsed JSON.
+
+    Returns:
+        dict: the record, empty if the compound has no such heading (this
+        answer is cached for PUBCHEM_HEADING_ABSENT_TTL), or None if
+        PubChem could not be reached.
+    """
+    def fetch():
+        response = _get(f'{PUG_VIEW_URL}/data/compound/{cid}/JSON?heading={quote(heading)}')
+        if response is None:
+            return None
+        try:
+            if response.status_code == 404:
+                logger.debug(f"No '{heading}' data on PubChem for CID {cid}")
+                return {}
+            if response.status_code != 200:
+                logger.warning(f"Failed to fetch '{heading}' for CID {cid}. Status code: {response.status_code}")
+                return None
+            return response.json()
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.error(f"Error reading '{heading}' for CID {cid}: {e}")
+            return None
+        finally:
+            response.close()
+
+    return cache.cached('heading', {'cid': cid, 'heading': heading}, fetch, ttl=_absent_ttl)
+
+
+def _absent_ttl(value):
+    return settings.PUBCHEM_HEADING_ABSENT_TTL if not value else None
+
+
+def fetch_toc(cid, headings):
+    """
+    Which of headings the compound has, from its PUG-View table of contents.
+
+    Returns:
+        list: the headings present, or None if PubChem could not be reached.
+    """
+    def fetch():
+        response = _get(f'{PUG_VIEW_URL}/index/compound/{cid}/JSON')
+        if response is None or response.status_code != 200:
+            logger.warning(f"Failed to fetch the PubChem TOC for CID {cid}. "
+                           f"Status code: {getattr(response, 'status_code', None)}")
+            if response is not None:
+                response.close()
+            return None
+
+        try:
+            return toc_headings(response.json().get('Record', {}), headings)
+        except (ValueError, requests.exceptions.RequestException) as e:
+            logger.error(f"Error reading the PubChem TOC for CID {cid}: {e}")
+            return None
+        finally:
+            response.close()
+
+    return cache.cached('toc', _toc_params(cid, headings), fetch)
+
+
+def remember_toc(cid, headings, present):
+    """Record which of headings a compound has, learnt from its full record."""
+    params = _toc_params(cid, headings)
+    if cache.lookup('toc', params) is None:
+        cache.store('toc', params, sorted(present))
+
+
+def _toc_params(cid, headings):
+    return {'cid': cid, 'headings': stream.headings_key(headings)}
+
+
+def toc_headings(record, headings):
+    """The TOCHeadings of a (PUG-View index) record that are in headings, sorted."""
+    present = set()
+    stack = list(record.get('Section', []))
+    while stack:
+        section = stack.pop()
+        if section.get('TOCHeading') in headings:
+            present.add(section['TOCHeading'])
+        stack.extend(section.get('Section', []))
+    return sorted(present)
+
+
+def fetch_cids(name):
+    """
+    List of CIDs matching a compound name or CAS number. Not cached here,
+    CAS numbers are resolved through app1.pubchem.cas.
+
+    Returns:
+        list: the CIDs, empty if PubChem has no match, or None if PubChem
+        could not be reached.
+    """
+    response = _get(f'{PUG_REST_URL}/compound/name/{_quote(name)}/cids/JSON')
+    if response is None:
+        return None
+    if response.status_code == 404:
+        return []
+    if response.status_code != 200:
+        logger.warning(f"Failed to fetch CIDs for {name}. Status code: {response.status_code}")
+        return None
+    try:
+        return response.json().get('IdentifierList', {}).get('CID', [])
+    except ValueError as e:
+        logger.error(f"Error reading CIDs for {name}: {e}")
+        return None
+
+
+def fetch_synonyms(name):
+    """Synonyms for a compound name or CAS number, one per line."""
+    def fetch():
+        response = _get(f'{PUG_REST_URL}/compound/name/{_quote(name)}/synonyms/TXT')
+        if response is None:
+            return None
+        if response.status_code != 200:
+            logger.warning(f"Failed to retrieve synonyms. HTTP Status Code: {response.status_code}")
+            logger.warning(f"Response content: {response.text}")
+            return None
+        return [line.strip() for line in response.text.splitlines() if line.strip()]
+
+    return cache.cached('synonyms', {'name': str(name)}, fetch)
+
+
+def fetch_properties(name, properties=('IUPACName', 'Title')):
+    """PUG REST property table for a compound name or CAS number."""
+    properties = ','.join(properties)
+
+    def fetch():
+        response = _get(f'{PUG_REST_URL}/compound/name/{_quote(name)}/property/{properties}/json')
+        if response is None or response.status_code != 200:
+            logger.error(f"Error: Unable to fetch chemical properties for {name} "
+                         f"(Status Code: {getattr(response, 'status_code', None)})")
+            return None
+        try:
+            return response.json()
+        except ValueError as e:
+            logger.error(f"Error reading chemical properties for {name}: {e}")
+            return None
+
+    return cache.cached('properties', {'name': str(name), 'properties': properties}, fetch)
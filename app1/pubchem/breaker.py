@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class CircuitOpen(requests.exceptions.ConnectionError):
+    """PubChem has been failing: the request was refused without being sent."""
+
+
+class CircuitBreaker:
+    """
+    Stops this process from calling PubChem while it is down.
+
+    After failure_threshold consecutive failures the circuit opens and every
+    request fails at once with CircuitOpen for cooldown seconds. Then it is
+    half-open: one request at a time is let through, one more for each probe
+    that succeeds, and the circuit closes once probes of them have succeeded.
+    A failed probe opens it for another cooldown.
+    """
+
+    def __init__(self, failure_threshold=5, cooldown=60, probes=3):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probes = probes
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.probing = 0
+        self.probe_successes = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def _refresh(self):
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            logger.info("PubChem circuit half-open, probing")
+            self.state = HALF_OPEN
+            self.probing = 0
+            self.probe_successes = 0
+
+    def current_state(self):
+        with self._lock:
+            self._refresh()
+            return self.state
+
+    def is_open(self):
+        """Whether requests are currently being refused (half-open counts as open)."""
+        return self.current_state() != CLOSED
+
+    def before_request(self, url=''):
+        """
+        Raises:
+            CircuitOpen: the circuit is open, or half-open with as many probes
+            in flight as it allows.
+        """
+        with self._lock:
+            self._refresh()
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and self.probing < 1 + self.probe_successes:
+                self.probing += 1
+                return
+            self.rejected += 1
+        raise CircuitOpen(f"PubChem circuit is {self.state}, not requesting {url}")
+
+    def record_success(self):
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probing = max(self.probing - 1, 0)
+                self.probe_successes += 1
+                if self.probe_successes >= self.probes:
+                    logger.info("PubChem circuit closed")
+                    self.state = CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                logger.warning(f"PubChem circuit open for {self.cooldown}s after {self.failures} failures")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                self.opened += 1
+
+    def stats(self):
+        with self._lock:
+            self._refresh()
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'times_opened': self.opened,
+                'rejected': self.rejected,
+            }
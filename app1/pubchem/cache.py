@@ -0,0 +1,181 @@
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from app1.models import PubChemCacheEntry
+from . import singleflight
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(endpoint, params):
+    raw = json.dumps([endpoint, params], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def endpoint_ttl(endpoint):
+    """Return the configured TTL for an endpoint, in seconds."""
+    return settings.PUBCHEM_CACHE_TTLS.get(endpoint, settings.PUBCHEM_CACHE_DEFAULT_TTL)
+
+
+def lookup(endpoint, params, stale=False):
+    """
+    Return the cached value for (endpoint, params), or None if it is missing
+    or expired. With stale, expired entries not yet evicted are returned too.
+    """
+    now = timezone.now()
+    try:
+        entry = PubChemCacheEntry.objects.only('id', 'payload', 'expires_at', 'last_accessed').get(
+            key=cache_key(endpoint, params)
+        )
+    except PubChemCacheEntry.DoesNotExist:
+        return None
+
+    if entry.expires_at <= now and not stale:
+        return None
+
+    # Only write the access time back once in a while, hits are far more common than misses.
+    if now - entry.last_accessed > timedelta(seconds=settings.PUBCHEM_CACHE_TOUCH_INTERVAL):
+        PubChemCacheEntry.objects.filter(pk=entry.pk).update(last_accessed=now)
+
+    return json.loads(zlib.decompress(bytes(entry.payload)))
+
+
+def store(endpoint, params, value, ttl=None):
+    """
+    Store a JSON-serialisable value for (endpoint, params). ttl may be a
+    function of the value, e.g. to keep "not found" answers for less time.
+    """
+    if callable(ttl):
+        ttl = ttl(value)
+    if ttl is None:
+        ttl = endpoint_ttl(endpoint)
+
+    now = timezone.now()
+    payload = zlib.compress(json.dumps(value).encode('utf-8'))
+    fields = {
+        'endpoint': endpoint,
+        'params': params,
+        'payload': payload,
+        'size': len(payload),
+        'expires_at': now + timedelta(seconds=ttl),
+        'last_accessed': now,
+    }
+    try:
+        with transaction.atomic():
+            PubChemCacheEntry.objects.update_or_create(key=cache_key(endpoint, params), defaults=fields)
+    except IntegrityError:
+        # Another worker stored the same response first.
+        pass
+
+    if _count_write():
+        evict()
+
+
+def cached(endpoint, params, fetch, ttl=None):
+    """
+    Return the cached value for (endpoint, params), calling fetch() and
+    storing its result on a miss. None results are never stored.
+
+    Concurrent misses for the same key are coalesced, so only one fetch()
+    runs at a time across the host's workers. When fetch() fails (e.g.
+    PubChem is down), an expired entry kept for PUBCHEM_CACHE_STALE_TTL is
+    returned instead, and counted in stale_hits.
+    """
+    value = lookup(endpoint, params)
+    if value is not None:
+        return value
+
+    def fill():
+        # Another process may have stored it while we waited for the lock.
+        value = lookup(endpoint, params)
+        if value is None:
+            value = fetch()
+            if value is not None:
+                store(endpoint, params, value, ttl=ttl)
+            else:
+                value = lookup(endpoint, params, stale=True)
+                if value is not None:
+                    _count_stale_hit()
+                    logger.warning(f"Serving stale PubChem '{endpoint}' entry for {params}")
+        return value
+
+    return singleflight.do(cache_key(endpoint, params), fill)
+
+
+_stale_lock = threading.Lock()
+stale_hits = 0
+
+_writes_lock = threading.Lock()
+_writes = 0
+
+
+def _count_write():
+    """Count a write, and tell whether it is time to evict (every PUBCHEM_CACHE_EVICT_EVERY writes)."""
+    global _writes
+    with _writes_lock:
+        _writes += 1
+        if _writes < settings.PUBCHEM_CACHE_EVICT_EVERY:
+            return False
+        _writes = 0
+        return True
+
+
+def _count_stale_hit():
+    global stale_hits
+    with _stale_lock:
+        stale_hits += 1
+
+
+def invalidate(endpoint=None, params=None, cid=None):
+    """
+    Delete cache entries. With no arguments the whole cache is cleared.
+
+    Returns:
+        int: the number of entries deleted.
+    """
+    entries = PubChemCacheEntry.objects.all()
+    if endpoint is not None and params is not None:
+        entries = entries.filter(key=cache_key(endpoint, params))
+    elif endpoint is not None:
+        entries = entries.filter(endpoint=endpoint)
+    if cid is not None:
+        entries = entries.filter(params__cid=cid)
+
+    deleted, _ = entries.delete()
+    return deleted
+
+
+def evict(max_bytes=None):
+    """
+    Drop entries expired for longer than PUBCHEM_CACHE_STALE_TTL, then the
+    least recently used ones until the cache fits in max_bytes
+    (PUBCHEM_CACHE_MAX_BYTES by default).
+    """
+    if max_bytes is None:
+        max_bytes = settings.PUBCHEM_CACHE_MAX_BYTES
+
+    stale_until = timezone.now() - timedelta(seconds=settings.PUBCHEM_CACHE_STALE_TTL)
+    PubChemCacheEntry.objects.filter(expires_at__lte=stale_until).delete()
+
+    total = PubChemCacheEntry.objects.aggregate(total=Sum('size'))['total'] or 0
+    if total <= max_bytes:
+        return
+
+    to_delete = []
+    for pk, size in PubChemCacheEntry.objects.order_by('last_accessed').values_list('pk', 'size').iterator():
+        if total <= max_bytes:
+            break
+        to_delete.append(pk)
+        total -= size
+
+    PubChemCacheEntry.objects.filter(pk__in=to_delete).delete()
+    logger.info(f"Evicted {len(to_delete)} PubChem cache entries to stay under {max_bytes} bytes")
@@ -0,0 +1,132 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from app1.models import CasLookup
+from . import api, singleflight
+
+logger = logging.getLogger(__name__)
+
+_DASHES = re.compile(r'[\u2010-\u2015\u2212]')
+_CAS_PATTERN = re.compile(r'^(\d{2,7})-(\d{2})-(\d)$')
+
+# CAS numbers resolved by this worker: cas -> (cid, monotonic expiry).
+_resolved = OrderedDict()
+_resolved_lock = threading.Lock()
+_RESOLVED_MAX = 4096
+
+
+def cas_check_digit(digits):
+    """Check digit for the digits of a CAS number without its last digit."""
+    return sum(int(d) * i for i, d in enumerate(reversed(digits), start=1)) % 10
+
+
+def normalize_cas(value):
+    """
+    Return a CAS number in its canonical 'NNNNNNN-NN-N' form, or None if it is
+    malformed or its check digit is wrong.
+
+    Whitespace, leading zeros, typographic dashes and missing dashes
+    ('108883', '108 88 3', '0108-88-3') are accepted.
+    """
+    if value is None:
+        return None
+
+    cas = _DASHES.sub('-', str(value))
+    cas = ''.join(cas.split())
+    if cas.isdigit():
+        if len(cas) < 5:
+            return None
+        cas = f'{cas[:-3]}-{cas[-3:-1]}-{cas[-1]}'
+
+    parts = cas.split('-')
+    if len(parts) == 3:
+        parts[0] = parts[0].lstrip('0')
+    match = _CAS_PATTERN.match('-'.join(parts))
+    if not match:
+        return None
+
+    first, second, check = match.groups()
+    if cas_check_digit(first + second) != int(check):
+        return None
+    return match.group(0)
+
+
+def _remember(cas, cid, ttl):
+    with _resolved_lock:
+        _resolved[cas] = (cid, time.monotonic() + ttl)
+        _resolved.move_to_end(cas)
+        while len(_resolved) > _RESOLVED_MAX:
+            _resolved.popitem(last=False)
+
+
+def resolve_cid(cas_number):
+    """
+    Resolve a CAS number to its PubChem CID.
+
+    Malformed CAS numbers are rejected without a request, and both found and
+    not-found answers are stored in CasLookup with their own TTLs
+    (PUBCHEM_CAS_TTL and PUBCHEM_CAS_NEGATIVE_TTL).
+
+    Returns:
+        int: the CID, or None if the CAS number is malformed, unknown to
+        PubChem, or PubChem could not be reached.
+    """
+    cas = normalize_cas(cas_number)
+    if cas is None:
+        logger.debug(f"Rejected malformed CAS number {cas_number!r}")
+        return None
+
+    hit = _resolved.get(cas)
+    if hit is not None and hit[1] > time.monotonic():
+        return hit[0]
+
+    return singleflight.do(('cas', cas), lambda: _lookup_or_fetch(cas))
+
+
+def _lookup_or_fetch(cas):
+    now = timezone.now()
+    row = CasLookup.objects.filter(cas_number=cas).values_list('cid', 'expires_at').first()
+    if row is not None and row[1] > now:
+        cid, expires_at = row
+        _remember(cas, cid, (expires_at - now).total_seconds())
+        return cid
+
+    cids = api.fetch_cids(cas)
+    if cids is None:
+        # PubChem unreachable: nothing is learned, so nothing is stored. An
+        # expired answer is still better than none.
+        if row is not None:
+            logger.warning(f"Using expired CID {row[0]} for CAS {cas}, PubChem could not be reached")
+            return row[0]
+        return None
+
+    cid = cids[0] if cids else None
+    ttl = settings.PUBCHEM_CAS_TTL if cid is not None else settings.PUBCHEM_CAS_NEGATIVE_TTL
+    CasLookup.objects.update_or_create(
+        cas_number=cas,
+        defaults={'cid': cid, 'expires_at': now + timedelta(seconds=ttl)},
+    )
+    _remember(cas, cid, ttl)
+    return cid
+
+
+def forget_cas(cas_number):
+    """
+    Drop a CAS number from this worker's resolutions and from the resolution
+    table, so it is looked up again.
+
+    Returns:
+        int: the number of CasLookup rows deleted.
+    """
+    cas = normalize_cas(cas_number) or cas_number
+    with _resolved_lock:
+        _resolved.pop(cas, None)
+    deleted, _ = CasLookup.objects.filter(cas_number=cas).delete()
+    return deleted
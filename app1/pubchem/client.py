@@ -0,0 +1,174 @@
+import logging
+import random
+import threading
+import time
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .breaker import CircuitBreaker
+from .ratelimit import TokenBucketLimiter
+from .transport import FixtureMissing, build_adapter
+
+logger = logging.getLogger(__name__)
+
+# PubChem answers these when it is busy or throttling us; they are worth retrying.
+RETRY_STATUSES = (429, 503)
+
+
+class PubChemClient:
+    """
+    The one HTTP client used to talk to PubChem.
+
+    Requests share a pooled keep-alive session, every call has a connect and a
+    read timeout, and 503 "server busy" answers are retried with jittered
+    exponential backoff. When a limiter is given, every attempt first waits
+    for a token from it. An adapter other than the default HTTPAdapter can
+    be given to record or replay traffic (see app1.pubchem.transport). With
+    a breaker, requests are refused at once while PubChem keeps failing.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=5, read_timeout=30,
+                 max_retries=3, backoff_base=0.5, backoff_max=8, limiter=None, adapter=None, breaker=None):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.limiter = limiter
+        self.breaker = breaker
+
+        self.adapter = adapter or HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+        self.session = requests.Session()
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self.session.headers['Accept-Encoding'] = 'gzip, deflate'
+
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def backoff(self, attempt, response=None):
+        """Seconds to wait before retry number attempt (0-based), with full jitter."""
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def get(self, url, connect_timeout=None, read_timeout=None, **kwargs):
+        """
+        GET url, retrying busy answers. Network errors and timeouts are raised
+        as requests exceptions, and so is CircuitOpen while the breaker is open.
+
+        Returns:
+            requests.Response: the last response received.
+        """
+        if self.breaker is None:
+            return self._get(url, connect_timeout, read_timeout, **kwargs)
+
+        self.breaker.before_request(url)
+        try:
+            response = self._get(url, connect_timeout, read_timeout, **kwargs)
+        except FixtureMissing:
+            # Replay has no recording of this URL: PubChem itself did not fail.
+            raise
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def _get(self, url, connect_timeout, read_timeout, **kwargs):
+        timeout = (connect_timeout or self.connect_timeout, read_timeout or self.read_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            response = self.session.get(url, timeout=timeout, **kwargs)
+            with self._stats_lock:
+                self.requests += 1
+            if self.limiter is not None:
+                self.limiter.observe(response)
+
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                return response
+
+            delay = self.backoff(attempt, response)
+            logger.info(f"PubChem busy ({response.status_code}), retrying in {delay:.2f}s: {url}")
+            with self._stats_lock:
+                self.retries += 1
+            response.close()
+            time.sleep(delay)
+
+    def stats(self):
+        """Request, retry, connection and rate limiter counts since the client was created."""
+        connections = 0
+        pooled_requests = 0
+        # Replayed traffic has no connection pool.
+        pools = self.adapter.poolmanager.pools if hasattr(self.adapter, 'poolmanager') else {}
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+        stats = {
+            'requests': self.requests,
+            'retries': self.retries,
+            'connections_opened': connections,
+            'connections_reused': max(pooled_requests - connections, 0),
+        }
+        if self.limiter is not None:
+            stats['rate_limiter'] = self.limiter.stats()
+        if self.breaker is not None:
+            stats['circuit_breaker'] = self.breaker.stats()
+        return stats
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return this process's PubChemClient, creating it from settings on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = PubChemClient(
+                    pool_size=settings.PUBCHEM_HTTP_POOL_SIZE,
+                    connect_timeout=settings.PUBCHEM_CONNECT_TIMEOUT,
+                    read_timeout=settings.PUBCHEM_READ_TIMEOUT,
+                    max_retries=settings.PUBCHEM_MAX_RETRIES,
+                    backoff_base=settings.PUBCHEM_BACKOFF_BASE,
+                    backoff_max=settings.PUBCHEM_BACKOFF_MAX,
+                    limiter=TokenBucketLimiter(
+                        settings.PUBCHEM_RATE_STATE_FILE,
+                        per_second=settings.PUBCHEM_RATE_PER_SECOND,
+                        per_minute=settings.PUBCHEM_RATE_PER_MINUTE,
+                        cooldown=settings.PUBCHEM_THROTTLE_COOLDOWN,
+                    ),
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.PUBCHEM_BREAKER_FAILURES,
+                        cooldown=settings.PUBCHEM_BREAKER_COOLDOWN,
+                        probes=settings.PUBCHEM_BREAKER_PROBES,
+                    ),
+                    adapter=build_adapter(
+                        settings.PUBCHEM_TRANSPORT,
+                        fixture_dir=settings.PUBCHEM_FIXTURE_DIR,
+                        pool_size=settings.PUBCHEM_HTTP_POOL_SIZE,
+                        latency=settings.PUBCHEM_REPLAY_LATENCY,
+                        latency_scale=settings.PUBCHEM_REPLAY_LATENCY_SCALE,
+                    ),
+                )
+    return _client
+
+
+def pubchem_available():
+    """False while this process's client is refusing requests because PubChem keeps failing."""
+    breaker = get_client().breaker
+    return breaker is None or not breaker.is_open()
@@ -0,0 +1,101 @@
+import logging
+from collections import namedtuple
+
+from .record import heading_record, information_value, section_information
+
+logger = logging.getLogger(__name__)
+
+HEADING = 'GHS Classification'
+
+# Raw GHS label elements of a compound, as PubChem writes them:
+#   signal_word: 'Danger' / 'Warning' or None
+#   hazard_statements: 'H225 (100%): ...; H315 (99%): ...' or None
+#   precautionary_codes: 'P210, P240, ... and P501' or None
+#   pictograms: [{'url': ..., 'description': ...}] in document order, without duplicates
+GHSClassification = namedtuple(
+    'GHSClassification', ['signal_word', 'hazard_statements', 'precautionary_codes', 'pictograms']
+)
+
+# Information Name -> GHSClassification field
+FIELD_NAMES = {
+    'Signal': 'signal_word',
+    'GHS Hazard Statements': 'hazard_statements',
+    'Precautionary Statement Codes': 'precautionary_codes',
+}
+
+# Row of each field among the valued Information items of the first source,
+# for records whose items carry no Name.
+FIELD_ROWS = {
+    'signal_word': 2,
+    'hazard_statements': 3,
+    'precautionary_codes': 4,
+}
+
+
+def _pictograms(section):
+    """
+    Pictogram icons of a section and its subsections. Only the
+    Information/Value/StringWithMarkup/Markup paths where PubChem puts them
+    are visited, iteratively.
+    """
+    pictograms = []
+    seen = set()
+    stack = [section]
+    while stack:
+        current = stack.pop()
+        for info in current.get('Information', []):
+            for string in info.get('Value', {}).get('StringWithMarkup', []):
+                for item in string.get('Markup', []):
+                    url = item.get('URL', '')
+                    if item.get('Type') == 'Icon' and url.endswith('.svg'):
+                        key = (url, item.get('Extra', 'GHS Label'))
+                        if key not in seen:
+                            seen.add(key)
+                            pictograms.append({'url': key[0], 'description': key[1]})
+        stack.extend(reversed(current.get('Section', [])))
+    return pictograms
+
+
+def parse_ghs_classification(section):
+    """
+    Parse a PUG-View 'GHS Classification' section. PubChem lists one block
+    of label elements per source; the first source's values are used.
+
+    Returns:
+        GHSClassification or None if the section is missing.
+    """
+    if section is None:
+        return None
+
+    fields = dict.fromkeys(FIELD_ROWS)
+    valued = []
+    for info in section_information(section):
+        value = information_value(info)
+        if value is None:
+            continue
+        valued.append(value)
+        field = FIELD_NAMES.get(info.get('Name'))
+        if field and fields[field] is None:
+            fields[field] = value
+
+    if all(value is None for value in fields.values()):
+        # No named items: fall back to the fixed layout Note, Pictogram(s), Signal, H, P.
+        for field, row in FIELD_ROWS.items():
+            if row < len(valued):
+                fields[field] = valued[row]
+
+    return GHSClassification(pictograms=_pictograms(section), **fields)
+
+
+def ghs_classification(cid):
+    """
+    The GHS label elements of a compound, parsed once per cached record.
+
+    Returns:
+        GHSClassification or None if PubChem has no GHS classification for
+        the compound or could not be reached.
+    """
+    record = heading_record(cid, HEADING)
+    if record is None:
+        return None
+    return record.parsed(HEADING, parse_ghs_classification)
@@ -0,0 +1,152 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: the budget only covers this process.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Share of the normal request rate to use for each X-Throttling-Control status.
+THROTTLE_FACTORS = {
+    'green': 1.0,
+    'yellow': 0.5,
+    'red': 0.2,
+    'black': 0.02,
+}
+_THROTTLE_STATUS = re.compile(r'status:\s*(\w+)', re.IGNORECASE)
+
+
+def throttle_factor(header):
+    """
+    Rate factor for an X-Throttling-Control header such as
+    'Request Count status: Green (4%), Request Time status: Yellow (55%), Service status: Green (10%)'.
+    The worst of the reported statuses wins.
+    """
+    statuses = [s.lower() for s in _THROTTLE_STATUS.findall(header or '')]
+    factors = [THROTTLE_FACTORS[s] for s in statuses if s in THROTTLE_FACTORS]
+    return min(factors) if factors else 1.0
+
+
+class TokenBucketLimiter:
+    """
+    Token buckets for PubChem's per-second and per-minute request limits.
+
+    The bucket state lives in a small JSON file guarded by an fcntl lock, so
+    every worker on the host draws from the same budget. When PubChem reports
+    Yellow/Red/Black in X-Throttling-Control the refill rate is scaled down
+    for cooldown seconds.
+    """
+
+    def __init__(self, state_file, per_second=5, per_minute=400, cooldown=10):
+        self.state_file = state_file
+        # (refill rate per second, capacity)
+        self.buckets = [(per_second, per_second), (per_minute / 60.0, per_minute)]
+        self.cooldown = cooldown
+        self._local_lock = threading.Lock()
+        self._local_state = None
+
+        self._stats_lock = threading.Lock()
+        self.acquired = 0
+        self.waited = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @contextmanager
+    def _state(self):
+        """Yield the shared bucket state for update, holding the lock."""
+        if fcntl is None:
+            with self._local_lock:
+                if self._local_state is None:
+                    self._local_state = {}
+                yield self._local_state
+            return
+
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or '{}')
+                except ValueError:
+                    state = {}
+                yield state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        factor = state.get('factor', 1.0) if state.get('factor_until', 0) > now else 1.0
+        elapsed = max(now - state.get('updated', now), 0)
+        tokens = state.get('tokens') or [capacity for _, capacity in self.buckets]
+        state['tokens'] = [
+            min(capacity, tokens[i] + elapsed * rate * factor)
+            for i, (rate, capacity) in enumerate(self.buckets)
+        ]
+        state['updated'] = now
+        return factor
+
+    def acquire(self):
+        """
+        Block until a request may be sent.
+
+        Returns:
+            float: seconds spent waiting in the queue.
+        """
+        start = time.monotonic()
+        while True:
+            with self._state() as state:
+                factor = self._refill(state, time.time())
+                tokens = state['tokens']
+                if all(t >= 1 for t in tokens):
+                    state['tokens'] = [t - 1 for t in tokens]
+                    break
+                wait = max(
+                    (1 - tokens[i]) / (rate * factor)
+                    for i, (rate, _) in enumerate(self.buckets) if tokens[i] < 1
+                )
+            time.sleep(min(wait, 1.0))
+
+        waited = time.monotonic() - start
+        with self._stats_lock:
+            self.acquired += 1
+            if waited > 0.001:
+                self.waited += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+        if waited > 1:
+            logger.info(f"PubChem request waited {waited:.2f}s for the rate limiter")
+        return waited
+
+    def observe(self, response):
+        """Adapt the shared rate to the X-Throttling-Control header of a response."""
+        factor = throttle_factor(response.headers.get('X-Throttling-Control'))
+        if factor >= 1.0:
+            return
+        logger.warning(f"PubChem throttling: {response.headers.get('X-Throttling-Control')}")
+        with self._state() as state:
+            now = time.time()
+            self._refill(state, now)
+            state['factor'] = factor
+            state['factor_until'] = now + self.cooldown
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'acquired': self.acquired,
+                'waited': self.waited,
+                'wait_total': round(self.wait_total, 3),
+                'wait_max': round(self.wait_max, 3),
+            }
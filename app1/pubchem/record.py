@@ -0,0 +1,233 @@
+import logging
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from . import api, cache
+
+logger = logging.getLogger(__name__)
+
+# Every PUG-View TOC heading read by the SDS wizard and the chemtable.
+HEADINGS = (
+    'Hazard Classes and Categories',
+    'GHS Classification',
+    'First Aid Measures',
+    'Fire Fighting Procedures',
+    'Accidental Release Measures',
+    'Handling and Storage',
+    'Safe Storage',
+    'Occupational Exposure Limits (OEL)',
+    'Physical Description',
+    'Odor',
+    'Melting Point',
+    'Boiling Point',
+    'Flammable Limits',
+    'Flash Point',
+    'Autoignition Temperature',
+    'pH',
+    'Solubility',
+    'Vapor Pressure',
+    'Vapor Density',
+    'Reactivity Profile',
+    'Other Hazardous Reactions',
+    'Decomposition',
+    'UN number',
+    'Shipping Name/ Number DOT/UN/NA/IMO',
+    'Skin, Eye, and Respiratory Irritations',
+    'Toxicity Data',
+    'Ecotoxicity Values',
+    'Ecotoxicity Excerpts',
+    'Adverse Effects',
+    'Acute Effects',
+    'Biological Half-Life',
+    'Soil Adsorption/Mobility',
+    'Environmental Biodegradation',
+    'Molecular Formula',
+)
+
+
+class CompoundRecord:
+    """
+    The full PUG-View record of one compound, indexed by TOC heading.
+
+    The record tree is walked once when the object is built and the first
+    section found for each heading in HEADINGS is kept. Everything the
+    helpers in app1/utils.py need is then read from memory, as plain
+    strings (see values()).
+    """
+
+    def __init__(self, cid, data, headings=HEADINGS):
+        self.cid = cid
+        self.sections = {}
+        self._parsed = {}
+        self._index(data.get('Record', {}), set(headings))
+
+    def _index(self, record, wanted):
+        # Depth-first, in document order, so the first match wins as it does on PubChem.
+        stack = list(reversed(record.get('Section', [])))
+        while stack and wanted:
+            section = stack.pop()
+            heading = section.get('TOCHeading')
+            if heading in wanted:
+                self.sections[heading] = section
+                wanted.discard(heading)
+            stack.extend(reversed(section.get('Section', [])))
+
+    def has(self, heading):
+        return heading in self.sections
+
+    def section(self, heading):
+        return self.sections.get(heading)
+
+    def parsed(self, heading, parser):
+        """Return parser(section) for a heading, computed once per record."""
+        key = (heading, parser)
+        if key not in self._parsed:
+            self._parsed[key] = parser(self.sections.get(heading))
+        return self._parsed[key]
+
+    def values(self, heading):
+        """
+        The text of every valued Information item under a heading, in
+        document order, as the first column of pubchem_api_crawler's
+        annotation frames holds them.
+
+        Returns:
+            tuple: the strings, empty if the record has no such heading.
+        """
+        return self.parsed(heading, extract_values)
+
+
+_records = OrderedDict()
+_records_lock = threading.Lock()
+
+
+def fetch_compound_record(cid):
+    """
+    Build the CompoundRecord for a CID from the shared PubChem cache,
+    downloading the full PUG-View record on a miss. Only the sections under
+    HEADINGS are parsed and cached.
+
+    Returns:
+        CompoundRecord or None if PubChem could not be reached.
+    """
+    data = api.fetch_record(cid, headings=HEADINGS)
+    if data is None:
+        return None
+    record = CompoundRecord(cid, data)
+    # Keep what the record says about missing headings for when it cannot be fetched.
+    api.remember_toc(cid, HEADINGS, record.sections)
+    return record
+
+
+def load_compound_record(cid):
+    """
+    Return the CompoundRecord for a CID, downloading it at most once per
+    process while it stays among the most recently used records.
+    """
+    with _records_lock:
+        if cid in _records:
+            _records.move_to_end(cid)
+            return _records[cid]
+
+    record = fetch_compound_record(cid)
+    if record is None:
+        return None
+
+    with _records_lock:
+        _records[cid] = record
+        _records.move_to_end(cid)
+        while len(_records) > settings.PUBCHEM_RECORD_CACHE_SIZE:
+            _records.popitem(last=False)
+    return record
+
+
+def forget_compound_record(cid):
+    """Drop a CID from this worker's records and from the shared cache."""
+    with _records_lock:
+        _records.pop(cid, None)
+    return cache.invalidate(cid=cid)
+
+
+def heading_record(cid, heading):
+    """
+    Return the CompoundRecord holding a heading: the cached full record, or
+    one built from a per-heading request when the full record could not be
+    downloaded. That request is skipped when the compound's table of
+    contents, or an earlier answer, shows the heading is missing.
+
+    Returns:
+        CompoundRecord or None if the compound has no such heading or
+        PubChem could not be reached.
+    """
+    record = load_compound_record(cid)
+    if record is not None:
+        return record
+
+    if heading in HEADINGS:
+        toc = api.fetch_toc(cid, HEADINGS)
+        if toc is not None and heading not in toc:
+            logger.debug(f"CID {cid} has no '{heading}' heading, skipping the request")
+            return None
+
+    data = api.fetch_heading(cid, heading)
+    if not data:
+        return None
+    return CompoundRecord(cid, data, headings=(heading,))
+
+
+def compound_values(cid, heading):
+    """
+    The strings under a heading of a compound (see CompoundRecord.values).
+
+    Returns:
+        tuple: the strings, empty if the compound has no such heading or
+        PubChem could not be reached.
+    """
+    record = heading_record(cid, heading)
+    if record is None:
+        return ()
+    return record.values(heading)
+
+
+def section_information(section):
+    """Information items of a section, or of its subsections if it has none, in document order."""
+    items = []
+    stack = [section]
+    while stack:
+        current = stack.pop()
+        if 'Information' in current:
+            items.extend(current['Information'])
+        elif 'Section' in current:
+            stack.extend(reversed(current['Section']))
+    return items
+
+
+def information_value(info):
+    """
+    The text of one PUG-View Information item, as the annotation DataFrames
+    show it: strings joined with '; ', numbers followed by their unit.
+
+    Returns:
+        str or None if the item holds neither strings nor numbers.
+    """
+    value = info.get('Value', {})
+    if 'StringWithMarkup' in value:
+        text = '; '.join(s.get('String', '') for s in value['StringWithMarkup'])
+    elif 'Number' in value:
+        text = '; '.join(map(str, value['Number']))
+    else:
+        return None
+
+    if 'Unit' in value:
+        text += ' ' + value['Unit']
+    return text
+
+
+def extract_values(section):
+    """The text of every valued Information item of a section, as a tuple."""
+    if section is None:
+        return ()
+    values = (information_value(info) for info in section_information(section))
+    return tuple(value for value in values if value is not None)
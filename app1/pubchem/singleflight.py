@@ -0,0 +1,104 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: only coalesce within the process.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Keys are spread over a fixed set of lock files so the lock directory never grows.
+LOCK_STRIPES = 256
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+_calls = {}
+_calls_lock = threading.Lock()
+
+
+def _lock_path(key):
+    stripe = int(hashlib.sha1(str(key).encode('utf-8')).hexdigest(), 16) % LOCK_STRIPES
+    return os.path.join(settings.PUBCHEM_LOCK_DIR, f'pubchem-{stripe:03d}.lock')
+
+
+@contextmanager
+def process_lock(key, timeout):
+    """
+    Hold an exclusive file lock for key, shared by every process on the host.
+    Gives up waiting after timeout seconds and runs unlocked.
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(settings.PUBCHEM_LOCK_DIR, exist_ok=True)
+    with open(_lock_path(key), 'a') as lock_file:
+        deadline = time.monotonic() + timeout
+        locked = False
+        while True:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                locked = True
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for PubChem lock {key}, fetching anyway")
+                    break
+                time.sleep(0.05)
+        try:
+            yield
+        finally:
+            if locked:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def do(key, fn, timeout=None):
+    """
+    Run fn() once for every concurrent caller asking for the same key.
+
+    The first caller in a process runs fn() while holding the cross-process
+    lock for key; the others wait and get the same result (or exception).
+    fn should re-check any shared cache first, since another process may
+    have filled it while this one waited for the lock.
+    """
+    if timeout is None:
+        timeout = settings.PUBCHEM_SINGLEFLIGHT_TIMEOUT
+
+    with _calls_lock:
+        call = _calls.get(key)
+        leader = call is None
+        if leader:
+            call = _calls[key] = _Call()
+
+    if not leader:
+        if not call.event.wait(timeout):
+            logger.warning(f"Timed out waiting for in-flight PubChem call {key}, fetching anyway")
+            return fn()
+        if call.error is not None:
+            raise call.error
+        return call.value
+
+    try:
+        with process_lock(key, timeout):
+            call.value = fn()
+    except Exception as e:
+        call.error = e
+        raise
+    finally:
+        with _calls_lock:
+            _calls.pop(key, None)
+        call.event.set()
+    return call.value
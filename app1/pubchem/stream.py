@@ -0,0 +1,128 @@
+import hashlib
+import logging
+
+try:
+    import ijson
+except ImportError:  # Without ijson the whole document is parsed, then pruned.
+    ijson = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Scalar fields of the Record object kept next to the pruned sections.
+RECORD_FIELDS = ('RecordType', 'RecordNumber', 'RecordTitle')
+
+
+def headings_key(headings):
+    """Short, order-independent digest of a set of headings, for cache keys."""
+    return hashlib.sha1('\n'.join(sorted(headings)).encode('utf-8')).hexdigest()[:12]
+
+
+def _nested_headings(section):
+    stack = list(section.get('Section', []))
+    while stack:
+        current = stack.pop()
+        yield current.get('TOCHeading')
+        stack.extend(current.get('Section', []))
+
+
+def _pruned(record, sections):
+    pruned = {key: record[key] for key in RECORD_FIELDS if key in record}
+    pruned['Section'] = sections
+    return {'Record': pruned}
+
+
+def prune_record(data, headings):
+    """
+    Keep only the sections of a parsed PUG-View record whose TOCHeading is in
+    headings. The first section found for each heading is kept whole, in
+    document order, as a flat list under Record.Section.
+    """
+    record = data.get('Record', {})
+    remaining = set(headings)
+    kept = []
+    stack = list(reversed(record.get('Section', [])))
+    while stack and remaining:
+        section = stack.pop()
+        if section.get('TOCHeading') in remaining:
+            kept.append(section)
+            remaining.discard(section['TOCHeading'])
+            remaining.difference_update(_nested_headings(section))
+        else:
+            stack.extend(reversed(section.get('Section', [])))
+    return _pruned(record, kept)
+
+
+class _ResponseReader:
+    """File-like view of a streamed requests.Response, for ijson."""
+
+    def __init__(self, response):
+        self.chunks = response.iter_content(CHUNK_SIZE)
+
+    def read(self, size=-1):
+        # ijson probes the stream type with read(0).
+        if size == 0:
+            return b''
+        return next(self.chunks, b'')
+
+
+def stream_record(fileobj, headings):
+    """
+    Same result as prune_record(json.load(fileobj), headings), built from
+    parse events so that only the kept sections are ever held in memory.
+    Parsing stops as soon as every heading has been found.
+
+    PUG-View writes TOCHeading as the first key of every section, which is
+    what lets a section be kept or skipped as soon as it starts.
+    """
+    remaining = set(headings)
+    record = {}
+    kept = []
+    builder = None
+    depth = 0
+
+    for prefix, event, value in ijson.parse(fileobj, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+                if depth == 0:
+                    section = builder.value
+                    kept.append(section)
+                    remaining.difference_update(_nested_headings(section))
+                    builder = None
+                    if not remaining:
+                        break
+            continue
+
+        if event == 'string' and prefix.endswith('Section.item.TOCHeading') and value in remaining:
+            remaining.discard(value)
+            builder = ijson.ObjectBuilder()
+            builder.event('start_map', None)
+            builder.event('map_key', 'TOCHeading')
+            builder.event('string', value)
+            depth = 1
+        elif prefix.startswith('Record.') and prefix[7:] in RECORD_FIELDS and event in ('string', 'number'):
+            record[prefix[7:]] = value
+
+    return _pruned(record, kept)
+
+
+def read_record(response, headings):
+    """
+    Parse a streamed PUG-View record response, keeping only the sections
+    under headings (see prune_record).
+
+    Raises:
+        ValueError: the response is not valid JSON.
+    """
+    if ijson is None:
+        logger.warning("ijson is not installed: parsing the whole PUG-View record in memory")
+        return prune_record(response.json(), headings)
+    try:
+        return stream_record(_ResponseReader(response), headings)
+    except ijson.JSONError as e:
+        raise ValueError(f"Invalid PUG-View JSON: {e}") from e
@@ -0,0 +1,141 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import timedelta
+
+import requests
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+logger = logging.getLogger(__name__)
+
+TRANSPORTS = ('live', 'record', 'replay')
+
+# Headers describing the wire encoding; recorded bodies are already decoded.
+_WIRE_HEADERS = ('Content-Encoding', 'Content-Length', 'Transfer-Encoding', 'Connection', 'Keep-Alive')
+
+
+class FixtureMissing(requests.exceptions.ConnectionError):
+    """
+    Replay mode has no recorded response for a URL. PubChemClient does not
+    count it as a failure of PubChem for its circuit breaker.
+    """
+
+
+def fixture_path(fixture_dir, method, url):
+    key = hashlib.sha256(f'{method} {url}'.encode('utf-8')).hexdigest()
+    return os.path.join(fixture_dir, key[:2], f'{key}.json.gz')
+
+
+class RecordingAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that also writes every final response it receives to a
+    gzipped JSON fixture keyed by method and URL, for ReplayAdapter.
+    Busy answers (429/503) are not recorded, the retry that follows is.
+    """
+
+    def __init__(self, fixture_dir, skip_statuses=(429, 503), **kwargs):
+        self.fixture_dir = fixture_dir
+        self.skip_statuses = skip_statuses
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        response = super().send(request, **kwargs)
+        if response.status_code not in self.skip_statuses:
+            self.save(request, response)
+        return response
+
+    def save(self, request, response):
+        body = response.content
+        try:
+            content = {'text': body.decode('utf-8')}
+        except UnicodeDecodeError:
+            content = {'base64': base64.b64encode(body).decode('ascii')}
+
+        fixture = {
+            'method': request.method,
+            'url': request.url,
+            'status': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k not in _WIRE_HEADERS},
+            'elapsed': response.elapsed.total_seconds(),
+            **content,
+        }
+        path = fixture_path(self.fixture_dir, request.method, request.url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump(fixture, f)
+        os.replace(tmp_path, path)
+        logger.debug(f"Recorded PubChem response {request.url} -> {path}")
+
+
+class ReplayAdapter(BaseAdapter):
+    """
+    Serves responses recorded by RecordingAdapter without touching the
+    network. A URL with no fixture raises FixtureMissing, which callers see
+    as PubChem being unreachable.
+
+    latency is the delay injected before each response: a number of
+    seconds, or 'recorded' to replay the time the live request took,
+    multiplied by latency_scale.
+    """
+
+    def __init__(self, fixture_dir, latency=0, latency_scale=1.0):
+        super().__init__()
+        self.fixture_dir = fixture_dir
+        self.latency = latency
+        self.latency_scale = latency_scale
+
+    def delay(self, fixture):
+        if self.latency == 'recorded':
+            return fixture.get('elapsed', 0) * self.latency_scale
+        return float(self.latency or 0) * self.latency_scale
+
+    def send(self, request, **kwargs):
+        path = fixture_path(self.fixture_dir, request.method, request.url)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                fixture = json.load(f)
+        except FileNotFoundError:
+            raise FixtureMissing(f"No recorded PubChem response for {request.method} {request.url}", request=request)
+
+        delay = self.delay(fixture)
+        if delay > 0:
+            time.sleep(delay)
+
+        response = requests.Response()
+        response.status_code = fixture['status']
+        response.reason = fixture.get('reason')
+        response.headers = CaseInsensitiveDict(fixture.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        if 'base64' in fixture:
+            response._content = base64.b64decode(fixture['base64'])
+        else:
+            response._content = fixture.get('text', '').encode('utf-8')
+        response._content_consumed = True
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(seconds=delay)
+        return response
+
+    def close(self):
+        pass
+
+
+def build_adapter(transport='live', fixture_dir=None, pool_size=10, latency=0, latency_scale=1.0):
+    """Return the requests adapter for a PUBCHEM_TRANSPORT mode."""
+    if transport not in TRANSPORTS:
+        raise ValueError(f"Unknown PubChem transport {transport!r}, expected one of {TRANSPORTS}")
+
+    if transport == 'replay':
+        return ReplayAdapter(fixture_dir, latency=latency, latency_scale=latency_scale)
+    if transport == 'record':
+        return RecordingAdapter(fixture_dir, pool_connections=2, pool_maxsize=pool_size, max_retries=0)
+    return HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, max_retries=0)
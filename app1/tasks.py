@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.core.mail import send_mail
+
+from .jobs import JobFile, task
+from .models import ChemTable, MSDS
+from .pdf_cache import read_pdf
+from .pdf_output import stored_pdf
+from .prefill import build_compound
+from .views.chemtable_autopop_view import lookup_chemical
+from .views.chemtable_pdf_view import write_chemtable_pdf
+from .views.sds_pdf_view import write_msds_pdf
+
+
+@task()
+def sds_prefill(cas_number):
+    """Build the Compound row of a CAS number: every wizard section and its ChemTable fields."""
+    compound = build_compound(cas_number)
+    return compound.cid if compound is not None else None
+
+
+@task()
+def chemtable_lookup(cas_number):
+    return lookup_chemical(cas_number)
+
+
+@task()
+def msds_pdf(msds_id):
+    msds = MSDS.objects.get(id=msds_id)
+    return JobFile('SDS_Test.pdf', 'application/pdf', read_pdf(stored_pdf(msds, write_msds_pdf)))
+
+
+@task()
+def msds_pdf_prerender(msds_id):
+    """Render and store the PDF of a saved MSDS, so its first download is served from the storage."""
+    msds = MSDS.objects.filter(id=msds_id).first()
+    if msds is not None:
+        return stored_pdf(msds, write_msds_pdf).name
+
+
+@task()
+def chemtable_pdf(chemtable_id):
+    chemtable = ChemTable.objects.get(id=chemtable_id)
+    pdf = read_pdf(stored_pdf(chemtable, write_chemtable_pdf))
+    return JobFile(f'Cuadro_de_constantes_{chemtable_id}.pdf', 'application/pdf', pdf)
+
+
+@task()
+def contact_mail(subject, message):
+    send_mail(
+        subject=subject,
+        message=message,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=["info@extracsol.com"],
+        fail_silently=False,
+    )
@@ -1,13 +1,52 @@
+import io
+import json
 import os
 import time
 import tempfile
 import shutil
+import threading
+import uuid
+from datetime import timedelta
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+import boto3
+import requests
+from django.conf import settings
+from django.core.management import call_command
 from django.contrib.staticfiles.testing import StaticLiveServerTestCase
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
 from django.urls import reverse
+from django.utils.datastructures import MultiValueDict
+from moto import mock_aws
+from PIL import Image
+from reportlab.platypus import SimpleDocTemplate
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from app1.models import CasLookup, ChemTable, Chemical, Compound, Job, MSDS, MSDSPdf, PubChemCacheEntry, WizardData
+from app1 import compounds, jobs, pdf_cache, pdf_resources
+from app1.pubchem import api, cache, cas as cas_module, stream
+from app1.pubchem.breaker import CircuitBreaker, CircuitOpen
+from app1.pubchem.ratelimit import TokenBucketLimiter, throttle_factor
+from app1.pubchem.client import PubChemClient
+from app1.pubchem.transport import FixtureMissing, build_adapter
+from app1.pubchem import singleflight
+from app1 import prefill
+from app1.pubchem.cas import normalize_cas, resolve_cid
+from app1.pubchem.ghs import ghs_classification, parse_ghs_classification
+from app1.pubchem.record import CompoundRecord, compound_values, fetch_compound_record
+from app1.constants import P_CODE_INDEX, lookup_p_code, tokenize_p_codes
+from app1.forms import MSDSSection2Form
+from app1.utils import RotatedImage, classify_p_codes, get_ghs_label, label_from_h_codes
+from app1.pdf_output import requested_range, spooled_pdf
+from app1.pdf_report import pdf_size_report
+from app1.views.chemtable_autopop_view import lookup_chemical
+from app1.views.chemtable_pdf_view import write_chemtable_pdf
+from app1.wizard_storage import WizardDataStorage, purge_wizard_data
 
 class WizardFormSeleniumTests(StaticLiveServerTestCase):
     @classmethod
@@ -203,4 +242,1145 @@ class WizardFormSeleniumTests(StaticLiveServerTestCase):
                 shutil.copy(os.path.join(self.download_dir, pdf), permanent_dir)
             # Optionally, verify that the file now exists in the permanent directory
             self.assertTrue(os.path.exists(os.path.join(permanent_dir, pdf_files[0])),
-                            "PDF file was not copied to the permanent location.")
\ No newline at end of file
+                            "PDF file was not copied to the permanent location.")
+
+class CasNumberTests(SimpleTestCase):
+    def test_normalize_cas(self):
+        self.assertEqual(normalize_cas("108-88-3"), "108-88-3")
+        self.assertEqual(normalize_cas(" 0000108-88-3 "), "108-88-3")
+        self.assertEqual(normalize_cas("108 88 3"), "108-88-3")
+        self.assertEqual(normalize_cas("108883"), "108-88-3")
+        self.assertEqual(normalize_cas("7732\u201318\u20135"), "7732-18-5")
+
+    def test_rejects_malformed_cas(self):
+        self.assertIsNone(normalize_cas("108-88-4"))  # wrong check digit
+        self.assertIsNone(normalize_cas("toluene"))
+        self.assertIsNone(normalize_cas("1-88-3"))
+        self.assertIsNone(normalize_cas(""))
+
+
+class CasLookupTests(TestCase):
+    def setUp(self):
+        cas_module._resolved.clear()
+
+    @mock.patch("app1.pubchem.api.fetch_cids")
+    def test_found_and_not_found_are_stored(self, fetch_cids):
+        fetch_cids.side_effect = [[1140], []]
+        self.assertEqual(resolve_cid("108-88-3"), 1140)
+        self.assertIsNone(resolve_cid("50-00-0"))
+
+        cas_module._resolved.clear()
+        self.assertEqual(resolve_cid("108 88 3"), 1140)
+        self.assertIsNone(resolve_cid("50-00-0"))
+        self.assertEqual(fetch_cids.call_count, 2)
+        self.assertEqual(CasLookup.objects.get(cas_number="50-00-0").cid, None)
+
+    @mock.patch("app1.pubchem.api.fetch_cids")
+    def test_malformed_and_unreachable_are_not_stored(self, fetch_cids):
+        fetch_cids.return_value = None
+        self.assertIsNone(resolve_cid("108-88-4"))
+        self.assertIsNone(resolve_cid("108-88-3"))
+        self.assertEqual(fetch_cids.call_count, 1)
+        self.assertFalse(CasLookup.objects.exists())
+
+    @mock.patch("app1.pubchem.api.fetch_cids")
+    def test_forgotten_cas_numbers_are_looked_up_again(self, fetch_cids):
+        fetch_cids.side_effect = [[1140], [1141]]
+        self.assertEqual(resolve_cid("108-88-3"), 1140)
+
+        out = io.StringIO()
+        call_command('pubchem_cache', '--cas', '108883', stdout=out)
+        self.assertIn("Deleted 1 CAS lookups for 108883.", out.getvalue())
+        self.assertEqual(resolve_cid("108-88-3"), 1141)
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(5)
+            return {"cid": 1140}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(singleflight.do("same-key", fetch)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"cid": 1140}] * 5)
+
+
+class SectionPrefillTests(TestCase):
+    def setUp(self):
+        # Compound rows are covered by CompoundBundleTests.
+        patcher = mock.patch("app1.prefill._store_compound_when_done")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_section_helpers_run_concurrently(self):
+        def slow(value):
+            def helper(cid):
+                time.sleep(0.3)
+                return value
+            return helper
+
+        fields = {field: slow(f"{field} value") for field in prefill.SECTION9_FIELDS}
+        fields['odor'] = slow([])
+        with mock.patch.dict(prefill.SECTION9_FIELDS, fields):
+            start = time.monotonic()
+            cached_data = prefill._section9("108-88-3", 1140)
+            elapsed = time.monotonic() - start
+
+        self.assertLess(elapsed, 0.3 * 3)
+        self.assertNotIn('odor', cached_data)
+        self.assertEqual(cached_data['phys'], "phys value")
+
+    @mock.patch("app1.prefill.get_synonyms_from_cas", return_value=["toluene", "Methylbenzene"])
+    @mock.patch("app1.prefill.get_iupac", side_effect=RuntimeError("PubChem down"))
+    def test_one_failing_helper_keeps_the_others(self, get_iupac, get_synonyms):
+        cached_data = prefill.prefill_section("section3", "108-88-3")
+        self.assertEqual(cached_data, {'chemical_name': '', 'synonyms': ["Methylbenzene", "toluene"]})
+
+    def test_background_prefill_is_reused(self):
+        calls = []
+
+        def builder(cas, cid):
+            calls.append(cas)
+            time.sleep(0.1)
+            return {'reactivity': f"reactive {cid}"}
+
+        sections = {'section10': (builder, True), 'section14': (builder, True)}
+        with mock.patch.dict(prefill.SECTION_PREFILLS, sections, clear=True), \
+                mock.patch("app1.prefill.get_cid_from_cas", return_value=1140):
+            prefill.start_prefill("108-88-3")
+            prefill.start_prefill("108-88-3")
+            self.assertEqual(prefill.prefilled_section("section10", "108-88-3"), ({'reactivity': "reactive 1140"}, True))
+            self.assertEqual(prefill.prefilled_section("section14", "108-88-3"), ({'reactivity': "reactive 1140"}, True))
+            prefill.forget_prefill("108-88-3")
+
+        self.assertEqual(len(calls), 2)
+
+    def test_slow_section_returns_fields_fetched_in_time(self):
+        release = threading.Event()
+
+        def fast(cid):
+            return "reactive"
+
+        def slow(cid):
+            release.wait(5)
+            return "CO2"
+
+        def builder(cas, cid):
+            return prefill._fields_from_helpers(cas, cid, 10, {'reactivity': fast, 'hazardous_decomposition_products': slow})
+
+        with mock.patch.dict(prefill.SECTION_PREFILLS, {'section10': (builder, True)}, clear=True), \
+                mock.patch("app1.prefill.get_cid_from_cas", return_value=1140):
+            cached_data, complete = prefill.prefilled_section("section10", "108-88-3", timeout=0.3)
+            self.assertFalse(complete)
+            self.assertEqual(cached_data, {'reactivity': "reactive"})
+
+            response = self.client.get(reverse('msds_prefill_status', args=['section10']), {'cas': "108-88-3"})
+            self.assertEqual(response.json(), {'status': prefill.PENDING, 'fields': {'reactivity': "reactive"}})
+
+            release.set()
+            time.sleep(0.1)
+            self.assertEqual(prefill.prefill_progress("section10", "108-88-3"), (prefill.DONE, {
+                'reactivity': "reactive", 'hazardous_decomposition_products': "CO2",
+            }))
+            prefill.forget_prefill("108-88-3")
+
+    def test_poll_reaching_another_worker_prefills_the_step_there(self):
+        release = threading.Event()
+
+        def slow(cid):
+            release.wait(5)
+            return "CO2"
+
+        def builder(cas, cid):
+            return prefill._fields_from_helpers(cas, cid, 10, {'reactivity': lambda cid: "reactive",
+                                                               'hazardous_decomposition_products': slow})
+
+        with mock.patch.dict(prefill.SECTION_PREFILLS, {'section10': (builder, True)}, clear=True), \
+                mock.patch("app1.prefill.get_cid_from_cas", return_value=1140), \
+                override_settings(PUBCHEM_PREFILL_POLL_WAIT=0.2):
+            self.addCleanup(prefill.forget_prefill, "108-88-3")
+            self.assertEqual(prefill.prefill_progress("section10", "108-88-3"),
+                             (prefill.PENDING, {'reactivity': "reactive"}))
+            release.set()
+            time.sleep(0.1)
+            self.assertEqual(prefill.prefill_progress("section10", "108-88-3"), (prefill.DONE, {
+                'reactivity': "reactive", 'hazardous_decomposition_products': "CO2",
+            }))
+            self.assertEqual(prefill.prefill_progress("section99", "108-88-3"), (prefill.MISSING, None))
+
+    def test_cancelled_prefill_skips_calls_not_started(self):
+        calls = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def first(cid):
+            started.set()
+            release.wait(5)
+            return "first"
+
+        def builder(cas, cid):
+            fetch = prefill.fetch_concurrently
+            fetch({'first': (first, cid)})
+            return fetch({'second': (calls.append, cid)}, return_exceptions=True)
+
+        with mock.patch.dict(prefill.SECTION_PREFILLS, {'section10': (builder, True)}, clear=True), \
+                mock.patch("app1.prefill.get_cid_from_cas", return_value=1140):
+            prefill.start_prefill("108-88-3")
+            started.wait(5)
+            with prefill._prefills_lock:
+                future = prefill._prefills["108-88-3"].futures['section10']
+            prefill.forget_prefill("108-88-3")
+            release.set()
+            result = future.result(timeout=5)
+
+        self.assertEqual(calls, [])
+        self.assertIsInstance(result['second'], prefill.PrefillCancelled)
+
+
+class CompoundBundleTests(TestCase):
+    SECTIONS = {'section10': {'reactivity': "Stable"}, 'section14': {'UN_number': "1294"}}
+    CHEMTABLE = {'chemical_name': "toluene", 'boiling_point': "110.6 °C"}
+
+    def finished(self, result):
+        future = Future()
+        future.set_result(result)
+        return future
+
+    @mock.patch("app1.prefill.pubchem_available", return_value=True)
+    @mock.patch("app1.prefill.get_cid_from_cas", return_value=1140)
+    def test_finished_prefill_is_shared(self, get_cid, available):
+        futures = {step: self.finished(data) for step, data in self.SECTIONS.items()}
+        with mock.patch("app1.prefill.chemtable_fields", return_value=self.CHEMTABLE):
+            prefill._store_compound("108-88-3", futures)
+
+        compound = Compound.objects.get(cid=1140)
+        self.assertEqual((compound.cas_number, compound.version), ("108-88-3", compounds.VERSION))
+
+        def builder(cas, cid):
+            raise AssertionError("built again")
+
+        with mock.patch.dict(prefill.SECTION_PREFILLS, {'section10': (builder, True)}, clear=True):
+            self.assertEqual(prefill.prefill_section('section10', "108-88-3"), {'reactivity': "Stable"})
+        with mock.patch("app1.views.chemtable_autopop_view.get_cid_from_cas", return_value=1140), \
+                mock.patch("app1.views.chemtable_autopop_view.chemtable_fields", side_effect=AssertionError):
+            self.assertEqual(lookup_chemical("108-88-3"), self.CHEMTABLE)
+
+    @mock.patch("app1.prefill.pubchem_available", return_value=True)
+    @mock.patch("app1.prefill.get_cid_from_cas", return_value=1140)
+    def test_compound_is_built_by_a_job(self, get_cid, available):
+        sections = {step: ((lambda data: lambda cas, cid: data)(data), True) for step, data in self.SECTIONS.items()}
+        with mock.patch.dict(prefill.SECTION_PREFILLS, sections, clear=True), \
+                mock.patch("app1.prefill.chemtable_fields", return_value=self.CHEMTABLE):
+            job = jobs.enqueue('sds_prefill', "108-88-3")
+        self.assertEqual(job.result, 1140)
+        compound = Compound.objects.get(cid=1140)
+        self.assertEqual((compound.sections, compound.chemtable), (self.SECTIONS, self.CHEMTABLE))
+
+    @mock.patch("app1.views.chemtable_autopop_view.get_cid_from_cas", return_value=1140)
+    @mock.patch("app1.views.chemtable_autopop_view.chemtable_fields", return_value=CHEMTABLE)
+    def test_chemtable_lookup_queues_the_compound_at_low_priority(self, fields, get_cid):
+        with override_settings(JOBS_ASYNC=True):
+            self.assertEqual(lookup_chemical("108-88-3"), self.CHEMTABLE)
+            # Other rows of the same compound do not queue it again.
+            lookup_chemical("108883")
+        job = Job.objects.get(task='sds_prefill')
+        self.assertEqual((job.args, job.status), (["108-88-3"], Job.QUEUED))
+        self.assertLess(job.priority, 0)
+
+        # Without a worker it would run inline.
+        lookup_chemical("108-88-3")
+        self.assertEqual(Job.objects.count(), 1)
+
+    @mock.patch("app1.compounds.get_synonyms_from_cas", return_value=[])
+    def test_compound_without_synonyms_has_no_name(self, synonyms):
+        with mock.patch.multiple("app1.compounds", get_mol_for=mock.DEFAULT, get_boil=mock.DEFAULT,
+                                 get_melt=mock.DEFAULT, get_phys=mock.DEFAULT, get_solu=mock.DEFAULT,
+                                 get_immi_eff=mock.DEFAULT):
+            self.assertEqual(compounds.chemtable_fields("108-88-3", 1140)['chemical_name'], '')
+
+    def test_outdated_compound_is_ignored(self):
+        compounds.save_compound(1140, "108-88-3", self.SECTIONS, self.CHEMTABLE)
+        self.assertIsNotNone(compounds.get_compound(cas_number="108-88-3"))
+        Compound.objects.update(version=compounds.VERSION - 1)
+        self.assertIsNone(compounds.get_compound(1140))
+        Compound.objects.update(version=compounds.VERSION, built=timezone.now() - timedelta(days=365))
+        self.assertIsNone(compounds.get_compound(1140))
+
+
+class WizardDataStorageTests(TestCase):
+    def storage(self, session=None):
+        request = RequestFactory().get('/')
+        request.session = session if session is not None else SessionStore()
+        return WizardDataStorage('msds_wizard', request)
+
+    def test_payloads_stay_out_of_the_session(self):
+        storage = self.storage()
+        synonyms = [f"synonym {i}" for i in range(5000)]
+        storage.set_prefill('section3', {'synonyms': synonyms})
+        storage.set_step_data('section1', MultiValueDict({'section1-cas_number': ["108-88-3"]}))
+        self.assertLess(len(json.dumps(storage.request.session[storage.prefix])), 300)
+
+        # A later request reads the rows once and does not rewrite unchanged data.
+        storage = self.storage(storage.request.session)
+        with self.assertNumQueries(1):
+            self.assertEqual(storage.get_prefill('section3'), {'synonyms': synonyms})
+            self.assertEqual(storage.get_step_data('section1')['section1-cas_number'], "108-88-3")
+            storage.set_prefill('section3', {'synonyms': synonyms})
+            self.assertIsNone(storage.get_prefill('section4'))
+
+        storage.reset()
+        self.assertFalse(WizardData.objects.exists())
+
+    def test_abandoned_wizards_are_purged(self):
+        old, current = self.storage(), self.storage()
+        old.set_prefill('section2', {'signal_word': "Danger"})
+        current.set_prefill('section2', {'signal_word': "Warning"})
+        WizardData.objects.filter(instance=old.instance).update(updated=timezone.now() - timedelta(days=30))
+
+        self.assertEqual(purge_wizard_data(ttl=3600), 1)
+        self.assertEqual(list(WizardData.objects.values_list('instance', flat=True)), [uuid.UUID(current.instance)])
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        self.calls = []
+        self.tasks = mock.patch.dict(jobs.TASKS, {
+            'record': lambda value: self.calls.append(value) or value,
+            'broken': lambda: 1 / 0,
+            'file': lambda: jobs.JobFile('out.pdf', 'application/pdf', b'%PDF-1.4'),
+        })
+        self.tasks.start()
+        self.addCleanup(self.tasks.stop)
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_jobs_run_by_priority(self):
+        jobs.enqueue('record', 'low')
+        jobs.enqueue('record', 'high', priority=10)
+        while jobs.run_next('worker'):
+            pass
+        self.assertEqual(self.calls, ['high', 'low'])
+        self.assertEqual(list(Job.objects.values_list('status', flat=True)), [Job.DONE, Job.DONE])
+
+    @override_settings(JOBS_ASYNC=True, JOBS_RETRY_DELAY=0)
+    def test_failed_jobs_are_retried_then_given_up(self):
+        job = jobs.enqueue('broken', max_attempts=2)
+        jobs.run_next('worker')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+
+        jobs.run_next('worker')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIn('ZeroDivisionError', job.error)
+
+    @override_settings(JOBS_ASYNC=True)
+    def test_expired_claim_is_taken_over(self):
+        job = jobs.enqueue('record', 'again')
+        self.assertEqual(jobs.claim('dead-worker').pk, job.pk)
+        self.assertIsNone(jobs.claim('other-worker'))
+
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.run_next('other-worker').pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), (Job.DONE, 2, 'again'))
+
+    @override_settings(JOBS_ASYNC=False)
+    def test_jobs_run_inline_without_worker(self):
+        job = jobs.enqueue('file')
+        self.assertEqual(job.status, Job.DONE)
+        session = self.client.session
+        session['jobs'] = [str(job.pk)]
+        session.save()
+
+        status = self.client.get(reverse('job_status', args=[job.pk])).json()
+        self.assertEqual(status['output_url'], reverse('job_output', args=[job.pk]))
+        response = self.client.get(status['output_url'])
+        self.assertEqual(response.content, b'%PDF-1.4')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+    @override_settings(JOBS_ASYNC=False)
+    @mock.patch("app1.tasks.lookup_chemical", return_value={'chemical_name': "toluene"})
+    def test_only_the_session_that_queued_a_job_sees_it(self, lookup):
+        accepted = self.client.post(reverse('enqueue_chemtable_lookup'), {'cas_number': "108-88-3"})
+        self.assertEqual(accepted.status_code, 202)
+        status_url = accepted.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json()['result'], {'chemical_name': "toluene"})
+
+        anonymous = Client()
+        self.assertEqual(anonymous.get(status_url).status_code, 404)
+        pdf = jobs.enqueue('file')
+        self.assertEqual(anonymous.get(reverse('job_status', args=[pdf.pk])).status_code, 404)
+        self.assertEqual(anonymous.get(reverse('job_output', args=[pdf.pk])).status_code, 404)
+
+
+class ScriptedAdapter(requests.adapters.BaseAdapter):
+    """Answers each request with the next of responses (status codes or (status, headers))."""
+
+    def __init__(self, responses):
+        super().__init__()
+        self.responses = list(responses)
+        self.sent = []
+
+    def send(self, request, **kwargs):
+        self.sent.append((request.url, kwargs.get('timeout')))
+        status, headers = self.responses.pop(0) if self.responses else (200, {})
+        response = json_response({}, status)
+        response.headers.update(headers)
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        body = b'{"IdentifierList": {"CID": [1140]}}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PubChemClientTests(SimpleTestCase):
+    URL = f"{api.PUG_REST_URL}/compound/name/108-88-3/cids/JSON"
+
+    @mock.patch('app1.pubchem.client.time.sleep')
+    def test_busy_answers_are_retried(self, sleep):
+        adapter = ScriptedAdapter([(429, {}), (503, {'Retry-After': '2'}), (200, {})])
+        client = PubChemClient(adapter=adapter, max_retries=3, connect_timeout=1, read_timeout=2)
+        self.assertEqual(client.get(self.URL).status_code, 200)
+
+        self.assertEqual([timeout for url, timeout in adapter.sent], [(1, 2)] * 3)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(sleep.call_args_list[1], mock.call(2.0))
+        self.assertEqual(client.stats()['requests'], 3)
+        self.assertEqual(client.stats()['retries'], 2)
+
+    @mock.patch('app1.pubchem.client.time.sleep')
+    def test_gives_up_after_max_retries(self, sleep):
+        adapter = ScriptedAdapter([(503, {})] * 5)
+        client = PubChemClient(adapter=adapter, max_retries=2)
+        self.assertEqual(client.get(self.URL).status_code, 503)
+        self.assertEqual(len(adapter.sent), 3)
+        self.assertEqual(sleep.call_count, 2)
+
+        adapter = ScriptedAdapter([(404, {}), (503, {})])
+        client = PubChemClient(adapter=adapter)
+        self.assertEqual(client.get(self.URL).status_code, 404)
+        self.assertEqual(len(adapter.sent), 1)
+
+    def test_backoff_is_jittered_exponential_and_capped(self):
+        client = PubChemClient(backoff_base=0.5, backoff_max=3)
+        with mock.patch('app1.pubchem.client.random.uniform', side_effect=lambda low, high: high):
+            self.assertEqual([client.backoff(attempt) for attempt in range(5)], [0.5, 1.0, 2.0, 3, 3])
+        for attempt in range(5):
+            self.assertLessEqual(client.backoff(attempt), 3)
+        busy = json_response({}, 429)
+        busy.headers['Retry-After'] = '1'
+        self.assertEqual(client.backoff(4, busy), 1.0)
+        busy.headers['Retry-After'] = '10'
+        self.assertEqual(client.backoff(0, busy), 3)
+
+    def test_connections_are_reused(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        client = PubChemClient()
+        url = f"http://127.0.0.1:{server.server_port}/rest/pug/compound/name/108-88-3/cids/JSON"
+        for _ in range(3):
+            self.assertEqual(client.get(url).json(), {"IdentifierList": {"CID": [1140]}})
+
+        stats = client.stats()
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_opened'], 1)
+        self.assertEqual(stats['connections_reused'], 2)
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping moves the clock forward at once."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+    monotonic = time
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RateLimiterTests(SimpleTestCase):
+    def setUp(self):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        self.state_file = os.path.join(state_dir, 'rate.json')
+        self.clock = FakeClock()
+        clock = mock.patch('app1.pubchem.ratelimit.time', self.clock)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def limiter(self):
+        return TokenBucketLimiter(self.state_file, per_second=2, per_minute=600, cooldown=10)
+
+    def throttled(self, header):
+        response = json_response({})
+        response.headers['X-Throttling-Control'] = header
+        return response
+
+    def test_throttling_header_is_parsed(self):
+        self.assertEqual(throttle_factor(
+            'Request Count status: Green (4%), Request Time status: Yellow (55%), Service status: Green (10%)'), 0.5)
+        self.assertEqual(throttle_factor('Request Count status: Red (80%), Service status: BLACK (99%)'), 0.02)
+        self.assertEqual(throttle_factor('Request Count status: Green (4%)'), 1.0)
+        self.assertEqual(throttle_factor('Request Count status: Purple'), 1.0)
+        self.assertEqual(throttle_factor(None), 1.0)
+
+    def test_processes_share_the_budget(self):
+        first, second = self.limiter(), self.limiter()
+        self.assertEqual(first.acquire(), 0)
+        self.assertEqual(first.acquire(), 0)
+        # The other process finds the per-second bucket empty and waits for one token.
+        self.assertAlmostEqual(second.acquire(), 0.5)
+        self.assertEqual(second.stats()['waited'], 1)
+
+        self.clock.sleep(5)
+        self.assertEqual(first.acquire(), 0)
+        self.assertEqual(second.acquire(), 0)
+
+    def test_throttling_slows_the_refill_until_the_cooldown(self):
+        first, second = self.limiter(), self.limiter()
+        first.acquire()
+        first.acquire()
+        first.observe(self.throttled('Request Count status: Red (80%)'))
+        # Red: refilled at 0.2 x 2 tokens per second, for every process.
+        self.assertAlmostEqual(second.acquire(), 2.5)
+
+        first.observe(self.throttled('Request Count status: Green (4%)'))
+        self.clock.sleep(10)
+        self.assertEqual(second.acquire(), 0)
+        self.assertEqual(second.acquire(), 0)
+        # Back to the full rate once the cooldown is over.
+        self.assertAlmostEqual(first.acquire(), 0.5)
+
+
+class PubChemTransportTests(SimpleTestCase):
+    def setUp(self):
+        self.fixture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.fixture_dir)
+
+    def live_response(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers['Content-Type'] = 'application/json'
+        response._content = b'{"IdentifierList": {"CID": [1140]}}'
+        response.url = request.url
+        response.request = request
+        response.elapsed = timedelta(seconds=0.25)
+        return response
+
+    def test_recorded_responses_are_replayed_offline(self):
+        url = f"{api.PUG_REST_URL}/compound/name/108-88-3/cids/JSON"
+        with mock.patch.object(requests.adapters.HTTPAdapter, 'send', self.live_response):
+            recorder = PubChemClient(adapter=build_adapter('record', fixture_dir=self.fixture_dir))
+            self.assertEqual(recorder.get(url).json(), {"IdentifierList": {"CID": [1140]}})
+
+        replay = PubChemClient(adapter=build_adapter('replay', fixture_dir=self.fixture_dir,
+                                                     latency='recorded', latency_scale=0.4))
+        start = time.monotonic()
+        response = replay.get(url)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"IdentifierList": {"CID": [1140]}})
+
+        with mock.patch("app1.pubchem.api.get_client", return_value=replay):
+            self.assertEqual(api.fetch_cids("108-88-3"), [1140])
+            self.assertIsNone(api.fetch_cids("50-00-0"))
+
+    def test_missing_fixtures_do_not_open_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        replay = PubChemClient(adapter=build_adapter('replay', fixture_dir=self.fixture_dir), breaker=breaker)
+        for _ in range(3):
+            with self.assertRaises(FixtureMissing):
+                replay.get(f"{api.PUG_REST_URL}/compound/name/50-00-0/cids/JSON")
+        self.assertEqual(breaker.current_state(), 'closed')
+
+
+def pug_info(strings, name=None, markup=None):
+    info = {"Value": {"StringWithMarkup": [{"String": s} for s in strings]}}
+    if markup:
+        info["Value"]["StringWithMarkup"][0]["Markup"] = markup
+    if name:
+        info["Name"] = name
+    return info
+
+
+def ghs_icon(number, extra):
+    return {"Type": "Icon", "URL": f"https://pubchem.ncbi.nlm.nih.gov/images/ghs/GHS0{number}.svg", "Extra": extra}
+
+
+GHS_SECTION = {"TOCHeading": "GHS Classification", "Information": [
+    pug_info([""], "Pictogram(s)", [ghs_icon(2, "Flammable"), ghs_icon(7, "Irritant")]),
+    pug_info(["Danger"], "Signal"),
+    pug_info(["H225 (100%): Highly Flammable liquid and vapor"], "GHS Hazard Statements"),
+    pug_info(["P210, P240, and P501"], "Precautionary Statement Codes"),
+    pug_info([""], "Pictogram(s)", [ghs_icon(7, "Irritant")]),
+    pug_info(["Warning"], "Signal"),
+]}
+
+
+class GHSClassificationTests(SimpleTestCase):
+    def test_named_fields_from_first_source(self):
+        ghs = parse_ghs_classification(GHS_SECTION)
+        self.assertEqual(ghs.signal_word, "Danger")
+        self.assertEqual(ghs.hazard_statements, "H225 (100%): Highly Flammable liquid and vapor")
+        self.assertEqual(ghs.precautionary_codes, "P210, P240, and P501")
+        self.assertEqual([p['description'] for p in ghs.pictograms], ["Flammable", "Irritant"])
+
+    def test_unnamed_fields_fall_back_to_rows(self):
+        section = {"TOCHeading": "GHS Classification", "Information": [
+            pug_info(["Note"]), pug_info([""]), pug_info(["Warning"]), pug_info(["H315"]), pug_info(["P264"]),
+        ]}
+        ghs = parse_ghs_classification(section)
+        self.assertEqual((ghs.signal_word, ghs.hazard_statements, ghs.precautionary_codes), ("Warning", "H315", "P264"))
+
+    def test_section_is_parsed_once_per_record(self):
+        record = CompoundRecord(1140, {"Record": {"Section": [GHS_SECTION]}})
+        with mock.patch("app1.pubchem.ghs.heading_record", return_value=record):
+            label = get_ghs_label(1140)
+            self.assertIs(ghs_classification(1140), ghs_classification(1140))
+        self.assertEqual(label['signal_word'], "Danger")
+        self.assertEqual(label['h_codes'], ["H225: Highly Flammable liquid and vapor"])
+        self.assertEqual(list(label['p_codes']['prevention']), ["P210", "P240"])
+
+
+class PrecautionaryCodeTests(SimpleTestCase):
+    def test_tokenizer_keeps_combined_codes(self):
+        self.assertEqual(
+            tokenize_p_codes("P261, P280, P305 + P351 + P338, P370+P380+P375[+P378], and P501"),
+            ["P261", "P280", "P305+P351+P338", "P370+P380+P375[+P378]", "P501"],
+        )
+
+    def test_combined_code_missing_from_index_is_built_from_parts(self):
+        self.assertNotIn("P501+P102", P_CODE_INDEX)
+        category, text = lookup_p_code("P501+P102")
+        self.assertEqual(category, "disposal")
+        self.assertEqual(text, f"{P_CODE_INDEX['P501'][1]} {P_CODE_INDEX['P102'][1]}")
+        self.assertIsNone(lookup_p_code("P999"))
+
+    def test_codes_grouped_by_category(self):
+        codes = classify_p_codes("P102, P210; P305+P351+P338, P403 and P999")
+        self.assertEqual({category: list(group) for category, group in codes.items()}, {
+            "general": ["P102"], "prevention": ["P210"], "response": ["P305+P351+P338"],
+            "storage": ["P403"], "disposal": [],
+        })
+
+
+class HazardLabelRuleTests(SimpleTestCase):
+    def descriptions(self, label):
+        return [element['description'] for element in label['label_elements']]
+
+    def test_pictograms_and_signal_word_from_h_codes(self):
+        label = label_from_h_codes(["H225: Highly Flammable liquid and vapor", "H315: Causes skin irritation"])
+        self.assertEqual(self.descriptions(label), ["Flammable", "Irritant"])
+        self.assertEqual(label['signal_word'], "Danger")
+        self.assertEqual(label_from_h_codes("H315; H319")['signal_word'], "Warning")
+        self.assertEqual(label_from_h_codes([]), {'label_elements': [], 'signal_word': None})
+
+    def test_precedence(self):
+        self.assertEqual(self.descriptions(label_from_h_codes("H301, H302, H335")), ["Acute Toxic"])
+        self.assertEqual(self.descriptions(label_from_h_codes("H314, H315, H319")), ["Corrosive"])
+        # The exclamation mark stays when it is shown for something else than irritation.
+        self.assertEqual(self.descriptions(label_from_h_codes("H318, H315, H336")), ["Corrosive", "Irritant"])
+        self.assertEqual(self.descriptions(label_from_h_codes("H334, H317")), ["Health Hazard"])
+        self.assertEqual(self.descriptions(label_from_h_codes("H360FD, H317")), ["Irritant", "Health Hazard"])
+
+    def test_typed_hazard_statements_fill_label_elements(self):
+        form = MSDSSection2Form(data={'classification': "Flam. Liq. 2", 'signal_word': "Warning",
+                                      'hazard_statements': "H225; H318"})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual([e['description'] for e in form.cleaned_data['label_elements']], ["Flammable", "Corrosive"])
+        self.assertEqual(form.cleaned_data['signal_word'], "Danger")
+
+        # A signal word the user chose is kept.
+        form = MSDSSection2Form(data={'classification': "Skin Irrit. 2", 'signal_word': "Danger",
+                                      'hazard_statements': "H315"})
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.cleaned_data['signal_word'], "Danger")
+
+
+def annotation_frame(record, heading):
+    """A heading of a record in the layout of pubchem_api_crawler's Annotations().get_compound_annotations()."""
+    import numpy as np
+    import pandas as pd
+    from pubchem_api_crawler.annotations import _extract_compound_annotations
+
+    data = _extract_compound_annotations({'Record': {'Section': [record.sections[heading]]}})
+    df = pd.DataFrame.from_dict(data, orient='index').stack().to_frame()
+    df = pd.DataFrame(df[0].values.tolist(), index=df.index)
+    df.loc['CID', :] = record.cid
+    return df.transpose().fillna(value=np.nan).reset_index(drop=True)
+
+
+class CompoundRecordTests(SimpleTestCase):
+    RECORD = {"Record": {"Section": [
+        {"TOCHeading": "Chemical and Physical Properties", "Section": [
+            {"TOCHeading": "Boiling Point", "Information": [
+                pug_info(["110.6 °C"]),
+                {"Value": {"Number": [231.1], "Unit": "°F"}},
+                {"Value": {"ExternalDataURL": ["https://example.org"]}},
+            ]},
+            {"TOCHeading": "Odor", "Information": [pug_info(["Sweet", "pungent"])]},
+        ]},
+        GHS_SECTION,
+    ]}}
+
+    def test_values_match_annotation_frames(self):
+        record = CompoundRecord(1140, self.RECORD)
+        self.assertEqual(record.values("Boiling Point"), ("110.6 °C", "231.1 °F"))
+        self.assertEqual(record.values("Odor"), ("Sweet; pungent",))
+        self.assertEqual(record.values("Flash Point"), ())
+        for heading in ("Boiling Point", "Odor", "GHS Classification"):
+            frame = annotation_frame(record, heading)
+            self.assertEqual(list(record.values(heading)), frame.iloc[:, 0].dropna().tolist())
+
+
+class StreamingRecordTests(SimpleTestCase):
+    RECORD = {"Record": {"RecordNumber": 1140, "Reference": [{"SourceName": "x" * 100}] * 50, "Section": [
+        {"TOCHeading": "Names and Identifiers", "Section": [
+            {"TOCHeading": "Molecular Formula", "Information": [pug_info(["C7H8"])]},
+        ]},
+        {"TOCHeading": "Safety and Hazards", "Section": [
+            {"TOCHeading": "Handling and Storage", "Section": [
+                {"TOCHeading": "Safe Storage", "Information": [pug_info(["Keep cool"])]},
+            ]},
+            {"TOCHeading": "Safe Storage", "Information": [pug_info(["Later duplicate"])]},
+            {"TOCHeading": "Spectral Information", "Information": [pug_info(["IR"])]},
+        ]},
+    ]}}
+    HEADINGS = ("Molecular Formula", "Handling and Storage", "Safe Storage")
+
+    def response(self, body):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response._content_consumed = True
+        return response
+
+    def test_streamed_and_parsed_records_are_pruned_alike(self):
+        body = json.dumps(self.RECORD).encode('utf-8')
+        streamed = stream.read_record(self.response(body), self.HEADINGS)
+        with mock.patch("app1.pubchem.stream.ijson", None):
+            parsed = stream.read_record(self.response(body), self.HEADINGS)
+
+        self.assertEqual(streamed, parsed)
+        self.assertEqual([s["TOCHeading"] for s in streamed["Record"]["Section"]],
+                         ["Molecular Formula", "Handling and Storage"])
+        self.assertNotIn("Reference", streamed["Record"])
+        record = CompoundRecord(1140, streamed)
+        self.assertEqual(record.values("Safe Storage"), ("Keep cool",))
+
+    def test_stops_reading_once_every_heading_is_found(self):
+        body = json.dumps(self.RECORD).encode('utf-8')
+        end = body.index(b'"Spectral Information"')
+        # Anything after the last wanted section is never parsed.
+        truncated = body[:end] + b'}garbage'
+        self.assertEqual(len(stream.read_record(self.response(truncated), self.HEADINGS)["Record"]["Section"]), 2)
+        with self.assertRaises(ValueError):
+            stream.read_record(self.response(body[:40]), self.HEADINGS)
+
+
+def json_response(data, status=200):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(data).encode('utf-8')
+    response._content_consumed = True
+    return response
+
+
+class HeadingTocTests(TestCase):
+    def setUp(self):
+        self.urls = []
+        patcher = mock.patch("app1.pubchem.record.load_compound_record", return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def pubchem(self, url, **kwargs):
+        self.urls.append(url)
+        if '/index/' in url:
+            return json_response({"Record": {"Section": [{"TOCHeading": "Chemical and Physical Properties", "Section": [
+                {"TOCHeading": "Odor"}, {"TOCHeading": "Boiling Point"},
+            ]}]}})
+        if 'Odor' in url:
+            return json_response({"Record": {"Section": [{"TOCHeading": "Odor", "Information": [pug_info(["Sweet"])]}]}})
+        return json_response({"Fault": {"Code": "PUGVIEW.NotFound"}}, status=404)
+
+    def test_headings_missing_from_toc_are_not_requested(self):
+        with mock.patch("app1.pubchem.api._get", side_effect=self.pubchem):
+            self.assertEqual(compound_values(1140, 'Odor'), ("Sweet",))
+            self.assertEqual(compound_values(1140, 'pH'), ())
+            self.assertEqual(compound_values(1140, 'Soil Adsorption/Mobility'), ())
+        self.assertEqual(len(self.urls), 2)
+        self.assertFalse(any('pH' in url for url in self.urls))
+
+    def test_absent_heading_is_cached(self):
+        with mock.patch("app1.pubchem.api._get", side_effect=self.pubchem), \
+                mock.patch("app1.pubchem.api.fetch_toc", return_value=None):
+            self.assertEqual(compound_values(1140, 'Boiling Point'), ())
+            self.assertEqual(compound_values(1140, 'Boiling Point'), ())
+        self.assertEqual(len(self.urls), 1)
+        self.assertEqual(PubChemCacheEntry.objects.get(endpoint='heading').params['heading'], 'Boiling Point')
+
+    def test_invalid_json_is_not_cached(self):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'<html>Server busy</html>'
+        response._content_consumed = True
+        with mock.patch("app1.pubchem.api._get", return_value=response), \
+                mock.patch.object(response, 'close') as close, \
+                self.assertLogs('app1.pubchem.api', 'ERROR'):
+            self.assertIsNone(api.fetch_heading(1140, 'Odor'))
+            self.assertIsNone(api.fetch_toc(1140, {'Odor'}))
+        self.assertEqual(close.call_count, 2)
+        self.assertFalse(PubChemCacheEntry.objects.exists())
+
+    def test_invalid_json_counts_as_unreachable(self):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = b'<html>Proxy error</html>'
+        response._content_consumed = True
+        with mock.patch("app1.pubchem.api._get", return_value=response), \
+                self.assertLogs('app1.pubchem.api', 'ERROR'):
+            self.assertIsNone(api.fetch_cids("108-88-3"))
+            self.assertIsNone(api.fetch_properties("108-88-3"))
+        self.assertFalse(PubChemCacheEntry.objects.exists())
+
+    def test_full_record_teaches_the_toc(self):
+        data = {"Record": {"Section": [{"TOCHeading": "Odor", "Information": [pug_info(["Sweet"])]}]}}
+        with mock.patch("app1.pubchem.api.fetch_record", return_value=data):
+            fetch_compound_record(1140)
+        with mock.patch("app1.pubchem.api._get", side_effect=self.pubchem):
+            self.assertEqual(compound_values(1140, 'Boiling Point'), ())
+        self.assertEqual(self.urls, [])
+
+
+class CircuitBreakerTests(TestCase):
+    URL = f"{api.PUG_REST_URL}/compound/name/108-88-3/cids/JSON"
+
+    def setUp(self):
+        self.sent = []
+        self.down = True
+
+    def send(self, request, **kwargs):
+        self.sent.append(request.url)
+        if self.down:
+            raise requests.exceptions.ConnectionError("PubChem is down")
+        return json_response({"IdentifierList": {"CID": [1140]}})
+
+    def test_opens_after_failures_and_closes_gradually(self):
+        breaker = CircuitBreaker(failure_threshold=2, cooldown=0.1, probes=2)
+        client = PubChemClient(breaker=breaker)
+        with mock.patch.object(requests.adapters.HTTPAdapter, 'send', self.send):
+            for _ in range(2):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    client.get(self.URL)
+            with self.assertRaises(CircuitOpen):
+                client.get(self.URL)
+            self.assertEqual(len(self.sent), 2)
+
+            time.sleep(0.15)
+            self.down = False
+            self.assertEqual(breaker.current_state(), 'half-open')
+            # Only one probe at a time until one has succeeded.
+            breaker.before_request()
+            with self.assertRaises(CircuitOpen):
+                client.get(self.URL)
+            breaker.record_success()
+            client.get(self.URL)
+            self.assertEqual(breaker.current_state(), 'closed')
+
+    def test_expired_entries_are_served_while_pubchem_is_down(self):
+        params = {'cid': 1140, 'heading': 'Odor'}
+        cache.store('heading', params, {"Record": {"RecordNumber": 1140}}, ttl=-60)
+        self.assertIsNone(cache.lookup('heading', params))
+
+        value = cache.cached('heading', params, lambda: None)
+        self.assertEqual(value, {"Record": {"RecordNumber": 1140}})
+        self.assertEqual(cache.cached('heading', params, lambda: {"Record": {}}), {"Record": {}})
+
+
+class PubChemCacheTests(TestCase):
+    def test_entries_expire_after_their_ttl(self):
+        params = {'cid': 1140}
+        with override_settings(PUBCHEM_CACHE_TTLS={'record': 60}):
+            cache.store('record', params, {"Record": {}})
+        entry = PubChemCacheEntry.objects.get(endpoint='record')
+        self.assertAlmostEqual((entry.expires_at - entry.last_accessed).total_seconds(), 60, delta=1)
+        self.assertEqual(cache.lookup('record', params), {"Record": {}})
+
+        entry.expires_at = timezone.now() - timedelta(seconds=1)
+        entry.save()
+        self.assertIsNone(cache.lookup('record', params))
+        self.assertEqual(cache.lookup('record', params, stale=True), {"Record": {}})
+        fetch = mock.Mock(return_value={"Record": {"RecordNumber": 1140}})
+        self.assertEqual(cache.cached('record', params, fetch), {"Record": {"RecordNumber": 1140}})
+        fetch.assert_called_once_with()
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for cid in (1, 2, 3):
+            cache.store('record', {'cid': cid}, {"Record": {"RecordNumber": cid}})
+            PubChemCacheEntry.objects.filter(params__cid=cid).update(
+                last_accessed=timezone.now() - timedelta(hours=10 - cid))
+        size = PubChemCacheEntry.objects.get(params__cid=1).size
+
+        cache.evict(max_bytes=2 * size)
+        self.assertEqual(sorted(PubChemCacheEntry.objects.values_list('params__cid', flat=True)), [2, 3])
+
+        PubChemCacheEntry.objects.filter(params__cid=2).update(
+            expires_at=timezone.now() - timedelta(seconds=settings.PUBCHEM_CACHE_STALE_TTL + 1))
+        cache.evict()
+        self.assertEqual(list(PubChemCacheEntry.objects.values_list('params__cid', flat=True)), [3])
+
+    @override_settings(PUBCHEM_CACHE_EVICT_EVERY=3)
+    def test_evicts_every_few_writes(self):
+        cache._writes = 0
+        with mock.patch.object(cache, 'evict') as evict:
+            for cid in range(7):
+                cache.store('record', {'cid': cid}, {})
+        self.assertEqual(evict.call_count, 2)
+
+    def test_management_command(self):
+        cache.store('record', {'cid': 1140}, {})
+        cache.store('heading', {'cid': 1140, 'heading': 'Odor'}, {})
+        cache.store('heading', {'cid': 241, 'heading': 'Odor'}, {})
+
+        out = io.StringIO()
+        call_command('pubchem_cache', stdout=out)
+        self.assertIn('heading: 2 entries', out.getvalue())
+
+        out = io.StringIO()
+        call_command('pubchem_cache', '--endpoint', 'heading', stdout=out)
+        self.assertIn("Deleted 2 'heading' entries.", out.getvalue())
+        self.assertEqual(list(PubChemCacheEntry.objects.values_list('endpoint', flat=True)), ['record'])
+
+        with mock.patch.object(cache, 'evict') as evict:
+            call_command('pubchem_cache', '--clear', '--evict', stdout=io.StringIO())
+        evict.assert_called_once_with()
+        self.assertFalse(PubChemCacheEntry.objects.exists())
+
+
+def chemtable_pdf(chemtable):
+    """Render the table of constants of a ChemTable as the download views do, and read it back."""
+    with spooled_pdf(write_chemtable_pdf, chemtable) as pdf:
+        return pdf.read()
+
+
+class PdfResourceTests(SimpleTestCase):
+    def setUp(self):
+        static_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_dir)
+        os.makedirs(os.path.join(static_dir, 'images'))
+        Image.new('RGBA', (8, 8), (255, 0, 0, 128)).save(os.path.join(static_dir, 'images', 'ExtracSol.png'))
+
+        static_settings = override_settings(STATICFILES_DIRS=[static_dir])
+        static_settings.enable()
+        self.addCleanup(static_settings.disable)
+        pdf_resources.reset_pdf_resources()
+        self.addCleanup(pdf_resources.reset_pdf_resources)
+
+    def test_renders_reuse_loaded_resources(self):
+        chemtable = mock.Mock(**{'chemicals.all.return_value': []})
+        with mock.patch.object(pdf_resources.finders, 'find', wraps=pdf_resources.finders.find) as find:
+            with self.assertLogs('app1.pdf_resources', 'WARNING'):
+                chemtable_pdf(chemtable)
+            lookups = find.call_count
+            pdf = chemtable_pdf(chemtable)
+            self.assertEqual(find.call_count, lookups)
+
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        resources = pdf_resources.pdf_resources()
+        self.assertEqual(resources.images[pdf_resources.LOGO].getSize(), (8, 8))
+        self.assertIsNone(resources.images[pdf_resources.WATERMARK])
+        with self.assertRaises(TypeError):
+            resources.styles['FieldValue'] = resources.styles['Normal']
+
+    def test_other_images_are_looked_up_once(self):
+        pdf_resources.pdf_resources()
+        with mock.patch.object(pdf_resources.finders, 'find', return_value=None) as find:
+            with self.assertLogs('app1.pdf_resources', 'WARNING'):
+                self.assertIsNone(pdf_resources.pdf_image('/static/images/unknown.png'))
+            self.assertIsNone(pdf_resources.pdf_image('images/unknown.png'))
+        find.assert_called_once_with('images/unknown.png')
+
+    def test_page_decorations_are_drawn_once_per_document(self):
+        Image.new('RGBA', (16, 16), (0, 0, 255, 64)).save(
+            os.path.join(settings.STATICFILES_DIRS[0], pdf_resources.WATERMARK))
+        chemicals = [Chemical(cas_number=f'{n}-00-0', chemical_name=f'Chemical {n}') for n in range(200)]
+        pdf = chemtable_pdf(mock.Mock(**{'chemicals.all.return_value': chemicals}))
+
+        report = pdf_size_report(pdf)
+        self.assertGreater(report.pages, 1)
+        self.assertEqual(sum(report.by_kind.values()), report.total)
+        resources = {name: kind for name, kind, size in report.resources}
+        self.assertEqual(resources['PageDecorations'], 'form')
+        self.assertEqual(sorted(name for name in resources if name.startswith('PageDecorations ')), [
+            'PageDecorations image 16x16', 'PageDecorations image 16x16 mask',
+            'PageDecorations image 8x8', 'PageDecorations image 8x8 mask',
+        ])
+        self.assertEqual(pdf.count(b'/Subtype /Form'), 1)
+        self.assertEqual(pdf.count(b'/Subtype /Image'), 4)
+
+    def test_pictograms_are_drawn_once_per_angle(self):
+        logo = pdf_resources.pdf_image(pdf_resources.LOGO)
+        out = io.BytesIO()
+        SimpleDocTemplate(out).build([RotatedImage(logo, angle=-45, scale=2) for _ in range(5)]
+                                     + [RotatedImage(logo, angle=315, scale=1)])
+
+        report = pdf_size_report(out.getvalue())
+        forms = sorted(name for name, kind, size in report.resources if kind == 'form')
+        self.assertEqual(forms, ['Pictogram_ExtracSol.png_-45_2', 'Pictogram_ExtracSol.png_315_1'])
+        self.assertEqual(out.getvalue().count(b'/Subtype /Image'), 1)
+
+
+class StoredPdfTests(TestCase):
+    def setUp(self):
+        pdf_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pdf_dir)
+        self.use_storage('django.core.files.storage.FileSystemStorage', location=pdf_dir)
+
+        self.msds = MSDS.objects.create(product_name='Toluene', cas_number='108-88-3', chemical_name='Toluene')
+        self.url = reverse('generate_msds_pdf', args=[self.msds.pk])
+        renderer = mock.patch('app1.views.sds_pdf_view.write_msds_pdf',
+                              side_effect=lambda msds, out: out.write(b'%PDF-1.4 toluene'))
+        self.render = renderer.start()
+        self.addCleanup(renderer.stop)
+        task_renderer = mock.patch('app1.tasks.write_msds_pdf', self.render)
+        task_renderer.start()
+        self.addCleanup(task_renderer.stop)
+
+    def use_storage(self, backend, **options):
+        storages = override_settings(STORAGES={**settings.STORAGES, 'pdfs': {'BACKEND': backend, 'OPTIONS': options}})
+        storages.enable()
+        self.addCleanup(storages.disable)
+
+    def test_pdf_is_rendered_once_and_revalidated(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.getvalue(), b'%PDF-1.4 toluene')
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        self.assertEqual(self.client.get(self.url).getvalue(), b'%PDF-1.4 toluene')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.render.call_count, 1)
+
+        self.msds.product_name = 'Toluol'
+        self.msds.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.render.call_count, 2)
+        self.assertEqual(MSDSPdf.objects.filter(msds=self.msds).count(), 1)
+
+    @override_settings(PDF_PRERENDER_ON_SAVE=True, JOBS_ASYNC=False)
+    def test_saved_msds_is_prerendered(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.msds.save()
+        self.assertEqual(self.render.call_count, 1)
+
+        self.assertEqual(self.client.get(self.url).getvalue(), b'%PDF-1.4 toluene')
+        self.assertEqual(self.render.call_count, 1)
+
+    @override_settings(PDF_SPOOL_MAX_SIZE=1024)
+    def test_pdfs_are_streamed_from_a_spooled_file(self):
+        chemtable = ChemTable.objects.create()
+        for n in range(200):
+            Chemical.objects.create(chemtable=chemtable, cas_number=f'{n}-00-0', chemical_name=f'Chemical {n}')
+
+        response = self.client.get(reverse('generate_chemtable_pdf', args=[chemtable.pk]))
+        self.assertTrue(response.streaming)
+        pdf = response.getvalue()
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertEqual(int(response['Content-Length']), len(pdf))
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="Cuadro_de_constantes_{chemtable.pk}.pdf"')
+
+    def test_ranges_are_served(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-3')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), b'%PDF')
+        self.assertEqual(response['Content-Range'], 'bytes 0-3/16')
+        self.assertEqual(response['Content-Length'], '4')
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=-6', HTTP_IF_RANGE=etag).getvalue(), b'oluene')
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=-6', HTTP_IF_RANGE='"old"').status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE='bytes=16-').status_code, 416)
+        self.assertEqual(requested_range('bytes=0-1,4-5', 16), None)
+        self.assertEqual(requested_range('bytes=10-99', 16), (10, 15))
+
+    def test_pdfs_are_handed_off_to_the_proxy(self):
+        with override_settings(PDF_SERVE='x-accel-redirect'):
+            response = self.client.get(self.url)
+        entry = MSDSPdf.objects.get(msds=self.msds)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protected/pdfs/{entry.name}')
+        self.assertEqual(response.content, b'')
+
+        with override_settings(PDF_SERVE='x-sendfile'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], pdf_cache.pdf_storage().path(entry.name))
+
+    @mock_aws
+    @override_settings(PDF_SERVE='x-sendfile')
+    def test_s3_pdfs_are_streamed(self):
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='pdfs')
+        self.use_storage('storages.backends.s3.S3Storage', **{
+            **settings.PDF_S3_OPTIONS, 'bucket_name': 'pdfs', 'region_name': 'us-east-1',
+            'endpoint_url': None, 'access_key': 'testing', 'secret_key': 'testing',
+        })
+
+        # Not on the local filesystem: streamed from here instead of handed off.
+        response = self.client.get(self.url)
+        self.assertNotIn('X-Sendfile', response)
+        self.assertEqual(response.getvalue(), b'%PDF-1.4 toluene')
+        entry = MSDSPdf.objects.get(msds=self.msds)
+        self.assertEqual(s3.get_object(Bucket='pdfs', Key=entry.name)['Body'].read(), b'%PDF-1.4 toluene')
+        self.assertEqual(entry.size, 16)
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=9-')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response.getvalue(), b'toluene')
+        self.assertEqual(response['Content-Range'], 'bytes 9-15/16')
+        self.assertEqual(self.render.call_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.msds.delete()
+        self.assertEqual(s3.list_objects_v2(Bucket='pdfs').get('KeyCount'), 0)
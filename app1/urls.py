@@ -6,6 +6,8 @@ from .views.sds_wizard_view import FORMS
 from .views.create_chemtable import ChemTableCreateView
 from .views.chemtable_autopop_view import chemtable_autopopulate
 from .views.chemtable_pdf_view import generate_chemtable_pdf
+from .views.jobs_view import enqueue_msds_pdf, enqueue_chemtable_pdf, enqueue_chemtable_lookup, job_status, job_output
+from .views.prefill_view import msds_prefill_status
 
 
 urlpatterns = [
@@ -13,6 +15,7 @@ urlpatterns = [
     path("iq", iq, name="iq"),
     path("edu", edu, name="edu"),
     path("msds/create", MSDSWizard.as_view(FORMS), name="msds_create"),
+    path("msds/create/prefill/<str:step>/", msds_prefill_status, name="msds_prefill_status"),
     path("msds/<int:msds_id>/pdf/", generate_msds_pdf, name="generate_msds_pdf"),
     path('about', about, name='about'),
     path('maintenance', maintenance, name='maintenance'),
@@ -21,4 +24,9 @@ urlpatterns = [
 	path('chemtable/autopopulate/', chemtable_autopopulate, name='chemtable_autopopulate'),
 	path('chemtable/success/<int:chemtable_id>/', TemplateView.as_view(template_name='chemtable_success.html'), name='chemtable_success'),
 	path("chemtable/<int:chemtable_id>/pdf/", generate_chemtable_pdf, name="generate_chemtable_pdf"),
+	path("msds/<int:msds_id>/pdf/job/", enqueue_msds_pdf, name="enqueue_msds_pdf"),
+	path("chemtable/<int:chemtable_id>/pdf/job/", enqueue_chemtable_pdf, name="enqueue_chemtable_pdf"),
+	path("chemtable/autopopulate/job/", enqueue_chemtable_lookup, name="enqueue_chemtable_lookup"),
+	path("jobs/<uuid:job_id>/", job_status, name="job_status"),
+	path("jobs/<uuid:job_id>/output/", job_output, name="job_output"),
 ]
\ No newline at end of file
@@ -1,57 +1,30 @@
-import requests
+import math
+import os
 import unicodedata
 import re
-from pubchem_api_crawler import Annotations
 from .constants import *
+from .pdf_resources import draw_form
+from .pubchem import api, compound_values, ghs_classification, normalize_cas, resolve_cid
 
 import logging
 
 from PIL import Image, ImageOps
 from io import BytesIO
 from reportlab.lib.units import inch
-from reportlab.lib.units import inch
 from reportlab.platypus import Flowable
 from reportlab.lib.utils import ImageReader
 
 logger = logging.getLogger(__name__)
 
-def find_svg_urls(obj, svg_data=None):
-    if svg_data is None:
-        svg_data = set()  # Use a set to store unique tuples of (url, description)
-
-    if isinstance(obj, dict):
-        for key, value in obj.items():
-            if key == 'Markup' and isinstance(value, list):
-                for item in value:
-                    if item.get('Type') == 'Icon' and item.get('URL', '').endswith('.svg'):
-                        url = item['URL']
-                        description = item.get('Extra', 'GHS Label')
-                        svg_data.add((url, description))  # Add tuple to the set
-            else:
-                find_svg_urls(value, svg_data)
-
-    elif isinstance(obj, list):
-        for item in obj:
-            find_svg_urls(item, svg_data)
-
-    return svg_data
-
 def fetch_and_find_svg_urls(cid):
-    url = f'https://pubchem.ncbi.nlm.nih.gov/rest/pug_view/data/compound/{cid}/JSON/?response_type=display&heading=GHS%20Classification'
-    response = requests.get(url)
+    ghs = ghs_classification(cid)
 
-    if response.status_code != 200:
-        logger.debug(f"Failed to fetch svg data for CID {cid}. Status code: {response.status_code}")
+    if ghs is None:
+        logger.debug(f"No GHS Classification found for CID {cid}.")
 
         return ''
 
-    data = response.json()
-    svg_data_set = find_svg_urls(data)
-
-    # Convert set of tuples back to list of dictionaries
-    svg_data = [{'url': url, 'description': description} for url, description in svg_data_set]
-
-    return svg_data
+    return [dict(pictogram) for pictogram in ghs.pictograms]
 
 def get_cid_from_cas(cas_number):
     """
@@ -63,24 +36,16 @@ def get_cid_from_cas(cas_number):
     Returns:
         int: The CID of the compound, or None if not found.
     """
-    url = f'https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{cas_number}/cids/JSON'
-    response = requests.get(url)
-    if response.status_code != 200:
-        return None
-    data = response.json()
-    cids = data.get('IdentifierList', {}).get('CID', [])
-    if not cids:
-        return None
-    return cids[0]  # Return the first CID
+    return resolve_cid(cas_number)
 
 def get_classification_from_cid(cid):
     """
     Fetch the classification data from PubChem using the CID.
     """
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Hazard Classes and Categories')
-        # Assuming the classification is in the first row and second column
-        classification = annotations.iloc[2, 0]
+        values = compound_values(cid, heading='Hazard Classes and Categories')
+        # The classification is the third value of the heading
+        classification = values[2]
         return classification
     except Exception as e:
         # Handle exceptions (e.g., data not found)
@@ -97,15 +62,11 @@ def get_signal_word(cid):
         str or None: The normalized signal word ("warning" or "danger"), or None if not found.
     """
     try:
-        # Fetch annotations
-        annotations = Annotations().get_compound_annotations(cid, heading='GHS Classification')
-        
-        # Check if annotations DataFrame has the required structure
-        if annotations.shape[0] < 3:
+        ghs = ghs_classification(cid)
+        if ghs is None or ghs.signal_word is None:
            return 'Warning'
-        
-        # Extract signal word from annotations
-        signal_word = annotations.iloc[2, 0]
+
+        signal_word = ghs.signal_word
         
         # Normalize string
         def normalize_string(input_string):
@@ -130,67 +91,86 @@ def get_signal_word(cid):
         logger.warning(f"Error fetching signal word for CID {cid}: {e}")
         return 'Warning'
 
+def label_from_h_codes(h_codes):
+    """
+    Pictograms and signal word fixed by a set of hazard statements, worked
+    out from H_CODE_RULES and PICTOGRAM_PRECEDENCE without asking PubChem.
+
+    Parameters:
+        h_codes (str or list): H-codes, bare or with their text
+            ('H225: Highly Flammable liquid and vapor').
+
+    Returns:
+        dict: {'label_elements': [{'url': ..., 'description': ...}] in GHS
+        number order, 'signal_word': 'Danger', 'Warning' or None}
+    """
+    if isinstance(h_codes, str):
+        h_codes = [h_codes]
+
+    reasons = {}
+    signal_words = set()
+    for statement in h_codes or []:
+        for code in H_CODE_PATTERN.findall(statement):
+            rule = H_CODE_RULES.get(code)
+            if rule is None:
+                logger.debug(f"No GHS label rule for {code}")
+                continue
+            pictograms, signal_word = rule
+            for pictogram in pictograms:
+                reasons.setdefault(pictogram, set()).add(code)
+            if signal_word:
+                signal_words.add(signal_word)
+
+    for pictogram, shown_for, superseded, dropped_for in PICTOGRAM_PRECEDENCE:
+        if pictogram not in reasons or superseded not in reasons:
+            continue
+        if shown_for is not None and not shown_for & reasons[pictogram]:
+            continue
+        if dropped_for is None:
+            del reasons[superseded]
+        else:
+            reasons[superseded] -= dropped_for
+            if not reasons[superseded]:
+                del reasons[superseded]
+
+    # 'Danger' replaces 'Warning'
+    signal_word = 'Danger' if 'Danger' in signal_words else ('Warning' if signal_words else None)
+    label_elements = [
+        {'url': PICTOGRAMS[pictogram], 'description': pictogram}
+        for pictogram in sorted(reasons, key=PICTOGRAMS.get)
+    ]
+    return {'label_elements': label_elements, 'signal_word': signal_word}
+
+
+def classify_p_codes(p_codes):
+    """
+    Group the P-codes of a PubChem 'Precautionary Statement Codes' string
+    by category.
+
+    Returns:
+        dict: {'general'|'prevention'|'response'|'storage'|'disposal': {code: text}}
+    """
+    all_codes = {category: {} for category in P_CODE_CATEGORIES.values()}
+    for p_code in tokenize_p_codes(p_codes):
+        entry = lookup_p_code(p_code)
+        if entry is None:
+            logger.warning(f"Description not found for P-code: {p_code}")
+            continue
+        category, description = entry
+        all_codes[category][p_code] = description
+    return all_codes
+
+
 def get_p_codes(cid):
     try:
-        # Fetch annotations
-        annotations = Annotations().get_compound_annotations(cid, heading='GHS Classification')
-
-        # Ensure annotations have enough data
-        if annotations.shape[0] > 4 and annotations.shape[1] > 0:
-            p_codes = annotations.iloc[4, 0]
+        ghs = ghs_classification(cid)
+        if ghs is not None and ghs.precautionary_codes is not None:
+            p_codes = ghs.precautionary_codes
         else:
             logger.warning(f"P-codes not found in annotations for CID {cid}")
             return None
 
-        # Clean and split P-codes
-        p_codes_cleaned = p_codes.replace(';', ',').replace(' and ', ', ')
-        p_codes_list = [code.strip() for code in p_codes_cleaned.split(',')]
-
-        # Initialize dictionaries
-        general_p = {}
-        prevention_p = {}
-        response_p = {}
-        storage_p = {}
-        dispose_p = {}
-
-        def find_p_code_description(p_code):
-            for category in PRECAUTIONARY_STATEMENTS.values():
-                if p_code in category:
-                    return category[p_code]
-            return ''  # If not found
-
-        for p_code in p_codes_list:
-            # Correct regex matching
-            match = re.match(r'P(\d+)', p_code)
-            if match:
-                prefix_number = match.group(1)
-                group_prefix = prefix_number[0]  # First digit
-                # Find description
-                description = find_p_code_description(p_code)
-                if description:
-                    if group_prefix == '1':
-                        general_p[p_code] = description
-                    elif group_prefix == '2':
-                        prevention_p[p_code] = description
-                    elif group_prefix == '3':
-                        response_p[p_code] = description
-                    elif group_prefix == '4':
-                        storage_p[p_code] = description
-                    elif group_prefix == '5':
-                        dispose_p[p_code] = description
-                else:
-                    logger.warning(f"Description not found for P-code: {p_code}")
-            else:
-                logger.warning(f"Invalid P-code format: {p_code}")
-
-        # Combine all codes
-        all_codes = {
-            'general': general_p,
-            'prevention': prevention_p,
-            'response': response_p,
-            'storage': storage_p,
-            'disposal': dispose_p,
-        }
+        all_codes = classify_p_codes(p_codes)
 
         logger.debug(f"P-codes categorized: {all_codes}")
         return all_codes
@@ -201,12 +181,9 @@ def get_p_codes(cid):
 
 def get_h_codes(cid):
     try:
-        # Fetch annotations
-        annotations = Annotations().get_compound_annotations(cid, heading='GHS Classification')
-
-        # Ensure annotations have enough data
-        if annotations.shape[0] > 3 and annotations.shape[1] > 0:
-            h_codes = annotations.iloc[3, 0]
+        ghs = ghs_classification(cid)
+        if ghs is not None and ghs.hazard_statements is not None:
+            h_codes = ghs.hazard_statements
         else:
             logger.warning(f"H-codes not found in annotations for CID {cid}")
             return None
@@ -224,6 +201,23 @@ def get_h_codes(cid):
         logger.error(f"Error fetching H-codes for CID {cid}: {e}")
         return None
 
+def get_ghs_label(cid):
+    """
+    Fetch every GHS label element of a compound from a single parse of its
+    GHS Classification.
+
+    Returns:
+        dict: 'signal_word', 'h_codes', 'p_codes' and 'pictograms', as
+        returned by get_signal_word, get_h_codes, get_p_codes and
+        fetch_and_find_svg_urls.
+    """
+    return {
+        'signal_word': get_signal_word(cid),
+        'h_codes': get_h_codes(cid),
+        'p_codes': get_p_codes(cid),
+        'pictograms': fetch_and_find_svg_urls(cid),
+    }
+
 
 def get_synonyms_from_cas(cas):
     """
@@ -235,66 +229,49 @@ def get_synonyms_from_cas(cas):
     Returns:
         list: A list of synonyms for the compound or an empty list if not found.
     """
-    url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{cas}/synonyms/TXT"
-
-    try:
-        response = requests.get(url)
-
-        # Check if the response is successful
-        if response.status_code == 200:
-            synonyms = [line.strip() for line in response.text.splitlines() if line.strip()]
-            logger.info(f"Retrieved {len(synonyms)} synonyms for CAS number {cas}")
-            return synonyms
-        else:
-            logger.warning(f"Failed to retrieve synonyms. HTTP Status Code: {response.status_code}")
-            logger.warning(f"Response content: {response.text}")
-            return []
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error during API request: {e}")
+    synonyms = api.fetch_synonyms(normalize_cas(cas) or cas)
+    if not synonyms:
         return []
 
+    logger.info(f"Retrieved {len(synonyms)} synonyms for CAS number {cas}")
+    return synonyms
+
 def get_first_aid(cid):
-    annotations = Annotations().get_compound_annotations(cid, heading='First Aid Measures')
-    if not annotations.empty:
-        # Extract the first column by position and convert it to a list
-        return annotations.iloc[:, 0].dropna().tolist()
-        logger.debug(annotations.iloc[:, 0].dropna().tolist())
+    values = compound_values(cid, heading='First Aid Measures')
+    if values:
+        # Every value under the heading, as a list
+        return list(values)
+        logger.debug(list(values))
     else:
         return []
 
 def get_iupac(cas):
-    url = f"https://pubchem.ncbi.nlm.nih.gov/rest/pug/compound/name/{cas}/property/IUPACName,Title/json"
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            # Navigate to the IUPACName key
-            iupac = data["PropertyTable"]["Properties"][0]["IUPACName"]
-            logger.debug(iupac)
-            return iupac
-        else:
-            logger.error(f"Error: Unable to fetch chemical name (Status Code: {response.status_code})")
+        data = api.fetch_properties(normalize_cas(cas) or cas, ('IUPACName', 'Title'))
+        if data is None:
             return ''
-
+        # Navigate to the IUPACName key
+        iupac = data["PropertyTable"]["Properties"][0]["IUPACName"]
+        logger.debug(iupac)
+        return iupac
 
     except Exception as e:
         return f"Error: {str(e)}"
 
 def get_fire(cid):
-    annotations = Annotations().get_compound_annotations(cid, heading='Fire Fighting Procedures')
-    if not annotations.empty:
-        # Extract the first column by position and convert it to a list
-        return annotations.iloc[:, 0].dropna().tolist()
-        logger.debug(annotations.iloc[:, 0].dropna().tolist())
+    values = compound_values(cid, heading='Fire Fighting Procedures')
+    if values:
+        # Every value under the heading, as a list
+        return list(values)
+        logger.debug(list(values))
     else:
         return []
 
 def get_acci(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Accidental Release Measures')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Accidental Release Measures')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -308,9 +285,9 @@ def get_acci(cid):
 
 def get_hand_stor(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Handling and Storage')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Handling and Storage')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -324,10 +301,10 @@ def get_hand_stor(cid):
 
 def get_safe_stor(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Safe Storage')
-        if not annotations.empty:
-            # Extract the first column, drop nulls, and return a newline-separated string
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+        values = compound_values(cid, heading='Safe Storage')
+        if values:
+            # Every value under the heading, as a newline-separated string
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return '\n'.join(safe_storage_list)  # Convert list to newline-separated string
         else:
@@ -341,9 +318,9 @@ def get_safe_stor(cid):
 
 def get_oel(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Occupational Exposure Limits (OEL)')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Occupational Exposure Limits (OEL)')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -357,9 +334,9 @@ def get_oel(cid):
 
 def get_phys(cid):
      try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Physical Description')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Physical Description')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -374,9 +351,9 @@ def get_phys(cid):
 
 def get_odor(cid):
      try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Odor')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Odor')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -391,9 +368,9 @@ def get_odor(cid):
 
 def get_melt(cid):
      try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Melting Point')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Melting Point')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -408,9 +385,9 @@ def get_melt(cid):
 
 def get_boil(cid):
      try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Boiling Point')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Boiling Point')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -425,9 +402,9 @@ def get_boil(cid):
 
 def get_flame(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Flammable Limits')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Flammable Limits')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -442,9 +419,9 @@ def get_flame(cid):
 
 def get_flash(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Flash Point')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Flash Point')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -459,9 +436,9 @@ def get_flash(cid):
 
 def get_autoig(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Autoignition Temperature')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Autoignition Temperature')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -476,9 +453,9 @@ def get_autoig(cid):
 
 def get_pH(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='pH')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='pH')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -493,9 +470,9 @@ def get_pH(cid):
 
 def get_solu(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Solubility')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Solubility')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -510,9 +487,9 @@ def get_solu(cid):
 
 def get_vap_p(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Vapor Pressure')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Vapor Pressure')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -527,9 +504,9 @@ def get_vap_p(cid):
 
 def get_vap_d(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Vapor Density')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Vapor Density')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -544,9 +521,9 @@ def get_vap_d(cid):
 
 def get_reac(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Reactivity Profile')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Reactivity Profile')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -561,9 +538,9 @@ def get_reac(cid):
 
 def get_h_reac(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Other Hazardous Reactions')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Other Hazardous Reactions')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -578,9 +555,9 @@ def get_h_reac(cid):
 
 def get_h_decomp(cid):
      try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Decomposition')
-        if annotations is not None and hasattr(annotations, "empty") and not annotations.empty:
-            value = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Decomposition')
+        if values:
+            value = values[0]
             logger.debug(value)
             return value
         else:
@@ -604,10 +581,10 @@ def process_statements(field_value):
 
 def get_un(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='UN number')
-        if not annotations.empty:
-            # Extract the first column, drop nulls, and return a newline-separated string
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+        values = compound_values(cid, heading='UN number')
+        if values:
+            # Every value under the heading, as a newline-separated string
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return '\n'.join(safe_storage_list)  # Convert list to newline-separated string
         else:
@@ -621,10 +598,10 @@ def get_un(cid):
 
 def get_shipping_name(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Shipping Name/ Number DOT/UN/NA/IMO')
-        if not annotations.empty:
-            # Extract the first column, drop nulls, and return a newline-separated string
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+        values = compound_values(cid, heading='Shipping Name/ Number DOT/UN/NA/IMO')
+        if values:
+            # Every value under the heading, as a newline-separated string
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return '\n'.join(safe_storage_list)  # Convert list to newline-separated string
         else:
@@ -638,10 +615,10 @@ def get_shipping_name(cid):
 
 def irritants(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Skin, Eye, and Respiratory Irritations')
-        if not annotations.empty:
-            # Extract the first column, drop nulls, and return a newline-separated string
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+        values = compound_values(cid, heading='Skin, Eye, and Respiratory Irritations')
+        if values:
+            # Every value under the heading, as a newline-separated string
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return '\n'.join(safe_storage_list)  # Convert list to newline-separated string
         else:
@@ -656,11 +633,11 @@ def irritants(cid):
 def get_tox_data(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Toxicity Data')
+        values = compound_values(cid, heading='Toxicity Data')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -682,11 +659,11 @@ def get_form(self, step=None, data=None, files=None):
 def get_eco_tox(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Ecotoxicity Values')
+        values = compound_values(cid, heading='Ecotoxicity Values')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -703,11 +680,11 @@ def get_eco_tox(cid):
 def get_other_eco(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Ecotoxicity Excerpts')
+        values = compound_values(cid, heading='Ecotoxicity Excerpts')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -724,11 +701,11 @@ def get_other_eco(cid):
 def get_ch_eff(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Adverse Effects')
+        values = compound_values(cid, heading='Adverse Effects')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -745,11 +722,11 @@ def get_ch_eff(cid):
 def get_immi_eff(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Acute Effects')
+        values = compound_values(cid, heading='Acute Effects')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -766,11 +743,11 @@ def get_immi_eff(cid):
 def get_bio_accu(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Biological Half-Life')
+        values = compound_values(cid, heading='Biological Half-Life')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -787,11 +764,11 @@ def get_bio_accu(cid):
 def get_mob_soil(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Soil Adsorption/Mobility')
+        values = compound_values(cid, heading='Soil Adsorption/Mobility')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -808,11 +785,11 @@ def get_mob_soil(cid):
 def get_degra(cid):
     try:
 
-        annotations = Annotations().get_compound_annotations(cid, heading='Environmental Biodegradation')
+        values = compound_values(cid, heading='Environmental Biodegradation')
 
-        if not annotations.empty:
+        if values:
             
-            safe_storage_list = annotations.iloc[:, 0].dropna().tolist()
+            safe_storage_list = list(values)
             logger.debug(safe_storage_list)
             return ';'.join(safe_storage_list) 
 
@@ -828,9 +805,9 @@ def get_degra(cid):
     
 def get_mol_for(cid):
     try:
-        annotations = Annotations().get_compound_annotations(cid, heading='Molecular Formula')
-        if not annotations.empty and annotations.shape[1] > 0:
-            mol_for = annotations.iloc[0, 0]
+        values = compound_values(cid, heading='Molecular Formula')
+        if values:
+            mol_for = values[0]
             return mol_for
         else:
             return ''
@@ -844,7 +821,7 @@ def get_mol_for(cid):
 class RotatedImage(Flowable):
     def __init__(self, path, angle=45, scale=0.75):
         """
-        :param path: The filesystem path to the image.
+        :param path: The filesystem path to the image, or its ImageReader.
         :param angle: The rotation angle in degrees (counterclockwise).
         :param scale: A scaling factor to reduce or enlarge the image.
                       For example, 0.75 means 75% of the original size.
@@ -860,26 +837,38 @@ class RotatedImage(Flowable):
         # The actual space occupied after scaling
         return (self.iw * self.scale_factor, self.ih * self.scale_factor)
 
+    def form_name(self):
+        """Form XObject of this image at this angle and scale, shared by the whole document."""
+        image = os.path.basename(str(getattr(self.path, 'fileName', self.path)))
+        return re.sub(r'[^A-Za-z0-9_.-]', '_', f"Pictogram_{image}_{self.angle}_{self.scale_factor}")
+
     def draw(self):
+        # The rotated image covers at most a circle around its center.
+        width, height = self.iw * self.scale_factor, self.ih * self.scale_factor
+        radius = math.hypot(width, height) / 2.0
+        bbox = (width / 2.0 - radius, height / 2.0 - radius, width / 2.0 + radius, height / 2.0 + radius)
+        draw_form(self.canv, self.form_name(), self.draw_image, bbox)
+
+    def draw_image(self, canv):
         # Save the current canvas state
-        self.canv.saveState()
+        canv.saveState()
 
         # Translate to the center of what will be the final scaled image
-        self.canv.translate((self.iw * self.scale_factor) / 2.0,
-                            (self.ih * self.scale_factor) / 2.0)
+        canv.translate((self.iw * self.scale_factor) / 2.0,
+               (self.ih * self.scale_factor) / 2.0)
 
         # Rotate around the center
-        self.canv.rotate(-self.angle)
+        canv.rotate(-self.angle)
 
         # Now scale down the image
-        self.canv.scale(self.scale_factor, self.scale_factor)
+        canv.scale(self.scale_factor, self.scale_factor)
 
         # Draw the image centered at the origin (0,0)
         # Since we've rotated and scaled the canvas, we draw the image with no w/h specified.
-        self.canv.drawImage(self.path, -self.iw/2.0, -self.ih/2.0)
+        canv.drawImage(self.path, -self.iw/2.0, -self.ih/2.0)
 
         # Restore the canvas to its previous state
-        self.canv.restoreState()
+        canv.restoreState()
 
 
 
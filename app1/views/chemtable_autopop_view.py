@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.http import JsonResponse
 from django.views.decorators.http import require_GET
+from app1.compounds import chemtable_fields, get_compound
+from app1.jobs import enqueue
+from app1.models import Job
 from app1.utils import *
 
 @require_GET
@@ -7,20 +11,36 @@ def chemtable_autopopulate(request):
     cas_number = request.GET.get('cas_number')
     if not cas_number:
         return JsonResponse({'error': 'CAS number not provided.'}, status=400)
-    
+
+    data = lookup_chemical(cas_number)
+    if data is None:
+        return JsonResponse({'error': 'No compound found for the provided CAS number.'}, status=404)
+    return JsonResponse(data)
+
+
+def lookup_chemical(cas_number):
+    """
+    The ChemTable fields of a compound, from its Compound row when it has
+    been built. Otherwise they are fetched here and the rest of the
+    compound is built by a low-priority sds_prefill job, when a job worker
+    runs them.
+
+    Returns:
+        dict: field -> value, or None if no compound has this CAS number.
+    """
     cid = get_cid_from_cas(cas_number)
     if cid is None:
-        return JsonResponse({'error': 'No compound found for the provided CAS number.'}, status=404)
-    
-    # Use the provided utility functions to get the values
-    data = {
-        'chemical_name': get_synonyms_from_cas(cas_number)[0],
-        'molecular_formula': get_mol_for(cid),
-        'boiling_point': get_boil(cid),
-        't_change': get_melt(cid),  # Melting point is used for t_change
-        'phys': get_phys(cid),
-        'solubility': get_solu(cid),
-        'acute_toxicity_estimates': get_immi_eff(cid),
-    }
-    logger.debug(f"Toxicidad enviada: {data['acute_toxicity_estimates']}")
-    return JsonResponse(data)
\ No newline at end of file
+        return None
+
+    compound = get_compound(cid)
+    if compound is not None and compound.chemtable:
+        return compound.chemtable
+
+    data = chemtable_fields(cas_number, cid)
+    # Behind downloads and lookups somebody is waiting for. Without a job
+    # worker it would run inline, holding up this lookup.
+    cas_number = normalize_cas(cas_number) or cas_number
+    pending = Job.objects.filter(task='sds_prefill', args=[cas_number], status__in=[Job.QUEUED, Job.RUNNING])
+    if settings.JOBS_ASYNC and not pending.exists():
+        enqueue('sds_prefill', cas_number, priority=-10)
+    return data
@@ -1,23 +1,25 @@
 from reportlab.lib.pagesizes import landscape, A4
-from reportlab.platypus import Table, TableStyle, Spacer, BaseDocTemplate, Frame, PageTemplate, Paragraph
+from reportlab.platypus import Table, Spacer, BaseDocTemplate, Frame, PageTemplate, Paragraph
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
-from io import BytesIO
 from app1.models import ChemTable
-from django.contrib.staticfiles import finders
+from app1.pdf_output import serve_pdf
+from app1.pdf_resources import LOGO, WATERMARK, draw_form, pdf_image, pdf_resources
 from reportlab.lib.units import inch
 
 import datetime
 
 def generate_chemtable_pdf(request, chemtable_id):
     chemtable = get_object_or_404(ChemTable, id=chemtable_id)
+    return serve_pdf(request, chemtable, write_chemtable_pdf, f'Cuadro_de_constantes_{chemtable_id}.pdf')
+
+
+def write_chemtable_pdf(chemtable, out):
+    """Write the table of constants of a ChemTable to out, a binary file."""
     chemicals = chemtable.chemicals.all()
 
-    buffer = BytesIO()
     doc = BaseDocTemplate(
-        buffer,
+        out,
         pagesize=landscape(A4),  # Landscape orientation
         rightMargin=36,
         leftMargin=36,
@@ -29,23 +31,23 @@ def generate_chemtable_pdf(request, chemtable_id):
     )
 
     def watermark_canvas(canvas, doc):
-        w_path = finders.find('images/watermark_logo.png')
-        if w_path:
+        watermark = pdf_image(WATERMARK)
+        if watermark:
             page_width, page_height = landscape(A4)
             canvas.saveState()
-            canvas.drawImage(w_path, 0, 0, width=page_width, height=page_height, preserveAspectRatio=True, mask='auto')
+            canvas.drawImage(watermark, 0, 0, width=page_width, height=page_height, preserveAspectRatio=True, mask='auto')
             canvas.restoreState()
 
     def header_canvas(canvas, doc):
-        logo_path = finders.find('images/ExtracSol.png')
-        if logo_path:
+        logo = pdf_image(LOGO)
+        if logo:
             logo_width = 0.9 * inch
             logo_height = 0.9 * inch
             x = 0.5 * inch
             y = landscape(A4)[1] - logo_height - 10  # Pega el logo arriba
             canvas.saveState()
             canvas.drawImage(
-                logo_path, x, y,
+                logo, x, y,
                 width=logo_width, height=logo_height,
                 preserveAspectRatio=True, mask='auto'
             )
@@ -61,33 +63,24 @@ def generate_chemtable_pdf(request, chemtable_id):
 
     frame = Frame(doc.leftMargin, doc.bottomMargin, doc.width, doc.height, id='normal')
 
-    def combined_onPage(canvas, doc):
+    def page_decorations(canvas):
         watermark_canvas(canvas, doc)
         header_canvas(canvas, doc)
 
+    def combined_onPage(canvas, doc):
+        # Drawn once per document as a form XObject, which every page refers to.
+        draw_form(canvas, 'PageDecorations', page_decorations)
+
     page_template = PageTemplate(id='main', frames=[frame], onPage=combined_onPage, onPageEnd=footer_canvas)
     doc.addPageTemplates([page_template])
 
-    styles = getSampleStyleSheet()
-    cell_style = ParagraphStyle(
-    name='TableCell',
-    fontSize=8,
-    leading=10,
-    alignment=1,  # 1 is TA_CENTER for horizontal centering
-    spaceAfter=0,
-    spaceBefore=0,
-    )
-
-    header_style = ParagraphStyle(
-    name='TableHeader',
-    parent=cell_style,
-    fontName='Helvetica-Bold',
-    backColor='#FFC300',  # yellow background
-    )
+    resources = pdf_resources()
+    styles = resources.styles
+    cell_style = styles['TableCell']
+    header_style = styles['TableHeader']
 
     story = []
 
-    styles = getSampleStyleSheet()
     story.append(Paragraph(f"<b>Cuadro de constantes</b>", styles['Title']))
     story.append(Spacer(1, 12))
 
@@ -122,30 +115,8 @@ def generate_chemtable_pdf(request, chemtable_id):
     column_widths = [usable_width * w for w in col_widths]
 
     table = Table(data, repeatRows=1, hAlign='LEFT', colWidths=column_widths)
-    table.setStyle(TableStyle([
-        # Background and color for headers
-        ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#FFC300")),
-        ('TEXTCOLOR', (0,0), (-1,0), colors.black),
-        # Alignment for all cells (including headers)
-        ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        # Font and size
-        ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0,0), (-1,-1), 8),
-        # Table grid and row backgrounds
-        ('GRID', (0,0), (-1,-1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0,1), (-1,-1), [colors.whitesmoke, colors.lightgrey]),
-        # Wordwrap for all cells
-        ('WORDWRAP', (0,0), (-1,-1), 'CJK'),
-    ]))
+    table.setStyle(resources.table_styles['chemtable'])
 
     story.append(table)
 
     doc.build(story)
-
-    pdf = buffer.getvalue()
-    buffer.close()
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="Cuadro_de_constantes_{chemtable_id}.pdf"'
-    response.write(pdf)
-    return response
\ No newline at end of file
@@ -1,7 +1,7 @@
-from django.core.mail import send_mail
-from django.conf import settings
 from django.utils.translation import gettext as _
 from app1.forms import ContactForm
+from app1.jobs import enqueue
+from app1.models import Job
 
 def contact_section(request):
     success = False
@@ -17,17 +17,15 @@ def contact_section(request):
                 "name": name, "email": email, "msg": message
             }
 
-            try:
-                send_mail(
-                    subject=_("Contacto desde extracsol.com: %(subject)s") % {"subject": subject},
-                    message=full_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=["info@extracsol.com"],
-                    fail_silently=False,
-                )
+            job = enqueue(
+                'contact_mail',
+                _("Contacto desde extracsol.com: %(subject)s") % {"subject": subject},
+                full_message,
+            )
+            if job.status != Job.FAILED:
                 success = True
                 form = ContactForm()
-            except Exception:
+            else:
                 error = _("No se pudo enviar el mensaje. Intenta de nuevo más tarde.")
         else:
             error = _("Por favor completa todos los campos correctamente.")
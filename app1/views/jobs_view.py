@@ -0,0 +1,75 @@
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_GET, require_POST
+from app1.jobs import enqueue
+from app1.models import ChemTable, Job, MSDS
+
+
+# Session key listing the jobs a visitor queued, the only ones they may look at.
+SESSION_JOBS = 'jobs'
+# Jobs remembered per session, oldest forgotten first.
+MAX_SESSION_JOBS = 20
+
+
+def job_accepted(request, job):
+    """Remember job in the session and return a 202 response pointing the client at its status URL."""
+    queued = request.session.get(SESSION_JOBS, [])
+    request.session[SESSION_JOBS] = (queued + [str(job.pk)])[-MAX_SESSION_JOBS:]
+    return JsonResponse({
+        'id': str(job.pk),
+        'status': job.status,
+        'status_url': reverse('job_status', args=[job.pk]),
+    }, status=202)
+
+
+@require_POST
+def enqueue_msds_pdf(request, msds_id):
+    get_object_or_404(MSDS, id=msds_id)
+    return job_accepted(request, enqueue('msds_pdf', msds_id, priority=10))
+
+
+@require_POST
+def enqueue_chemtable_pdf(request, chemtable_id):
+    get_object_or_404(ChemTable, id=chemtable_id)
+    return job_accepted(request, enqueue('chemtable_pdf', chemtable_id, priority=10))
+
+
+@require_POST
+def enqueue_chemtable_lookup(request):
+    cas_number = request.POST.get('cas_number')
+    if not cas_number:
+        return JsonResponse({'error': 'CAS number not provided.'}, status=400)
+    return job_accepted(request, enqueue('chemtable_lookup', cas_number, priority=10))
+
+
+def queued_job(request, job_id, **kwargs):
+    """The job, if this session queued it: job ids alone do not give access to results."""
+    if str(job_id) not in request.session.get(SESSION_JOBS, []):
+        raise Http404("No such job.")
+    return get_object_or_404(Job, pk=job_id, **kwargs)
+
+
+@require_GET
+def job_status(request, job_id):
+    job = queued_job(request, job_id)
+    data = {'id': str(job.pk), 'task': job.task, 'status': job.status, 'attempts': job.attempts}
+    if job.status == Job.DONE:
+        if job.output_name:
+            data['output_url'] = reverse('job_output', args=[job.pk])
+        else:
+            data['result'] = job.result
+    elif job.status == Job.FAILED:
+        data['error'] = 'The job failed.'
+    return JsonResponse(data)
+
+
+@require_GET
+def job_output(request, job_id):
+    job = queued_job(request, job_id, status=Job.DONE)
+    if not job.output_name:
+        raise Http404("This job has no file output.")
+
+    response = HttpResponse(bytes(job.output), content_type=job.output_type)
+    response['Content-Disposition'] = f'attachment; filename="{job.output_name}"'
+    return response
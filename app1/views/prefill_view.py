@@ -0,0 +1,14 @@
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from app1.prefill import prefill_progress
+
+
+@require_GET
+def msds_prefill_status(request, step):
+    """Fields of a wizard step that were still being fetched from PubChem when it was rendered."""
+    cas_number = request.GET.get('cas')
+    if not cas_number:
+        return JsonResponse({'error': 'CAS number not provided.'}, status=400)
+
+    status, fields = prefill_progress(step, cas_number)
+    return JsonResponse({'status': status, 'fields': fields or {}})
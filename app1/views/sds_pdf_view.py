@@ -3,27 +3,27 @@ from app1.forms import *
 from app1.models import *
 from app1.constants import *
 from app1.utils import *
+from app1.pdf_output import serve_pdf
+from app1.pdf_resources import LOGO, WATERMARK, draw_form, pdf_image, pdf_resources, static_path
 from django.utils.html import escapejs
 from reportlab.lib.pagesizes import A4
-from reportlab.platypus import BaseDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Frame, PageTemplate, Flowable, Image as RLImage, KeepTogether
+from reportlab.platypus import BaseDocTemplate, Paragraph, Spacer, Table, PageBreak, Frame, PageTemplate, Flowable, Image as RLImage, KeepTogether
 from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.utils import ImageReader
 from reportlab.lib.units import inch
-from django.contrib.staticfiles import finders
-from io import BytesIO
-from django.http import HttpResponse
 
 import datetime
 
 def generate_msds_pdf(request, msds_id):
     msds = get_object_or_404(MSDS, id=msds_id)
+    return serve_pdf(request, msds, write_msds_pdf, 'SDS_Test.pdf')
 
-    buffer = BytesIO()
 
+def write_msds_pdf(msds, out):
+    """Write the safety data sheet of an MSDS to out, a binary file."""
     # Define the document using BaseDocTemplate for custom layouts
     doc = BaseDocTemplate(
-        buffer,
+        out,
         pagesize=A4,
         rightMargin=36,
         leftMargin=36,
@@ -34,28 +34,25 @@ def generate_msds_pdf(request, msds_id):
         subject="SDS"
     )
 
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name="SectionHeading", fontName="Helvetica-Bold", fontSize=16, spaceAfter=12))
-    styles.add(ParagraphStyle(name="SubHeading", fontName="Helvetica-Bold", fontSize=13, spaceAfter=8))
-    styles.add(ParagraphStyle(name="FieldLabel", fontName="Helvetica-Bold", fontSize=10, textColor=colors.black))
-    styles.add(ParagraphStyle(name="FieldValue", fontName="Helvetica", fontSize=10))
-    styles.add(ParagraphStyle(name="Footer", alignment=2, fontSize=8, textColor=colors.grey))
+    resources = pdf_resources()
+    styles = resources.styles
+    table_styles = resources.table_styles
 
     # Watermark function: Draws a large version of the logo as a background.
     def watermark_canvas(canvas, doc):
-        w_path = finders.find('images/watermark_logo.png')
-        if w_path:
+        watermark = pdf_image(WATERMARK)
+        if watermark:
             page_width, page_height = A4
             canvas.saveState()
             # Scale the image to cover the page
             # If your image is transparent or lightened, it will appear as a watermark.
-            canvas.drawImage(w_path, 0, 0, width=page_width, height=page_height, preserveAspectRatio=True, mask='auto')
+            canvas.drawImage(watermark, 0, 0, width=page_width, height=page_height, preserveAspectRatio=True, mask='auto')
             canvas.restoreState()
 
     # Header function to draw the small logo outside margins (as done before)
     def header_canvas(canvas, doc):
-        logo_path = finders.find('images/ExtracSol.png')
-        if logo_path:
+        logo = pdf_image(LOGO)
+        if logo:
             page_width, page_height = A4
 
             # Adjust the image size slightly smaller
@@ -70,7 +67,7 @@ def generate_msds_pdf(request, msds_id):
 
             canvas.saveState()
             canvas.drawImage(
-                logo_path, x, y,
+                logo, x, y,
                 width=logo_width, height=logo_height,
                 preserveAspectRatio=True, mask='auto'
             )
@@ -94,10 +91,14 @@ def generate_msds_pdf(request, msds_id):
     # - After that, onPage=header_canvas can also be called. If you need both watermark and header,
     #   combine both calls or call one after another.
     # Here we chain them by drawing the watermark first, then the header.
-    def combined_onPage(canvas, doc):
+    def page_decorations(canvas):
         watermark_canvas(canvas, doc)
         header_canvas(canvas, doc)
 
+    def combined_onPage(canvas, doc):
+        # Drawn once per document as a form XObject, which every page refers to.
+        draw_form(canvas, 'PageDecorations', page_decorations)
+
 
     page_template = PageTemplate(id='main', frames=[frame], onPage=combined_onPage, onPageEnd=footer_canvas)
     doc.addPageTemplates([page_template])
@@ -133,16 +134,7 @@ def generate_msds_pdf(request, msds_id):
             ])
 
     table_sec1 = Table(data, colWidths=[2*inch, 4*inch])
-    table_sec1.setStyle(TableStyle([
-        ('BOX', (0,0), (-1,-1), 0.5, colors.black),
-        ('INNERGRID', (0,0), (-1,-1), 0.33, colors.grey),
-        ('BACKGROUND', (0,0), (0,-1), colors.lightgrey),
-        ('VALIGN', (0,0), (-1,-1), 'TOP'),
-        ('LEFTPADDING', (0,0), (-1,-1), 4),
-        ('RIGHTPADDING', (0,0), (-1,-1), 4),
-        ('TOPPADDING', (0,0), (-1,-1), 4),
-        ('BOTTOMPADDING', (0,0), (-1,-1), 4),
-    ]))
+    table_sec1.setStyle(table_styles['fields'])
 
     spacer_bet_secs = Spacer(1, 0.2*inch)
     spacer_inbet = Spacer(1, 0.1*inch)
@@ -167,18 +159,7 @@ def generate_msds_pdf(request, msds_id):
     ]
 
     section2_table = Table(section2_data, colWidths=[2 * inch, 4 * inch])
-    section2_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0.5, colors.black),
-        ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey),
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ('ALIGN', (0, 0), (0, -1), 'CENTER'),
-        ('VALIGN', (0, 0), (0, -1), 'MIDDLE'),
-    ]))
+    section2_table.setStyle(table_styles['fields_centered_label'])
 
     sec2_head_table1 = KeepTogether([sec2_heading, spacer_inbet, section2_table])
     story.append(sec2_head_table1)
@@ -195,10 +176,10 @@ def generate_msds_pdf(request, msds_id):
             if desc in DESC_TO_IMAGE:
                 logger.debug(f"DESC_TO_IMAGE[desc]: {DESC_TO_IMAGE[desc]}")
                 logger.debug(f"type(DESC_TO_IMAGE[desc]): {type(DESC_TO_IMAGE[desc])}")
-                img_path = finders.find(DESC_TO_IMAGE[desc])
-                logger.debug(f"img_path: {img_path}")
-                if img_path:
-                    rotated_img = RotatedImage(img_path, angle=-45, scale=0.10)
+                img = pdf_image(DESC_TO_IMAGE[desc])
+                logger.debug(f"img: {img}")
+                if img:
+                    rotated_img = RotatedImage(img, angle=-45, scale=0.10)
                     images.append(rotated_img)
 
         max_per_row = 3
@@ -210,12 +191,7 @@ def generate_msds_pdf(request, msds_id):
                 data=[image_rows[0]],  # First row of images
                 colWidths=[1.5 * inch] * len(image_rows[0])
             )
-            first_row_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 16),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 16)
-            ]))
+            first_row_table.setStyle(table_styles['pictograms'])
             # Keep the header, spacer and first row table together on the same page.
             story.append(KeepTogether([label_sec2_head, spacer_inbet, first_row_table]))
             
@@ -225,12 +201,7 @@ def generate_msds_pdf(request, msds_id):
                     data=[row_images],
                     colWidths=[1.5 * inch] * len(row_images)
                 )
-                row_table.setStyle(TableStyle([
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                    ('TOPPADDING', (0, 0), (-1, -1), 16),
-                    ('BOTTOMPADDING', (0, 0), (-1, -1), 16)
-                ]))
+                row_table.setStyle(table_styles['pictograms'])
                 story.append(KeepTogether([row_table]))
 
         # Add a fallback message if no images are provided
@@ -274,16 +245,7 @@ def generate_msds_pdf(request, msds_id):
 
     if precautionary_data:
         precautionary_table = Table(precautionary_data, colWidths=[2 * inch, 4 * inch])
-        precautionary_table.setStyle(TableStyle([
-            ('BOX', (0, 0), (-1, -1), 0.5, colors.black),
-            ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey),
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+        precautionary_table.setStyle(table_styles['fields'])
 
         precau = KeepTogether([precau_subh, spacer_inbet, precautionary_table])
         story.append(precau)
@@ -339,17 +301,7 @@ def generate_msds_pdf(request, msds_id):
 
     # Create table
     section3_table = Table(section3_data, colWidths=col_widths_sec3)
-    section3_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+    section3_table.setStyle(table_styles['header_row'])
 
 
     sec3 = KeepTogether([sec3_h, section3_table, spacer_bet_secs])
@@ -396,17 +348,7 @@ def generate_msds_pdf(request, msds_id):
     # Create table
     section4_table = Table(section4_data, colWidths=col_widths_sec4, repeatRows=1)
 
-    section4_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+    section4_table.setStyle(table_styles['header_row'])
 
     sec4 = KeepTogether([sec4_h, spacer_inbet, section4_table])
 
@@ -442,17 +384,7 @@ def generate_msds_pdf(request, msds_id):
     # Create table
     section5_table = Table(section5_data)
 
-    section5_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-        ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight header row
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-    ]))
+    section5_table.setStyle(table_styles['label_column'])
 
     # Group header and table with KeepTogether
     section5 = KeepTogether([section5_header, section5_spacer, section5_table])
@@ -490,17 +422,7 @@ def generate_msds_pdf(request, msds_id):
     if len(section6_data) > 1:
         section6_table = Table(section6_data)
 
-        section6_table.setStyle(TableStyle([
-            ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-            ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight header row
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+        section6_table.setStyle(table_styles['label_column'])
 
         # Group header and table with KeepTogether
         section6 = KeepTogether([section6_header, section6_spacer, section6_table])
@@ -525,17 +447,7 @@ def generate_msds_pdf(request, msds_id):
 
     # Create table
     section7_table = Table(section7_data, colWidths=col_widths_sec7)
-    section7_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+    section7_table.setStyle(table_styles['header_row'])
 
 
     section7 = KeepTogether([section7_header, section7_spacer, section7_table])
@@ -565,17 +477,7 @@ def generate_msds_pdf(request, msds_id):
 
     # Create table
     section8_table = Table(section8_data, colWidths=col_widths_sec8)
-    section8_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Border for the entire table
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align everything horizontally
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align everything vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
-        ]))
+    section8_table.setStyle(table_styles['header_row'])
 
 
     section8 = KeepTogether([section8_header, section8_spacer, section8_table])
@@ -631,18 +533,7 @@ def generate_msds_pdf(request, msds_id):
     # Create the table
     section9_table = Table(section9_data, colWidths=col_widths_sec9)
 
-    section9_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Outer border
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight first column
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align content
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+    section9_table.setStyle(table_styles['header_row_label_column'])
 
 
     # Group header and table with KeepTogether
@@ -685,18 +576,7 @@ def generate_msds_pdf(request, msds_id):
     # Create the table
     section10_table = Table(section10_data, colWidths=col_widths_sec10)
 
-    section10_table.setStyle(TableStyle([
-    ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Outer border
-    ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-    ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight first column
-    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align content
-    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align vertically
-    ('LEFTPADDING', (0, 0), (-1, -1), 4),
-    ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-    ('TOPPADDING', (0, 0), (-1, -1), 4),
-    ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+    section10_table.setStyle(table_styles['header_row_label_column'])
 
 
     # Group header and table with KeepTogether
@@ -743,18 +623,7 @@ def generate_msds_pdf(request, msds_id):
     # Create the table
     section11_table = Table(section11_data, colWidths=col_widths_sec11)
 
-    section11_table.setStyle(TableStyle([
-        ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Outer border
-        ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight first column
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align content
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align vertically
-        ('LEFTPADDING', (0, 0), (-1, -1), 4),
-        ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-        ('TOPPADDING', (0, 0), (-1, -1), 4),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-    ]))
+    section11_table.setStyle(table_styles['header_row_label_column'])
 
     # Group header and table with KeepTogether
     section11 = KeepTogether([section11_header, section11_spacer, section11_table])
@@ -798,18 +667,7 @@ def generate_msds_pdf(request, msds_id):
         # Create the table
         section12_table = Table(section12_data, colWidths=col_widths_sec12)
 
-        section12_table.setStyle(TableStyle([
-            ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Outer border
-            ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),  # Highlight header row
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight first column
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align content
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align vertically
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+        section12_table.setStyle(table_styles['header_row_label_column'])
 
         # Group header and table with KeepTogether
         section12 = KeepTogether([section12_header, section12_spacer, section12_table])
@@ -864,17 +722,7 @@ def generate_msds_pdf(request, msds_id):
         # Create the table
         section14_table = Table(section14_data, colWidths=col_widths_sec14)
 
-        section14_table.setStyle(TableStyle([
-            ('BOX', (0, 0), (-1, -1), 0.5, colors.black),       # Outer border
-            ('INNERGRID', (0, 0), (-1, -1), 0.33, colors.grey), # Grid lines
-            ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),  # Highlight first column
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),              # Center-align content
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),             # Center-align vertically
-            ('LEFTPADDING', (0, 0), (-1, -1), 4),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 4),
-            ('TOPPADDING', (0, 0), (-1, -1), 4),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 4)
-        ]))
+        section14_table.setStyle(table_styles['label_column'])
 
         # Group header and table with KeepTogether
 
@@ -888,19 +736,19 @@ def generate_msds_pdf(request, msds_id):
         un_url_list = input_string_un_picto.split(',')
 
         # Adjust paths to be relative to the static directory
-        un_paths = [url.split("/static/")[-1].lstrip('/') for url in un_url_list]
+        un_paths = [static_path(url) for url in un_url_list]
         logger.debug(f"Adjusted un_paths: {un_paths}")
 
         un_images = []
 
         for path in un_paths:
-            un_img_path = finders.find(path)
-            logger.debug(f"un_img_path: {un_img_path}")
+            un_img = pdf_image(path)
+            logger.debug(f"un_img: {un_img}")
 
-            if not un_img_path:
+            if not un_img:
                 logger.warning(f"Image not found for path: {path}")
             else:
-                un_rot_imag = RotatedImage(un_img_path, angle=315, scale=0.025)
+                un_rot_imag = RotatedImage(un_img, angle=315, scale=0.025)
                 un_images.append(un_rot_imag)         
 
         un_max_per_row = 3
@@ -919,12 +767,7 @@ def generate_msds_pdf(request, msds_id):
             )
 
             # Apply styling to the table
-            un_label_table.setStyle(TableStyle([
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 16),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 16)
-            ]))
+            un_label_table.setStyle(table_styles['pictograms'])
 
             # Wrap the table in KeepTogether and add it to the list
             all_tables.append(KeepTogether([un_label_table]))
@@ -1019,13 +862,3 @@ def generate_msds_pdf(request, msds_id):
     story.append(whole_sec16)
 
     doc.build(story)
-
-    # Get the PDF value
-    pdf = buffer.getvalue()
-    buffer.close()
-
-    # Return a response to the browser
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="SDS_Test.pdf"'
-    response.write(pdf)
-    return response
\ No newline at end of file
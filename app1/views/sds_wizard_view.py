@@ -4,11 +4,17 @@ from app1.models import *
 from app1.constants import *
 from formtools.wizard.views import SessionWizardView
 from app1.utils import *
+from app1.prefill import SECTION_PREFILLS, prefilled_section, start_prefill
+from app1.pubchem.client import pubchem_available
 from reportlab.lib.pagesizes import A4
+from django.conf import settings
+from django.urls import reverse
+from django.utils.http import urlencode
 from django.utils.translation import gettext as _
 
 import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +42,14 @@ TEMPLATES = {f'section{i+1}': f'msds_section{i+1}.html' for i in range(len(form_
 
 class MSDSWizard(SessionWizardView):
     form_list = FORMS
+    # Step data and prefilled sections live in WizardData rows, not in the session.
+    storage_name = 'app1.wizard_storage.WizardDataStorage'
+
+    def dispatch(self, request, *args, **kwargs):
+        # Every PubChem wait in this request comes out of one budget.
+        self.prefill_deadline = time.monotonic() + settings.PUBCHEM_REQUEST_BUDGET
+        self.pending_prefills = {}
+        return super().dispatch(request, *args, **kwargs)
 
     def get_template_names(self):
         template_name = TEMPLATES[self.steps.current]
@@ -45,449 +59,38 @@ class MSDSWizard(SessionWizardView):
 
     def get_form_initial(self, step):
         initial = super().get_form_initial(step)
-
-        if step == 'section2':
-            if 'section2_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section2_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas_number = data.get('cas_number')
-                if cas_number:
-                    cached_data = {}
-                    cid = get_cid_from_cas(cas_number)
-                    if cid:
-                        classification = get_classification_from_cid(cid)
-                        if classification:
-                            cached_data['classification'] = classification
-
-                        signal_word = get_signal_word(cid)
-                        if signal_word:
-                            cached_data['signal_word'] = signal_word
-                        else:
-                            logger.warning(f"No signal word found for CID {cid}")
-
-                        h_codes = get_h_codes(cid)
-                        if h_codes:
-                            cached_data['hazard_statements'] = '; '.join(h_codes)
-
-                        p_codes = get_p_codes(cid)
-                        if p_codes:
-                            for category, codes_dict in p_codes.items():
-                                statements = [f"{code}: {desc}" for code, desc in codes_dict.items()]
-                                cached_data[f'{category}_statements'] = '; '.join(statements)
-
-                        svg_data = fetch_and_find_svg_urls(cid)
-                        if svg_data:
-                            cached_data['label_elements'] = svg_data
-                            existing_labels = [elem['description'] for elem in svg_data]
-                            predefined_labels = PICTOGRAMS.keys()
-                            cached_data['additional_pictograms'] = list(set(existing_labels) & set(predefined_labels))
-                        else:
-                            logger.warning(f"No SVG data found for CID {cid}")
-
-                    self.storage.data['section2_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section3':
-            if 'section3_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section3_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas_number = data.get('cas_number')
-
-                cached_data = {}
-
-                try:
-                    iupac_name = get_iupac(cas_number)
-                    if iupac_name != '':
-                        cached_data['chemical_name'] = iupac_name
-                    else:
-                        logger.warning(f"No IUPAC name found for CAS {cas_number}")
-                        cached_data['chemical_name'] = ''
-                except Exception as e:
-                    logger.error(f"Error fetching IUPAC name for CAS {cas_number}: {e}")
-                    cached_data['chemical_name'] = ''
-
-                try:
-                    synonyms = get_synonyms_from_cas(cas_number)
-                    if synonyms:
-                        cached_data['synonyms'] = sorted(synonyms, key=lambda x: x.lower())
-                        
-                except Exception as e:
-                    logger.error(f"Error fetching synonyms for CAS {cas_number}: {e}")
-                    cached_data['synonyms'] = []
-
-                self.storage.data['section3_cached_data'] = cached_data
-                initial.update(cached_data)
-
-        if step == 'section4':
-            if 'section4_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section4_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        first_aid = get_first_aid(cid)
-
-                        if first_aid != []:
-
-                            cached_data['aid_inhal'] = first_aid[0]
-                            cached_data['aid_inges'] = first_aid[3]
-                            cached_data['aid_eye'] = first_aid[2]
-                            cached_data['aid_skin'] = first_aid[1]
-
-                    except Exception as e:
-                        logger.error(f"Error fetching First Aid data for CAS {cas}: {e}")
-                        cached_data['aid_inhal'] = ''
-                        cached_data['aid_inges'] = ''
-                        cached_data['aid_eye'] = ''
-                        cached_data['aid_skin'] = ''
-
-                    self.storage.data['section4_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section5':
-            if 'section5_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section5_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        fire = get_fire(cid)
-
-                        if fire != []:
-
-                            cached_data['suitable_extinguishing_media'] = fire[0]
-                            cached_data['special_protective_actions'] = fire[1]
-
-                    except Exception as e:
-                        logger.error(f"Error fetching Fire Protection data for CAS {cas}: {e}")
-                        cached_data['suitable_extinguishing_media'] = ''
-                        cached_data['special_protective_actions'] = ''
-
-                    self.storage.data['section5_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section6':
-            if 'section6_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section6_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        acci = get_acci(cid)
-                        if acci != []:
-
-                            cached_data['personal_precautions'] = str(acci)
-
-                    except Exception as e:
-                        logger.error(f"Error fetching Accidental Release Measures' data for CAS {cas}: {e}")
-                        cached_data['personal_precautions'] = ''
-
-                    self.storage.data['section6_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section7':
-            if 'section7_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section7_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        hand_stor = get_hand_stor(cid)
-                        safe_stor = get_safe_stor(cid)
-
-                        if hand_stor != []:
-
-                            cached_data['precautions_for_safe_handling'] = str(hand_stor)
-
-                        if safe_stor != '':
-
-                            cached_data['conditions_for_safe_storage'] = safe_stor
-
-                    except Exception as e:
-                        logger.error(f"Error fetching Handling and Storage data for CAS {cas}: {e}")
-                        cached_data['precautions_for_safe_handling'] = ''
-                        cached_data['conditions_for_safe_storage'] = ''
-
-                    self.storage.data['section7_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section8':
-            if 'section8_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section8_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        oel = get_oel(cid)
-                        
-
-                        if oel != []:
-
-                            cached_data['control_parameters'] = 'Occupational Exposure Limits (OEL)\n' + oel.replace(';', '\n')
-
-                    except Exception as e:
-                        logger.error(f"Error fetching OEL data for CAS {cas}: {e}")
-                        cached_data['control_parameters'] = ''
-
-                    self.storage.data['section8_cached_data'] = cached_data
-                    initial.update(cached_data)
-
-        if step == 'section9':
-            if 'section9_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section9_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-
-                    try:
-                        phys = get_phys(cid)
-                        odor = get_odor(cid)
-                        t_change = get_melt(cid)
-                        boil = get_boil(cid)
-                        flame = get_flame(cid)
-                        flash = get_flash(cid)
-                        autoig = get_autoig(cid)
-                        pH = get_pH(cid)
-                        solu = get_solu(cid)
-                        vap_p = get_vap_p(cid)
-                        vap_d = get_vap_d(cid)
-                        
-
-                        if phys != []:
-
-                            cached_data['phys'] = str(phys)
-
-                        if odor != []:
-                            cached_data['odor'] = str(odor)
-
-                        if t_change != []:
-                            cached_data['t_change'] = str(t_change)
-
-                        if boil != []:
-                            cached_data['boiling_point'] = str(boil)
-
-                        if flame != []:
-                            cached_data['flammability_information'] = str(flame)
-
-                        if flash != []:
-                            cached_data['flash_point'] = str(flash)
-
-                        if autoig != []:
-                            cached_data['auto_ignition_temperature'] = str(autoig)
-
-                        if pH != []:
-                            cached_data['pH'] = str(pH)
-
-                        if solu != []:
-                            cached_data['solubility'] = str(solu)
-
-                        if vap_p != []:
-                            cached_data['vapor_pressure'] = str(vap_p)
-
-                        if vap_d != []:
-                            cached_data['relative_vapour_density'] = str(vap_d)
-
-                    except Exception as e:
-                        # Log the error with detailed context
-                        logger.error(f"Error fetching section 9 data for CAS {cas}: {e}")
-                        # Optionally add meaningful fallback data to indicate a failure
-                        cached_data.update({
-                            'phys': 'Data not available',
-                            'odor': 'Data not available',
-                            't_change': 'Data not available',
-                            'boiling_point': 'Data not available',
-                            'flammability_information': 'Data not available',
-                            'flash_point': 'Data not available',
-                            'auto_ignition_temperature': 'Data not available',
-                            'pH': 'Data not available',
-                            'solubility': 'Data not available',
-                            'vapor_pressure': 'Data not available',
-                            'relative_vapour_density': 'Data not available',
-                        })
-
-                self.storage.data['section9_cached_data'] = cached_data
-                initial.update(cached_data)
-
-        if step == 'section10':
-            if 'section10_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section10_cached_data']
-                initial.update(cached_data)
+        if step not in SECTION_PREFILLS:
+            # Also keeps section1 from asking for its own cleaned data.
+            return initial
+
+        cached_data = self.storage.get_prefill(step)
+        if cached_data is not None:
+            initial.update(cached_data)
+            return initial
+
+        cas_number = (self.get_cleaned_data_for_step('section1') or {}).get('cas_number')
+        time_left = max(0, self.prefill_deadline - time.monotonic())
+        cached_data, complete = prefilled_section(step, cas_number, timeout=time_left)
+        if cached_data is not None:
+            initial.update(cached_data)
+            if complete:
+                self.storage.set_prefill(step, cached_data)
             else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-                    try:
-                        # Fetch data
-                        reac = get_reac(cid)
-                        h_reac = get_h_reac(cid)
-                        h_decomp = get_h_decomp(cid)
-
-                        # Populate cached data
-                        if reac:
-                            cached_data['reactivity'] = str(reac)
-                        if h_reac:
-                            cached_data['possibility_of_hazardous_reactions'] = str(h_reac)
-                        if h_decomp:
-                            cached_data['hazardous_decomposition_products'] = str(h_decomp)
-
-                    except Exception as e:
-                        # Log the error with detailed context
-                        logger.error(f"Error fetching section 10 data for CAS {cas}: {e}")
-
-                # Save cached data in storage
-                self.storage.data['section10_cached_data'] = cached_data
-                initial.update(cached_data)
-
-        if step == 'section11':
-            if 'section11_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section11_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-                    try:
-                        # Fetch data
-                        symp = irritants(cid)
-                        tox_data = get_tox_data(cid)
-                        immi_eff = get_immi_eff(cid)
-                        ch_eff = get_ch_eff(cid)
-                        
-                        if symp:
-                            cached_data['symptoms'] = str(symp)
-
-                        if tox_data:
-                            cached_data['acute_toxicity_estimates'] = str(tox_data)
-
-                        if immi_eff:
-                            cached_data['immediate_effects'] = str(immi_eff)
-                        
-                        if ch_eff:
-                            cached_data['chronic_effects'] = str(ch_eff)
-
-                    except Exception as e:
-                        # Log the error with detailed context
-                        logger.error(f"Error fetching section 11 data for CAS {cas}: {e}")
-                        # Add meaningful fallback data for failed fetches
-
-                # Save cached data in storage
-                self.storage.data['section11_cached_data'] = cached_data
-                initial.update(cached_data)
-
-        if step == 'section12':
-            if 'section12_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section12_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                
-                if cid:
-                    try:
-                        # Fetch data
-                        eco_tox = get_eco_tox(cid)
-                        other_eco = get_other_eco(cid)
-                        bio_accu = get_bio_accu(cid)
-                        mob_soil = get_mob_soil(cid)
-                        degra = get_degra(cid)
-                        
-                        if eco_tox:
-                            cached_data['ecotoxicity'] = str(eco_tox)
-
-                        if other_eco:
-                            cached_data['other_adverse_effects'] = str(other_eco)
-
-                        if bio_accu:
-                            cached_data['bioaccumulative_potential'] = str(bio_accu)
-
-                        if mob_soil:
-                            cached_data['mobility_in_soil'] = str(mob_soil)
-
-                        if degra:
-                            cached_data['persistence_and_degradability'] = str(degra)
-
-                    except Exception as e:
-                        # Log the error with detailed context
-                        logger.error(f"Error fetching section 12 data for CAS {cas}: {e}")    
-
-                # Save cached data in storage
-                self.storage.data['section12_cached_data'] = cached_data
-                initial.update(cached_data)
-
-        if step == 'section14':
-            if 'section14_cached_data' in self.storage.data:
-                cached_data = self.storage.data['section14_cached_data']
-                initial.update(cached_data)
-            else:
-                data = self.get_cleaned_data_for_step('section1') or {}
-                cas = data.get('cas_number')
-                cached_data = {}
-                cid = get_cid_from_cas(cas)
-                if cid:
-                    try:
-                        # Fetch data
-                        UN = get_un(cid)
-                        ship_name = get_shipping_name(cid)
-                        
-                        if UN:
-                            cached_data['UN_number'] = str(UN)
-
-                        if ship_name:
-                            cached_data['UN_proper_shipping_name'] = str(ship_name)
-
-                    except Exception as e:
-                        # Log the error with detailed context
-                        logger.error(f"Error fetching section 14 data for CAS {cas}: {e}")    
-
-                # Save cached data in storage
-                self.storage.data['section14_cached_data'] = cached_data
-                initial.update(cached_data)
+                # Not kept: the step is fetched again when revisited, and polled for meanwhile.
+                self.pending_prefills[step] = cas_number
 
         return initial
 
     def get_context_data(self, form, **kwargs):
         context = super().get_context_data(form=form, **kwargs)
+        context['pubchem_unavailable'] = self.steps.current in SECTION_PREFILLS and not pubchem_available()
+        if self.steps.current in self.pending_prefills:
+            context['prefill_poll_url'] = '{}?{}'.format(
+                reverse('msds_prefill_status', args=[self.steps.current]),
+                urlencode({'cas': self.pending_prefills[self.steps.current]}),
+            )
         if self.steps.current == 'section2':
-            cached_data = self.storage.data.get('section2_cached_data', {})
+            cached_data = self.storage.get_prefill('section2') or form.initial
             context['label_elements_json'] = json.dumps(cached_data.get('label_elements', []))
             context['pictograms_dict'] = PICTOGRAMS
             context['pictograms_json'] = json.dumps(PICTOGRAMS)
@@ -509,7 +112,7 @@ class MSDSWizard(SessionWizardView):
 
 
         if self.steps.current == 'section3':
-            cached_data = self.storage.data.get('section3_cached_data', {})
+            cached_data = self.storage.get_prefill('section3') or {}
             context['synonyms'] = cached_data.get('synonyms', [])
             sec1_data = self.get_cleaned_data_for_step('section1') or {}
             cas_number = sec1_data.get('cas_number')
@@ -528,11 +131,11 @@ class MSDSWizard(SessionWizardView):
                 context['index_number'] = ''        
 
         if self.steps.current == 'section4':
-            cached_data = self.storage.data.get('section4_cached_data', {})
+            cached_data = self.storage.get_prefill('section4') or {}
             context['description_of_first_aid'] = cached_data.get('description_of_first_aid', [])
 
         if self.steps.current == 'section14':  # Adjusted for Section 14
-            cached_data = self.storage.data.get('section14_cached_data', {})
+            cached_data = self.storage.get_prefill('section14') or {}
             context['un_pictograms_dict'] = DESC_TO_IMAGE_UN
 
         return context
@@ -544,6 +147,9 @@ class MSDSWizard(SessionWizardView):
         # Log cleaned data for the current step if the form is valid
         if form.is_valid():
             logger.debug(f"Step {self.steps.current} cleaned_data: {form.cleaned_data}")
+            if self.steps.current == 'section1':
+                # The CAS number is known now: fetch the later sections while the user fills them in.
+                start_prefill(form.cleaned_data.get('cas_number'))
         else:
             logger.warning(f"Step {self.steps.current} has invalid data.")
 
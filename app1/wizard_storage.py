@@ -0,0 +1,111 @@
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from formtools.wizard.storage.session import SessionStorage
+
+from .models import WizardData
+
+logger = logging.getLogger(__name__)
+
+
+class WizardDataStorage(SessionStorage):
+    """
+    Wizard storage that keeps step data and prefill payloads in WizardData
+    rows, keyed by a wizard instance id. The session only holds the current
+    step, the instance id and the names of the stored rows, so it stays a
+    few hundred bytes however large the compound's data is.
+
+    Rows are loaded once per request and only written when their content
+    changes.
+    """
+    instance_key = 'instance'
+    stored_key = 'stored'
+
+    def __init__(self, *args, **kwargs):
+        self._rows = None
+        super().__init__(*args, **kwargs)
+
+    def init_data(self):
+        super().init_data()
+        self.data[self.instance_key] = str(uuid.uuid4())
+        self.data[self.stored_key] = []
+        self._rows = {}
+
+    def reset(self):
+        instance = self.data.get(self.instance_key)
+        super().reset()
+        if instance:
+            WizardData.objects.filter(instance=instance).delete()
+
+    @property
+    def instance(self):
+        if self.instance_key not in self.data:
+            # Wizard started before this storage was in use.
+            self.data[self.instance_key] = str(uuid.uuid4())
+            self.data[self.stored_key] = []
+        return self.data[self.instance_key]
+
+    def _load(self):
+        if self._rows is None:
+            self._rows = {}
+            if self.data.get(self.stored_key):
+                self._rows = dict(WizardData.objects.filter(instance=self.instance).values_list('key', 'data'))
+        return self._rows
+
+    def _get(self, key):
+        return self._load().get(key)
+
+    def _set(self, key, value):
+        rows = self._load()
+        if key in rows and rows[key] == value:
+            return
+        WizardData.objects.update_or_create(instance=self.instance, key=key, defaults={'data': value})
+        rows[key] = value
+        if key not in self.data[self.stored_key]:
+            self.data[self.stored_key].append(key)
+
+    def get_step_data(self, step):
+        values = self._get(f'step_data:{step}')
+        if values is not None:
+            values = MultiValueDict(values)
+        return values
+
+    def set_step_data(self, step, cleaned_data):
+        if isinstance(cleaned_data, MultiValueDict):
+            cleaned_data = dict(cleaned_data.lists())
+        self._set(f'step_data:{step}', cleaned_data)
+
+    def get_prefill(self, step):
+        """The initial data prefilled for a step, or None if it has not been stored."""
+        return self._get(f'prefill:{step}')
+
+    def set_prefill(self, step, data):
+        self._set(f'prefill:{step}', data)
+
+
+def purge_wizard_data(ttl=None):
+    """
+    Delete the rows of wizards nobody has written to for ttl seconds
+    (WIZARD_DATA_TTL by default).
+
+    Returns:
+        int: the number of rows deleted.
+    """
+    if ttl is None:
+        ttl = settings.WIZARD_DATA_TTL
+    cutoff = timezone.now() - timedelta(seconds=ttl)
+    abandoned = (
+        WizardData.objects.values('instance')
+        .annotate(last_updated=Max('updated'))
+        .filter(last_updated__lt=cutoff)
+        .values('instance')
+    )
+    deleted, _ = WizardData.objects.filter(instance__in=abandoned).delete()
+    if deleted:
+        logger.info(f"Purged {deleted} rows of abandoned wizards")
+    return deleted